@@ -0,0 +1,414 @@
+"""
+    Benchmarks of engine overhead, run with `make benchmark` or
+    `python benchmarks/run.py`.
+
+    Flows of different shapes are generated into a temporary directory, every
+    step of them does nothing, so measured time is time spent by engine:
+
+    - linear: chain of N steps.
+    - choice: root choosing one of W children.
+    - parallel: every level launches a parallel branch to next level, D deep.
+
+    Results are written to benchmarks/results/<commit>.json, pass a previous
+    result file to --compare to fail on regressions.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from importlib import import_module
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from freak.engine import Engine  # noqa: E402
+from freak.evaluate import compile_validator  # noqa: E402
+from freak.flows.choice_flow import ChoiceFlowEngine  # noqa: E402
+from freak.flows.parallel_flow import ParallelFlowEngine  # noqa: E402
+from freak.models.input import InputModel  # noqa: E402
+from freak.models.request import RequestContext  # noqa: E402
+
+HEADER = """
+from freak.flows.{decorator} import {decorator}
+from freak.models.input import InputModel
+from freak.models.response import SuccessResponseContext
+"""
+
+STEP = """
+@{decorator}(
+    name="{uid}",
+    order={order},
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="{uid}",
+    parent_uid={parent_uid!r},
+    is_parallel={is_parallel},
+)
+def {uid}(ctx):
+    return SuccessResponseContext(input=ctx.input, output={{}}, choice={choice!r})
+"""
+
+DATA = {"a": 1, "b": 2}
+
+
+def step_source(
+    decorator: str,
+    uid: str,
+    order: int,
+    parent_uid: Optional[str],
+    is_parallel: bool = False,
+    choice: Optional[str] = None,
+) -> str:
+    return STEP.format(
+        decorator=decorator,
+        uid=uid,
+        order=order,
+        parent_uid=parent_uid,
+        is_parallel=is_parallel,
+        choice=choice,
+    )
+
+
+def linear_flow(length: int) -> str:
+    steps = [
+        step_source(
+            decorator="base_flow",
+            uid=f"step_{order}",
+            order=order,
+            parent_uid=f"step_{order - 1}" if order > 1 else None,
+        )
+        for order in range(1, length + 1)
+    ]
+    return HEADER.format(decorator="base_flow") + "".join(steps)
+
+
+def choice_flow(width: int) -> str:
+    steps = [
+        step_source(
+            decorator="choice_flow",
+            uid="root",
+            order=1,
+            parent_uid=None,
+            choice=f"child_{width - 1}",
+        )
+    ]
+    steps.extend(
+        step_source(
+            decorator="choice_flow",
+            uid=f"child_{order}",
+            order=order + 2,
+            parent_uid="root",
+        )
+        for order in range(width)
+    )
+    return HEADER.format(decorator="choice_flow") + "".join(steps)
+
+
+def parallel_flow(depth: int) -> str:
+    steps = []
+    for level in range(depth + 1):
+        steps.append(
+            step_source(
+                decorator="parallel_flow",
+                uid=f"level_{level}",
+                order=2 * level + 1,
+                parent_uid=f"level_{level - 1}" if level else None,
+                is_parallel=bool(level),
+            )
+        )
+        steps.append(
+            step_source(
+                decorator="parallel_flow",
+                uid=f"main_{level}",
+                order=2 * level + 2,
+                parent_uid=f"level_{level}",
+            )
+        )
+    return HEADER.format(decorator="parallel_flow") + "".join(steps)
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    best and median time of func in seconds, with gc disabled while timing.
+    """
+    func()
+    timings = []
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return {"best": min(timings), "median": statistics.median(timings)}
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """
+    peak bytes allocated by a call of func.
+    """
+    func()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def write_module(directory: str, name: str, source: str) -> str:
+    with open(os.path.join(directory, f"{name}.py"), mode="wt") as file:
+        file.write(source)
+    return name
+
+
+def bench_shape(
+    directory: str,
+    name: str,
+    source: str,
+    engine_class: Any,
+    steps: int,
+    repeat: int,
+) -> Dict[str, Any]:
+    module_name = write_module(directory=directory, name=name, source=source)
+    import_module(module_name)
+
+    # cold start locates flow module, warm start loads its manifest.
+    os.environ["FREAK_NO_CACHE"] = "1"
+    cold = measure(
+        lambda: engine_class(module_name=module_name),
+        repeat=max(repeat // 10, 3),
+    )
+    del os.environ["FREAK_NO_CACHE"]
+    engine_class(module_name=module_name)
+    warm = measure(
+        lambda: engine_class(module_name=module_name),
+        repeat=max(repeat // 10, 3),
+    )
+
+    engine = engine_class(module_name=module_name)
+    execute = measure(
+        lambda: engine.execute(from_step=None, data=dict(DATA)), repeat=repeat
+    )
+    memory = peak_memory(
+        lambda: engine.execute(from_step=None, data=dict(DATA))
+    )
+    engine.shutdown()
+
+    return {
+        "steps": steps,
+        "init_cold": cold,
+        "init_warm": warm,
+        "execute": execute,
+        "per_step": {key: value / steps for key, value in execute.items()},
+        "memory_per_run": memory,
+    }
+
+
+def bench_validation(repeat: int) -> Dict[str, Any]:
+    validator = compile_validator(required_model=InputModel)
+    ctx = RequestContext(input=dict(DATA), name="step", order=0)
+
+    results = {
+        "model": measure(lambda: InputModel(**ctx.input), repeat=repeat),
+        "validator": measure(lambda: validator(ctx.input), repeat=repeat),
+    }
+    return results
+
+
+def run_benchmarks(
+    length: int, width: int, depth: int, repeat: int
+) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, directory)
+        os.environ["FREAK_CACHE_DIR"] = os.path.join(directory, "cache")
+        try:
+            results["linear"] = bench_shape(
+                directory=directory,
+                name="bench_linear",
+                source=linear_flow(length=length),
+                engine_class=partial_engine(Engine, "base_flow"),
+                steps=length,
+                repeat=repeat,
+            )
+            results["choice"] = bench_shape(
+                directory=directory,
+                name="bench_choice",
+                source=choice_flow(width=width),
+                engine_class=ChoiceFlowEngine,
+                steps=2,
+                repeat=repeat,
+            )
+            # same flows, run by generated code.
+            results["linear_compiled"] = bench_shape(
+                directory=directory,
+                name="bench_linear",
+                source=linear_flow(length=length),
+                engine_class=partial_engine(Engine, "base_flow", compiled=True),
+                steps=length,
+                repeat=repeat,
+            )
+            results["choice_compiled"] = bench_shape(
+                directory=directory,
+                name="bench_choice",
+                source=choice_flow(width=width),
+                engine_class=partial_engine(
+                    ChoiceFlowEngine, "choice_flow", compiled=True
+                ),
+                steps=2,
+                repeat=repeat,
+            )
+            # every level runs its own step and main step.
+            results["parallel"] = bench_shape(
+                directory=directory,
+                name="bench_parallel",
+                source=parallel_flow(depth=depth),
+                engine_class=ParallelFlowEngine,
+                steps=2 * (depth + 1),
+                repeat=repeat,
+            )
+        finally:
+            sys.path.remove(directory)
+            del os.environ["FREAK_CACHE_DIR"]
+
+    results["validation"] = bench_validation(repeat=repeat)
+    return results
+
+
+def partial_engine(
+    engine_class: Any, decorator_name: str, **options: Any
+) -> Any:
+    def build(module_name: str) -> Any:
+        return engine_class(
+            module_name=module_name, decorator_name=decorator_name, **options
+        )
+
+    return build
+
+
+def commit() -> str:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=ROOT,
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """
+    best timings and memory of results, keyed by their path.
+    """
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            if "best" in value:
+                flat[path] = value["best"]
+            else:
+                flat.update(flatten(results=value, prefix=f"{path}."))
+        elif key == "memory_per_run":
+            flat[path] = value
+    return flat
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float
+) -> List[str]:
+    """
+    prints change of every measurement, returns ones which regressed by
+    more than max_regression percent.
+    """
+    regressions = []
+    previous = flatten(results=baseline["results"])
+    for path, value in flatten(results=current["results"]).items():
+        if path not in previous or not previous[path]:
+            continue
+
+        change = (value - previous[path]) / previous[path] * 100
+        print(
+            f"{path:40} {previous[path]:>14.6g} {value:>14.6g} {change:+8.1f}%"
+        )
+        if change > max_regression:
+            regressions.append(path)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--length", type=int, default=50)
+    parser.add_argument("--width", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument(
+        "--output", default=os.path.join(ROOT, "benchmarks", "results")
+    )
+    parser.add_argument("--compare", help="result file to compare against")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=20.0,
+        help="percent a measurement may grow by before failing",
+    )
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "parameters": {
+            "length": args.length,
+            "width": args.width,
+            "depth": args.depth,
+            "repeat": args.repeat,
+        },
+        "results": run_benchmarks(
+            length=args.length,
+            width=args.width,
+            depth=args.depth,
+            repeat=args.repeat,
+        ),
+    }
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{report['commit']}.json")
+    with open(path, mode="wt") as file:
+        json.dump(report, file, indent=2)
+    print(json.dumps(flatten(results=report["results"]), indent=2))
+    print(f"results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(
+            current=report,
+            baseline=baseline,
+            max_regression=args.max_regression,
+        )
+        if regressions:
+            print(f"regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
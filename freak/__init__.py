@@ -1,10 +1,12 @@
-# type: ignore[attr-defined]
 """Freak is a data flow engine."""
 
 try:
     from importlib.metadata import PackageNotFoundError, version
 except ImportError:  # pragma: no cover
-    from importlib_metadata import PackageNotFoundError, version
+    from importlib_metadata import (  # type: ignore[no-redef]
+        PackageNotFoundError,
+        version,
+    )
 
 
 try:
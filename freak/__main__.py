@@ -1,13 +1,19 @@
-# type: ignore[attr-defined]
-
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
+import json
+import os
 import random
+import sys
 from enum import Enum
+from importlib import import_module
+from inspect import getabsfile, iscoroutinefunction
 
 import typer
 from freak import __version__
 from freak.example import hello
+from freak.manifest import manifest_path
+from freak.provider import EngineProvider
+from freak.runner import Runner, detect_format, read_records
 from rich.console import Console
 
 
@@ -28,15 +34,29 @@ app = typer.Typer(
 console = Console()
 
 
-def version_callback(value: bool):
+def version_callback(value: bool) -> None:
     """Prints the version of the package."""
     if value:
         console.print(f"[yellow]freak[/] version: [bold blue]{__version__}[/]")
         raise typer.Exit()
 
 
-@app.command(name="")
+@app.callback()
 def main(
+    version: bool = typer.Option(
+        None,
+        "-v",
+        "--version",
+        callback=version_callback,
+        is_eager=True,
+        help="Prints the version of the freak package.",
+    ),
+) -> None:
+    """Freak is a data flow engine."""
+
+
+@app.command(name="hello")
+def greet(
     name: str = typer.Option(..., help="Name of person to greet."),
     color: Optional[Color] = typer.Option(
         None,
@@ -46,15 +66,7 @@ def main(
         case_sensitive=False,
         help="Color for name. If not specified then choice will be random.",
     ),
-    version: bool = typer.Option(
-        None,
-        "-v",
-        "--version",
-        callback=version_callback,
-        is_eager=True,
-        help="Prints the version of the freak package.",
-    ),
-):
+) -> None:
     """Prints a greeting for a giving name."""
     if color is None:
         # If no color specified use random value from `Color` class
@@ -62,3 +74,119 @@ def main(
 
     greeting: str = hello(name)
     console.print(f"[bold {color}]{greeting}[/]")
+
+
+@app.command(name="compile")
+def compile_flows(
+    modules: List[str] = typer.Argument(
+        ..., help="Modules defining steps of the flow."
+    ),
+    flow: str = typer.Option(
+        "base_flow", "-f", "--flow", help="Flow decorator used by modules."
+    ),
+    cache_dir: Optional[str] = typer.Option(
+        None,
+        "--cache-dir",
+        help="Directory for manifests, defaults to FREAK_CACHE_DIR or "
+        "__pycache__ next to every module.",
+    ),
+) -> None:
+    """Writes flow manifests, so that engines start without locating flows."""
+    # modules are looked up like `python -m` does.
+    sys.path.insert(0, os.getcwd())
+
+    # async engines accept both regular and async steps.
+    engine = EngineProvider(flow_name=flow, asynchronous=True).engine
+    for module_name in modules:
+        engine(
+            module_name=module_name, decorator_name=flow, cache_dir=cache_dir
+        )
+
+        path = manifest_path(
+            file_path=getabsfile(import_module(name=module_name)),
+            decorator=flow,
+            cache_dir=cache_dir,
+        )
+        console.print(f"[green]compiled[/] {module_name}: {path}")
+
+
+@app.command(name="run")
+def run_flow(
+    module: str = typer.Argument(
+        ..., help="Module defining steps of the flow."
+    ),
+    flow: str = typer.Option(
+        "base_flow", "-f", "--flow", help="Flow decorator used by module."
+    ),
+    input_path: str = typer.Option(
+        "-", "-i", "--input", help="JSONL or CSV file of records, - for stdin."
+    ),
+    output_path: str = typer.Option(
+        "-", "-o", "--output", help="JSONL file for results, - for stdout."
+    ),
+    record_format: Optional[str] = typer.Option(
+        None,
+        "--format",
+        help="jsonl or csv, detected from input file name by default.",
+    ),
+    from_step: Optional[str] = typer.Option(
+        None, "--from-step", help="Step to start from, root by default."
+    ),
+    workers: int = typer.Option(8, "-w", "--workers", help="Worker threads."),
+    window: Optional[int] = typer.Option(
+        None,
+        "--window",
+        help="Records in flight at a time, four per worker by default.",
+    ),
+) -> None:
+    """Executes a flow for every record of a file, writes a result per record."""
+    sys.path.insert(0, os.getcwd())
+
+    # flows with async steps need async engine.
+    module_object = import_module(name=module)
+    asynchronous = any(
+        iscoroutinefunction(func) and hasattr(func, "options")
+        for func in module_object.__dict__.values()
+    )
+    engine = EngineProvider(flow_name=flow, asynchronous=asynchronous).engine(
+        module_name=module, decorator_name=flow, max_workers=workers
+    )
+
+    record_format = record_format or detect_format(path=input_path)
+    source = sys.stdin if input_path == "-" else open(input_path, mode="rt")
+    target = sys.stdout if output_path == "-" else open(output_path, mode="wt")
+
+    def write(result: Dict[str, Any]) -> None:
+        target.write(json.dumps(result, default=str) + "\n")
+
+    try:
+        runner = Runner(
+            engine=engine, from_step=from_step, workers=workers, window=window
+        )
+        summary = runner.run(
+            records=read_records(file=source, record_format=record_format),
+            write=write,
+        )
+    finally:
+        engine.shutdown()
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    # results may go to stdout, summary goes to stderr.
+    errors = Console(stderr=True)
+    latency = summary["latency"]
+    errors.print(
+        f"[green]{summary['succeeded']}[/] succeeded, "
+        f"[red]{summary['failed']}[/] failed of {summary['records']} records "
+        f"in {summary['elapsed']:.2f}s ({summary['throughput']:.1f} records/s)"
+    )
+    errors.print(
+        f"latency p50 {latency['p50'] * 1000:.2f}ms, "
+        f"p95 {latency['p95'] * 1000:.2f}ms, "
+        f"p99 {latency['p99'] * 1000:.2f}ms, "
+        f"max {latency['max'] * 1000:.2f}ms"
+    )
+    for step, failures in sorted(summary["failures"].items()):
+        errors.print(f"  [red]{failures}[/] failed at {step}")
@@ -0,0 +1,175 @@
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+import asyncio
+import threading
+import time
+from functools import partial, wraps
+from inspect import iscoroutinefunction
+from weakref import WeakKeyDictionary
+
+from freak.models.request import RequestContext
+from freak.models.response import ErrorResponseContext, Response
+from freak.types import FUNC_TYPE
+
+"""
+    A bulkhead limits how many calls of a step are in flight at once, over
+    every run of an engine, so that a slow dependency behind one step can
+    not take up every worker of the engine.
+
+    Calls over the limit wait for a slot, up to queue_timeout seconds when
+    it is set, after which they fail without calling the step. Time spent
+    waiting is recorded as "queue" timing of the step.
+"""
+
+
+class Bulkhead:
+    def __init__(
+        self,
+        uid: str,
+        limit: int,
+        queue_timeout: Optional[float] = None,
+        timed: bool = False,
+    ) -> None:
+        """
+        with timed set, time waited is attached to timings of request.
+        """
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+            raise Exception("InvalidConcurrencyError", uid, limit)
+
+        self.uid = uid
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.timed = timed
+        self.semaphore = threading.BoundedSemaphore(value=limit)
+        # asyncio semaphores belong to the loop they are used on.
+        self.semaphores: "WeakKeyDictionary[Any, asyncio.Semaphore]" = (
+            WeakKeyDictionary()
+        )
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    def async_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self.semaphores.get(loop)
+        if semaphore is None:
+            with self.lock:
+                semaphore = self.semaphores.setdefault(
+                    loop, asyncio.Semaphore(value=self.limit)
+                )
+        return semaphore
+
+    def acquire(self) -> Optional[float]:
+        """
+        seconds waited for a slot, None if none was freed in time.
+        """
+        started = time.perf_counter()
+        timeout = self.queue_timeout
+        if not self.semaphore.acquire(timeout=timeout):
+            self.reject()
+            return None
+        return time.perf_counter() - started
+
+    async def acquire_async(self) -> Optional[float]:
+        semaphore = self.async_semaphore()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.reject()
+            return None
+        return time.perf_counter() - started
+
+    def reject(self) -> None:
+        with self.lock:
+            self.rejected += 1
+
+    def waited(self, ctxs: Sequence[RequestContext], seconds: float) -> None:
+        if not self.timed:
+            return
+        for ctx in ctxs:
+            if ctx.timings is None:
+                ctx.timings = {}
+            ctx.timings["queue"] = seconds
+
+    def rejections(self, ctxs: Sequence[RequestContext]) -> List[Response]:
+        return [
+            ErrorResponseContext(
+                input=ctx.input,
+                messages=[f"ConcurrencyLimitError: {self.uid}"],
+            )
+            for ctx in ctxs
+        ]
+
+    def call(
+        self,
+        ctxs: Sequence[RequestContext],
+        func: Callable[[], Any],
+        batch: bool = False,
+    ) -> Any:
+        """
+        calls func holding a slot, a batch of requests takes a single slot.
+        """
+        seconds = self.acquire()
+        if seconds is None:
+            rejections = self.rejections(ctxs=ctxs)
+            return rejections if batch else rejections[0]
+
+        try:
+            self.waited(ctxs=ctxs, seconds=seconds)
+            return func()
+        finally:
+            self.semaphore.release()
+
+    async def acall(
+        self,
+        ctxs: Sequence[RequestContext],
+        func: Callable[[], Awaitable[Any]],
+        batch: bool = False,
+    ) -> Any:
+        seconds = await self.acquire_async()
+        if seconds is None:
+            rejections = self.rejections(ctxs=ctxs)
+            return rejections if batch else rejections[0]
+
+        semaphore = self.async_semaphore()
+        try:
+            self.waited(ctxs=ctxs, seconds=seconds)
+            return await func()
+        finally:
+            semaphore.release()
+
+
+def limit(function: FUNC_TYPE, bulkhead: Bulkhead) -> FUNC_TYPE:
+    """
+    wraps a step so that every call of it goes through bulkhead.
+    """
+    if iscoroutinefunction(function):
+
+        @wraps(function)
+        async def async_caller(ctx: RequestContext) -> Response:
+            response: Response = await bulkhead.acall(
+                ctxs=(ctx,), func=partial(function, ctx=ctx)  # type: ignore
+            )
+            return response
+
+        return async_caller  # type: ignore
+
+    @wraps(function)
+    def caller(ctx: RequestContext) -> Response:
+        response: Response = bulkhead.call(
+            ctxs=(ctx,), func=partial(function, ctx=ctx)  # type: ignore
+        )
+        return response
+
+    call_batch = getattr(function, "call_batch", None)
+    if call_batch is not None:
+
+        def limited_batch(ctxs: List[RequestContext]) -> List[Response]:
+            responses: List[Response] = bulkhead.call(
+                ctxs=ctxs, func=lambda: call_batch(ctxs=ctxs), batch=True
+            )
+            return responses
+
+        caller.call_batch = limited_batch  # type: ignore
+
+    return caller
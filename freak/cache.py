@@ -0,0 +1,304 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import asyncio
+import hashlib
+import json
+import os
+import pickle  # nosec B403
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from freak.models.request import RequestContext
+from freak.models.response import Response
+
+"""
+    Step cache memoizes successful responses of pure steps, keyed by hash of
+    step (module and qualified name of its function, see scope) and input.
+    Responses are kept pickled, so every hit returns a fresh copy that
+    following steps are free to modify.
+
+    Memory tier is an LRU with optional TTL, disk tier (when a directory is
+    given) is shared by every process using same directory. Entries of disk
+    tier are unpickled as they are read, so directory must be writable only
+    by those trusted to run code in every process reading it.
+"""
+
+COUNTERS = (
+    "hits",
+    "disk_hits",
+    "misses",
+    "evictions",
+    "coalesced",
+    "uncacheable",
+)
+
+
+class StepCache:
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        directory: Optional[str] = None,
+    ) -> None:
+        if max_size < 1:
+            raise Exception("InvalidCacheSizeError")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.directory = directory
+
+        self.entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.lock = threading.Lock()
+        # calls in flight, concurrent calls with same key wait for them.
+        self.calls: Dict[str, Future] = {}  # type: ignore
+        self.tasks: Dict[Any, "asyncio.Future[Response]"] = {}
+
+    @staticmethod
+    def key(ctx: RequestContext, scope: str = "") -> Optional[str]:
+        """
+        steps of different flows may share a name along with a cache, scope
+        tells them apart. input which is not plain json has no stable key,
+        it is not cached and None is returned.
+        """
+        # layered data (see freak.handover) is keyed by its content.
+        data = ctx.input if isinstance(ctx.input, dict) else dict(ctx.input)
+        try:
+            content = json.dumps([scope, ctx.name, data], sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counters, size=len(self.entries))
+
+    def count(self, counter: str) -> None:
+        with self.lock:
+            self.counters[counter] += 1
+
+    def get(self, key: str) -> Optional[Response]:
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at is None or expires_at > now:
+                    self.entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    # pickled by set, or read from trusted disk tier.
+                    response: Response = pickle.loads(payload)  # nosec B301
+                    return response
+
+                del self.entries[key]
+                self.counters["evictions"] += 1
+
+        entry = self.read(key=key)
+        if entry is not None:
+            expires_at, payload = entry
+            if expires_at is None or expires_at > now:
+                self.store(key=key, entry=entry)
+                self.count(counter="disk_hits")
+                response = pickle.loads(payload)  # nosec B301
+                return response
+
+            self.remove(key=key)
+            self.count(counter="evictions")
+
+        self.count(counter="misses")
+        return None
+
+    def set(self, key: str, response: Response) -> None:
+        """
+        only successful responses are cached, responses which can not be
+        pickled are skipped.
+        """
+        if not response.success:
+            return
+
+        try:
+            payload = pickle.dumps(response)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        entry = (expires_at, payload)
+        self.store(key=key, entry=entry)
+        self.write(key=key, entry=entry)
+
+    def store(self, key: str, entry: Any) -> None:
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+        if self.directory and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".pickle"):
+                    self.remove(key=name[: -len(".pickle")])
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pickle")  # type: ignore
+
+    def read(self, key: str) -> Any:
+        if not self.directory:
+            return None
+
+        try:
+            # directory is trusted, it is writable only by processes
+            # sharing the cache (see module docstring).
+            with open(file=self.path(key=key), mode="rb") as file:
+                return pickle.load(file)  # nosec B301
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def write(self, key: str, entry: Any) -> None:
+        if not self.directory:
+            return
+
+        # like manifests, an entry that can not be written is skipped.
+        path = self.path(key=key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(file=temp_path, mode="wb") as file:
+                pickle.dump(entry, file)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def remove(self, key: str) -> None:
+        try:
+            os.remove(self.path(key=key))
+        except OSError:
+            pass
+
+    def call(
+        self,
+        ctx: RequestContext,
+        func: Callable[[], Response],
+        scope: str = "",
+    ) -> Response:
+        """
+        returns cached response for ctx, or calls func once for all
+        concurrent calls with same input.
+        """
+        key = self.key(ctx=ctx, scope=scope)
+        if key is None:
+            self.count(counter="uncacheable")
+            return func()
+
+        response = self.get(key=key)
+        if response is not None:
+            return response
+
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Future()
+            else:
+                self.counters["coalesced"] += 1
+
+        if not leader:
+            return self.copy(response=call.result())  # type: ignore
+
+        try:
+            response = func()
+            self.set(key=key, response=response)
+            call.set_result(response)  # type: ignore
+        except BaseException as err:
+            call.set_exception(err)  # type: ignore
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+        return response
+
+    async def acall(
+        self,
+        ctx: RequestContext,
+        func: Callable[[], Awaitable[Response]],
+        scope: str = "",
+    ) -> Response:
+        key = self.key(ctx=ctx, scope=scope)
+        if key is None:
+            self.count(counter="uncacheable")
+            return await func()
+
+        response = self.get(key=key)
+        if response is not None:
+            return response
+
+        # futures of a loop can only be awaited by that loop.
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+
+        task = self.tasks.get(task_key)
+        if task is not None:
+            self.count(counter="coalesced")
+            return self.copy(response=await asyncio.shield(task))
+
+        task = self.tasks[task_key] = loop.create_future()
+        try:
+            response = await func()
+            self.set(key=key, response=response)
+            task.set_result(response)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        except BaseException as err:
+            task.set_exception(err)
+            # waiters get the error, nobody may be waiting on it.
+            task.exception()
+            raise
+        finally:
+            del self.tasks[task_key]
+
+        return response
+
+    @staticmethod
+    def copy(response: Response) -> Response:
+        """
+        waiters of a coalesced call get their own copy of its response.
+        """
+        try:
+            # round trip of a response of this process.
+            copied: Response = pickle.loads(  # nosec B301
+                pickle.dumps(response)
+            )
+            return copied
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return response
+
+
+def scope(func: Any) -> str:
+    """
+    cache entries of a step are scoped by its function, which stays same
+    over processes sharing a disk tier.
+    """
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def build_cache(option: Any) -> Optional[StepCache]:
+    """
+    `cache=True` uses a default in-memory cache, a dict is passed to
+    StepCache as keyword arguments, and a StepCache instance is used as is.
+    """
+    if not option:
+        return None
+    if isinstance(option, StepCache):
+        return option
+    if isinstance(option, dict):
+        return StepCache(**option)
+    return StepCache()
@@ -0,0 +1,179 @@
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import asyncio
+import time
+from concurrent import futures
+from contextvars import copy_context
+from functools import partial, wraps
+
+from freak.models.request import RequestContext
+from freak.models.response import ErrorResponseContext, Response
+from freak.types import FUNC_TYPE
+
+"""
+    Cancellation of a run is cooperative. Engines check it before starting
+    every step, a run which was cancelled or outlived its deadline fails at
+    next step without performing it. Steps of a run can check it as well,
+    through `ctx.cancellation`.
+
+    Branches launched by a run get a cancellation of their own, child of the
+    one of their run. So a run which fails cancels its branches still in
+    flight, while a failed branch does not cancel its run.
+
+    `timeout=` on decorator of a step bounds a single call of it, deadline of
+    the run bounds it further. Threads can not be stopped, threaded engines
+    stop waiting for a step which timed out and leave it running on pool of
+    that step, whose calls which hang take up its threads until they return.
+    async engines bound calls of every step by deadline of the run, sync
+    steps they perform on a thread keep running the same way.
+"""
+
+CANCELLED = "CancelledError"
+DEADLINE_EXCEEDED = "DeadlineExceededError"
+TIMED_OUT = "StepTimeoutError"
+
+
+class Cancellation:
+
+    __slots__ = ("deadline", "parent", "reason")
+
+    def __init__(
+        self,
+        deadline: Optional[float] = None,
+        parent: Optional["Cancellation"] = None,
+    ) -> None:
+        """
+        deadline is a `time.monotonic()` timestamp, children never outlive
+        deadline of their parent.
+        """
+        if parent is not None and parent.deadline is not None:
+            if deadline is None or parent.deadline < deadline:
+                deadline = parent.deadline
+
+        self.deadline: Optional[float] = deadline
+        self.parent: Optional[Cancellation] = parent
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = CANCELLED) -> None:
+        if self.reason is None:
+            self.reason = reason
+
+    @property
+    def cancelled(self) -> Optional[str]:
+        """
+        reason run was cancelled for, None while it can go on.
+        """
+        cancellation: Optional[Cancellation] = self
+        while cancellation is not None:
+            if cancellation.reason is not None:
+                return cancellation.reason
+            cancellation = cancellation.parent
+
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return DEADLINE_EXCEEDED
+        return None
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+
+def deadline_in(seconds: float) -> float:
+    """
+    deadline `seconds` from now, as taken by `execute(deadline=...)`.
+    """
+    return time.monotonic() + seconds
+
+
+def cancelled(ctx: RequestContext, uid: str, reason: str) -> Response:
+    return ErrorResponseContext(input=ctx.input, messages=[f"{reason}: {uid}"])
+
+
+def budget(
+    ctxs: Sequence[RequestContext], timeout: Optional[float]
+) -> Tuple[Optional[float], str]:
+    """
+    seconds a call of a step may take, with reason it fails for past them.
+    """
+    seconds, reason = timeout, TIMED_OUT
+    for ctx in ctxs:
+        if ctx.cancellation is None:
+            continue
+        remaining = ctx.cancellation.remaining()
+        if remaining is not None and (seconds is None or remaining < seconds):
+            seconds, reason = max(remaining, 0.0), DEADLINE_EXCEEDED
+    return seconds, reason
+
+
+def time_out(
+    function: FUNC_TYPE,
+    uid: str,
+    timeout: Optional[float],
+    pool: Callable[[], futures.Executor],
+) -> FUNC_TYPE:
+    """
+    wraps a step of a threaded engine, calls are performed on pool and
+    waited for no longer than their budget. calls without any are performed
+    on calling thread.
+    """
+
+    def call(
+        ctxs: Sequence[RequestContext],
+        func: Callable[[], Any],
+        batch: bool = False,
+    ) -> Any:
+        seconds, reason = budget(ctxs=ctxs, timeout=timeout)
+        if seconds is None:
+            return func()
+
+        future = pool().submit(copy_context().run, func)
+        try:
+            return future.result(timeout=seconds)
+        except futures.TimeoutError:
+            future.cancel()
+            responses = [
+                cancelled(ctx=ctx, uid=uid, reason=reason) for ctx in ctxs
+            ]
+            return responses if batch else responses[0]
+
+    @wraps(function)
+    def caller(ctx: RequestContext) -> Response:
+        response: Response = call(
+            ctxs=(ctx,), func=partial(function, ctx=ctx)  # type: ignore
+        )
+        return response
+
+    call_batch = getattr(function, "call_batch", None)
+    if call_batch is not None:
+
+        def bounded_batch(ctxs: List[RequestContext]) -> List[Response]:
+            responses: List[Response] = call(
+                ctxs=ctxs, func=partial(call_batch, ctxs=ctxs), batch=True
+            )
+            return responses
+
+        caller.call_batch = bounded_batch  # type: ignore
+
+    return caller
+
+
+async def bound(
+    call: Any,
+    uid: str,
+    ctxs: Sequence[RequestContext],
+    timeout: Optional[float],
+    batch: bool = False,
+) -> Any:
+    """
+    awaits call of a step of an async engine no longer than its budget.
+    """
+    seconds, reason = budget(ctxs=ctxs, timeout=timeout)
+    if seconds is None:
+        return await call
+
+    try:
+        return await asyncio.wait_for(call, seconds)
+    except asyncio.TimeoutError:
+        responses = [cancelled(ctx=ctx, uid=uid, reason=reason) for ctx in ctxs]
+        return responses if batch else responses[0]
@@ -0,0 +1,192 @@
+from typing import Any, Callable, Dict, Mapping, Optional
+
+import abc
+import json
+import logging
+import os
+import sqlite3
+import time
+from threading import Lock
+
+from freak.handover import plain
+from freak.types import Checkpoint
+
+"""
+    Checkpoint stores keep the latest checkpoint of every run, engines save
+    one after every successful step so that a run can be resumed from it.
+
+    Writes are group committed, checkpoints are buffered (a newer checkpoint
+    of a run replaces a buffered one) and written in one transaction once
+    batch_size runs are pending, flush_interval seconds have passed, or a
+    run returns. A crash loses at most the buffered checkpoints, resumed
+    runs then repeat steps performed after their last written checkpoint.
+
+    Checkpoints are JSON, `default=` of a store converts other values data
+    holds (see json.dumps). A checkpoint which can not be serialized is
+    logged and skipped, its run goes on and would be resumed from an
+    earlier checkpoint.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore(abc.ABC):
+    def __init__(
+        self,
+        batch_size: int = 64,
+        flush_interval: float = 1.0,
+        default: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.default = default
+
+        # run_id -> serialized checkpoint, waiting to be written.
+        self.pending: Dict[str, str] = {}
+        self.lock = Lock()
+        # writes (and reads) of backend happen under flush_lock, in order.
+        self.flush_lock = Lock()
+        self.last_flush = time.monotonic()
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        # data is serialized right away, following steps may modify it.
+        try:
+            payload = json.dumps(checkpoint.__dict__, default=self.encode)
+        except (TypeError, ValueError) as err:
+            logger.warning(
+                "checkpoint of run %s skipped: %s", checkpoint.run_id, err
+            )
+            return
+
+        with self.lock:
+            self.pending[checkpoint.run_id] = payload
+            due = (
+                len(self.pending) >= self.batch_size
+                or time.monotonic() - self.last_flush >= self.flush_interval
+            )
+
+        if due:
+            self.flush()
+
+    def encode(self, value: Any) -> Any:
+        if isinstance(value, Mapping) or self.default is None:
+            return plain(value)
+        return self.default(value)
+
+    def flush(self) -> None:
+        with self.flush_lock:
+            with self.lock:
+                pending, self.pending = self.pending, {}
+                self.last_flush = time.monotonic()
+
+            if pending:
+                self.write(entries=pending)
+
+    def load(self, run_id: str) -> Optional[Checkpoint]:
+        with self.flush_lock:
+            with self.lock:
+                payload = self.pending.get(run_id)
+
+            if payload is None:
+                payload = self.read(run_id=run_id)
+
+        if payload is None:
+            return None
+        return Checkpoint(**json.loads(payload))
+
+    def close(self) -> None:
+        self.flush()
+
+    @abc.abstractmethod
+    def write(self, entries: Dict[str, str]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def read(self, run_id: str) -> Optional[str]:
+        pass
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    def __init__(self, path: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints "
+            "(run_id TEXT PRIMARY KEY, payload TEXT NOT NULL)"
+        )
+        self.connection.commit()
+
+    def write(self, entries: Dict[str, str]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO checkpoints (run_id, payload) "
+                "VALUES (?, ?)",
+                entries.items(),
+            )
+
+    def read(self, run_id: str) -> Optional[str]:
+        row = self.connection.execute(
+            "SELECT payload FROM checkpoints WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        super().close()
+        with self.flush_lock:
+            self.connection.close()
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    appends checkpoints to a JSON lines file, latest checkpoint of every run
+    is indexed in memory when store is opened.
+    """
+
+    def __init__(self, path: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.path = path
+        self.index: Dict[str, str] = {}
+
+        if os.path.exists(path):
+            with open(file=path, mode="r+b") as file:
+                end = 0
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        # last line left incomplete by a crash, cut off so
+                        # that next checkpoint is not appended onto it.
+                        file.truncate(end)
+                        break
+                    end += len(line)
+                    try:
+                        run_id = json.loads(line)["run_id"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    self.index[run_id] = line.decode().rstrip("\n")
+
+    def write(self, entries: Dict[str, str]) -> None:
+        with open(file=self.path, mode="at") as file:
+            file.writelines(f"{payload}\n" for payload in entries.values())
+            file.flush()
+            os.fsync(file.fileno())
+        self.index.update(entries)
+
+    def read(self, run_id: str) -> Optional[str]:
+        return self.index.get(run_id)
+
+    def compact(self) -> None:
+        """
+        rewrites file with only latest checkpoint of every run.
+        """
+        self.flush()
+        with self.flush_lock:
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(file=temp_path, mode="wt") as file:
+                file.writelines(
+                    f"{payload}\n" for payload in self.index.values()
+                )
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
@@ -0,0 +1,223 @@
+from typing import Any, Callable, Dict, List, MutableSequence, Optional, Tuple
+
+from freak.handover import build_handover
+from freak.models.request import RequestContext
+from freak.models.response import Response
+from freak.models.state import RunState
+from freak.plan import NO_STEP, Plan
+from freak.types import Step
+
+KEEP = Callable[[MutableSequence[Any], Response, Step], None]
+
+"""
+    Code generation turns a plan into python functions which perform steps
+    as direct calls, so that a run does not go through engine hooks between
+    steps.
+
+    A segment performs a chain of steps starting at one step, up to a step
+    with more than one following step, where it branches on `choice` of the
+    response and returns the chosen step, whose segment is performed next.
+    Segments never call each other, so a run does not grow the stack however
+    many choices it makes. Every segment keeps responses of its steps in
+    `responses` by retention of run, exactly like the interpreted engine
+    does, and returns `(state, to_step, last_successful_step, following,
+    data)`, to_step being position of last performed step in plan and
+    following NO_STEP once run is over.
+
+    Code is generated from the plan whenever an engine is compiled, it is
+    never read back from a cache.
+"""
+
+# how engine moves between steps, see Engine.codegen.
+KINDS = ("linear", "choice")
+
+SEGMENT = Callable[
+    [Dict[str, Any], RunState, MutableSequence[Any], KEEP, int],
+    Tuple[RunState, int, int, int, Dict[str, Any]],
+]
+
+HOOKS = ("get_following_steps", "get_next_step", "after_step")
+
+
+def codegen_kind(engine: Any) -> Optional[str]:
+    """
+    kind of code engine can be compiled to, None if a subclass changed how
+    steps follow each other after the class which declared its kind.
+    """
+    engine_class = type(engine)
+    if engine.asynchronous:
+        return None
+
+    for owner in engine_class.__mro__:
+        if "codegen" in owner.__dict__:
+            break
+    else:  # pragma: no cover
+        return None
+
+    kind: Optional[str] = owner.__dict__["codegen"]
+    if kind not in KINDS:
+        return None
+
+    for hook in HOOKS:
+        if getattr(engine_class, hook) is not getattr(owner, hook):
+            return None
+    return kind
+
+
+def heads(plan: Plan, kind: str) -> List[int]:
+    """
+    steps segments start at, roots and steps which can be chosen.
+    """
+    starts = sorted(plan.roots)
+    if kind == "choice":
+        for following in plan.successors:
+            if len(following) > 1:
+                starts.extend(following)
+    return starts
+
+
+def generate_segment(plan: Plan, kind: str, head: int, handover: str) -> str:
+    # data handed over to next step, see freak.handover.
+    handed_over = (
+        "response.input" if handover == "input" else "hand_over(response)"
+    )
+    lines = [
+        f"def segment_{head}(data, state, responses, keep, last):",
+    ]
+    append = lines.append
+    step = head
+    while True:
+        uid = plan.uids[step]
+        name, order = plan.steps[step].name, plan.steps[step].order
+        append(f"    # {uid!r}")
+        append(
+            f"    response = function_{step}("
+            f"ctx=RequestContext(data, {name!r}, {order}))"
+        )
+        append(f"    keep(responses, response, step_{step})")
+        append("    if not response.success:")
+        append(f"        return state, {step}, last, {NO_STEP}, data")
+
+        following = plan.successors[step]
+        if not following:
+            append(
+                f"    return RunState(({uid!r}, (), state.trail), {uid!r}), "
+                f"{step}, {order}, {NO_STEP}, data"
+            )
+            break
+
+        if kind == "choice" and len(following) > 1:
+            append("    choice = response.choice")
+            for child in following:
+                child_uid = plan.uids[child]
+                append(f"    if choice == {child_uid!r}:")
+                append(f"        data = {handed_over}")
+                append(
+                    f"        return RunState(({uid!r}, ({child_uid!r},), "
+                    f"state.trail), {uid!r}), {step}, {order}, {child}, data"
+                )
+            append("    if choice:")
+            append('        raise Exception("InvalidChoice")')
+            append("    raise AssertionError()")
+            break
+
+        child = following[0]
+        child_uid = plan.uids[child]
+        if kind == "choice":
+            append(
+                f"    if response.choice and response.choice != {child_uid!r}:"
+            )
+            append('        raise Exception("InvalidChoice")')
+        append(
+            f"    state = RunState(({uid!r}, ({child_uid!r},), state.trail), "
+            f"{uid!r})"
+        )
+        append(f"    data = {handed_over}")
+        append(f"    last = {order}")
+
+        # linear engines refuse to move to a step followed by more than one.
+        if kind == "linear" and len(plan.successors[child]) > 1:
+            append('    raise Exception("NotAllowed")')
+            break
+
+        step = child
+
+    return "\n".join(lines) + "\n"
+
+
+def generate(plan: Plan, kind: str, handover: str) -> str:
+    """
+    source of segments starting at heads of plan.
+    """
+    return "\n\n".join(
+        generate_segment(plan=plan, kind=kind, head=head, handover=handover)
+        for head in heads(plan=plan, kind=kind)
+    )
+
+
+class CompiledFlow:
+    """
+    segments of a plan, segments starting at a step which is not a head are
+    generated on first use.
+    """
+
+    def __init__(
+        self, plan: Plan, kind: str, source: str, handover: str
+    ) -> None:
+        self.plan = plan
+        self.kind = kind
+        self.source = source
+        self.handover = handover
+        self.namespace: Dict[str, Any] = {
+            "RequestContext": RequestContext,
+            "RunState": RunState,
+            "hand_over": build_handover(option=handover),
+        }
+        for position, step in enumerate(plan.steps):
+            self.namespace[f"function_{position}"] = step.function
+            self.namespace[f"step_{position}"] = step
+        self.load(source=source)
+
+    def load(self, source: str) -> None:
+        # source is made by generate from plan, never from input of a run.
+        # uids and names of steps are embedded by repr, so they stay strings.
+        exec(  # nosec B102
+            compile(source, f"<freak segments {self.kind}>", "exec"),
+            self.namespace,
+        )
+
+    def run(
+        self,
+        step: int,
+        data: Dict[str, Any],
+        state: RunState,
+        responses: MutableSequence[Any],
+        keep: KEEP,
+        last: int,
+    ) -> Tuple[RunState, int, int]:
+        """
+        performs segments of a run one after another, starting at step.
+        returns state, position of last performed step and order of last
+        successful step.
+        """
+        following = step
+        while following != NO_STEP:
+            segment = self.segment(step=following)
+            state, step, last, following, data = segment(
+                data, state, responses, keep, last
+            )
+        return state, step, last
+
+    def segment(self, step: int) -> SEGMENT:
+        segment: Optional[SEGMENT] = self.namespace.get(f"segment_{step}")
+        if segment is None:
+            self.load(
+                source=generate_segment(
+                    plan=self.plan,
+                    kind=self.kind,
+                    head=step,
+                    handover=self.handover,
+                )
+            )
+            segment = self.namespace[f"segment_{step}"]
+        return segment
@@ -1,34 +1,376 @@
-from typing import Any, Dict, List, Optional, Tuple
-
-import copy
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    overload,
+)
+
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from dataclasses import replace
+from functools import partial
 from importlib import import_module
-from inspect import getabsfile
-
+from inspect import getabsfile, iscoroutinefunction
+from threading import Lock
+
+from freak.bulkhead import Bulkhead, limit
+from freak.cancellation import Cancellation, bound, cancelled, time_out
+from freak.checkpoint import CheckpointStore
+from freak.codegen import CompiledFlow, codegen_kind, generate
+from freak.graph import find_cycle
+from freak.handover import build_handover
+from freak.hedging import Hedge, hedged
+from freak.manifest import (
+    Manifest,
+    is_cache_enabled,
+    load_manifest,
+    save_manifest,
+)
+from freak.metrics import MetricsRegistry, instrument
 from freak.models.request import FetchSchemaRequestContext, RequestContext
 from freak.models.response import EngineResponse, Response
-from freak.types import LOCATOR_TYPE, Flow, Step
-from freak.utils import validate_flow
+from freak.models.state import RunState
+from freak.plan import NO_STEP, compile_plan
+from freak.retention import KEEP_NONE, RETENTION, Retention, build_retention
+from freak.run import Run
+from freak.tracing import Tracer, trace
+from freak.types import FUNC_TYPE, LOCATOR_TYPE, Checkpoint, Flow, Step
+from freak.utils import completed
 
 
 class Engine:
+    asynchronous = False
+    # code runs are compiled to, see freak.codegen. subclasses changing how
+    # steps follow each other are interpreted unless they declare their own.
+    codegen: Optional[str] = "linear"
+    # runs which fail cancel branches they launched, see freak.cancellation.
+    cancel_branches = False
+
     def __init__(
         self,
         module_name: str,
         decorator_name: str,
+        max_workers: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        timings: bool = False,
+        tracer: Optional[Tracer] = None,
+        compiled: bool = False,
+        handover: str = "input",
+        max_concurrency: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        step_timeout: Optional[float] = None,
     ) -> None:
+        """
+        flow manifest is loaded from cache_dir (or next to flow module) when
+        it is up to date, otherwise flow module is located and manifest is
+        written for next start.
+
+        with a checkpoint_store, runs are checkpointed after every successful
+        step and can be resumed by their run_id. branches of a parallel run
+        are checkpointed under an id of their own, see branch_run_id.
+
+        with a metrics registry, timings and failures of every step are
+        recorded into it. with timings set, timings of a step are attached
+        to its responses as well.
+
+        with a tracer, runs, steps, their phases and branches are recorded
+        as spans.
+
+        with compiled set, execute runs code generated for the flow instead
+        of walking the plan. runs are interpreted when engine can not be
+        compiled, or with a checkpoint store or a tracer.
+
+        handover tells what a step passes on to next step, input of its
+        response ("input") or output of it layered over its input
+        ("overlay"), see freak.handover.
+
+        max_concurrency limits calls of every step in flight at once, over
+        every run of the engine, and queue_timeout how long a call waits for
+        a slot before it fails. `max_concurrency=` and `queue_timeout=` on
+        decorator of a step override them, see freak.bulkhead.
+
+        step_timeout bounds a single call of every step, in seconds, unless
+        `timeout=` on decorator of a step overrides it. a call which does
+        not return in time fails the run, see freak.cancellation. threads
+        can not be stopped, a call which timed out keeps running on pool
+        of its step, see step_pool.
+
+        steps marked `idempotent=True` can be hedged with `hedge_after_ms=`
+        on their decorator, see freak.hedging and hedge_stats.
+        """
         self.locator = self.locator_generator(flow_name=decorator_name)
-        self.flow = self.butler_generator(
-            locator=self.locator,
-            module_name=module_name,
-            decorator_name=decorator_name,
-        )
+        self.handover = handover
+        self.hand_over = build_handover(option=handover)
+
+        module = import_module(name=module_name)
+        file_path = getabsfile(object=module)
+
+        manifest = None
+        if is_cache_enabled():
+            manifest = load_manifest(
+                file_path=file_path,
+                decorator=decorator_name,
+                cache_dir=cache_dir,
+            )
+
+        flow = None
+        if manifest and manifest.valid:
+            flow = manifest.to_flow(module=module)
+
+        if flow:
+            self.flow = flow
+        else:
+            self.flow = self.butler_generator(
+                locator=self.locator,
+                module_name=module_name,
+                decorator_name=decorator_name,
+            )
 
-        is_flow_valid = validate_flow(step_graph=self.flow.predecessor)
-        if not is_flow_valid:
-            raise Exception("FlowShouldBeDAGError")
+            # flows which are not valid are never cached.
+            cycle = find_cycle(step_graph=self.flow.predecessor)
+            if cycle:
+                raise Exception("FlowShouldBeDAGError", cycle)
+
+            self.flow.schemas = self.collect_schemas()
+
+            if is_cache_enabled():
+                save_manifest(
+                    manifest=Manifest.from_flow(
+                        flow=self.flow,
+                        decorator=decorator_name,
+                        valid=True,
+                        file_path=file_path,
+                    ),
+                    file_path=file_path,
+                    cache_dir=cache_dir,
+                )
+
+        self.plan = compile_plan(flow=self.flow)
+        if self.plan.coroutines and not self.asynchronous:
+            raise Exception("AsyncStepError")
 
         self.module_name = module_name
         self.decorator_name = decorator_name
+        self.metrics = metrics
+        self.tracer = tracer
+        self.timings = timings
+        self.bulkheads = tuple(
+            self.build_bulkhead(
+                step=step,
+                max_concurrency=max_concurrency,
+                queue_timeout=queue_timeout,
+            )
+            for step in self.plan.steps
+        )
+        self.timeouts: Tuple[Optional[float], ...] = tuple(
+            step.options.get("timeout", step_timeout)
+            for step in self.plan.steps
+        )
+        self.hedges = tuple(
+            self.build_hedge(step=step) for step in self.plan.steps
+        )
+        if (
+            metrics is not None
+            or timings
+            or tracer is not None
+            or any(self.bulkheads)
+            or (
+                not self.asynchronous
+                and (
+                    any(timeout is not None for timeout in self.timeouts)
+                    or any(self.hedges)
+                )
+            )
+        ):
+            self.plan = replace(
+                self.plan,
+                steps=tuple(
+                    step._replace(
+                        function=self.wrap_step(
+                            step=step,
+                            timings=timings,
+                            bulkhead=bulkhead,
+                            timeout=timeout,
+                            hedge=hedge,
+                        )
+                    )
+                    for step, bulkhead, timeout, hedge in zip(
+                        self.plan.steps,
+                        self.bulkheads,
+                        self.timeouts,
+                        self.hedges,
+                    )
+                ),
+            )
+
+        self.compiled: Optional[CompiledFlow] = None
+        kind = codegen_kind(engine=self) if compiled else None
+        if kind and checkpoint_store is None and tracer is None:
+            self.compiled = self.compile(kind=kind)
+
+        # pool is shared by every run of the engine, it is created on first use.
+        self.max_workers = max_workers
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.step_executors: Dict[str, ThreadPoolExecutor] = {}
+        self.executor_lock = Lock()
+
+        self.checkpoint_store = checkpoint_store
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self.executor is None:
+            with self.executor_lock:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="freak",
+                    )
+        return self.executor
+
+    def step_pool(self, uid: str) -> ThreadPoolExecutor:
+        """
+        steps which may time out or be hedged are performed on pools of
+        their own, one for every step, runs of branches waiting for them on
+        engine pool could exhaust it. calls which timed out keep running on
+        a pool, so calls of a step which hang only hold up that step.
+        """
+        pool = self.step_executors.get(uid)
+        if pool is None:
+            with self.executor_lock:
+                pool = self.step_executors.get(uid)
+                if pool is None:
+                    pool = self.step_executors[uid] = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=f"freak-{uid}",
+                    )
+        return pool
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        with wait set, waits for calls which timed out as well.
+        """
+        with self.executor_lock:
+            executor, self.executor = self.executor, None
+            pools = list(self.step_executors.values())
+            self.step_executors.clear()
+
+        for pool in (executor, *pools):
+            if pool is not None:
+                pool.shutdown(wait=wait)
+
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.flush()
+
+    def build_bulkhead(
+        self,
+        step: Step,
+        max_concurrency: Optional[int],
+        queue_timeout: Optional[float],
+    ) -> Optional[Bulkhead]:
+        limit = step.options.get("max_concurrency", max_concurrency)
+        if limit is None:
+            return None
+        return Bulkhead(
+            uid=step.uid,
+            limit=limit,
+            queue_timeout=step.options.get("queue_timeout", queue_timeout),
+            timed=self.metrics is not None or self.timings,
+        )
+
+    def build_hedge(self, step: Step) -> Optional[Hedge]:
+        after_ms = step.options.get("hedge_after_ms")
+        if after_ms is None:
+            return None
+        # a hedged step may be performed twice for a single call.
+        if not step.options.get("idempotent"):
+            raise Exception("HedgeNotIdempotentError", step.uid)
+        return Hedge(
+            uid=step.uid,
+            after_ms=after_ms,
+            fraction=step.options.get("hedge_percentile", 0.95),
+        )
+
+    def hedge_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        hedges issued and won by every hedged step, with its current delay.
+        """
+        return {
+            hedge.uid: hedge.stats()
+            for hedge in self.hedges
+            if hedge is not None
+        }
+
+    def wrap_step(
+        self,
+        step: Step,
+        timings: bool,
+        bulkhead: Optional[Bulkhead] = None,
+        timeout: Optional[float] = None,
+        hedge: Optional[Hedge] = None,
+    ) -> FUNC_TYPE:
+        """
+        every attempt of a hedged step takes a slot of its bulkhead, timeout
+        bounds a call with all its attempts.
+
+        async engines take a slot of bulkhead of a step which is not a
+        coroutine before it is offloaded, see AsyncEngine.offload, and bound
+        and hedge calls of every step themselves, see AsyncEngine.call_step.
+        """
+        function: FUNC_TYPE = step.function  # type: ignore
+        if self.metrics is not None or timings:
+            function = instrument(
+                function=function,
+                flow=self.module_name,
+                uid=step.uid,
+                registry=self.metrics,
+                attach=timings,
+            )
+        if bulkhead is not None and (
+            not self.asynchronous or iscoroutinefunction(function)
+        ):
+            function = limit(function=function, bulkhead=bulkhead)
+        if hedge is not None and not self.asynchronous:
+            function = hedged(
+                function=function,
+                hedge=hedge,
+                timeout=timeout,
+                pool=partial(self.step_pool, uid=step.uid),
+            )
+        elif timeout is not None and not self.asynchronous:
+            function = time_out(
+                function=function,
+                uid=step.uid,
+                timeout=timeout,
+                pool=partial(self.step_pool, uid=step.uid),
+            )
+        if self.tracer is not None:
+            function = trace(function=function, uid=step.uid)
+        return function
+
+    def compile(self, kind: str) -> CompiledFlow:
+        """
+        code is generated from plan on every start, it costs less than
+        locating the flow does and nothing generated is read back from disk.
+        """
+        return CompiledFlow(
+            plan=self.plan,
+            kind=kind,
+            source=generate(plan=self.plan, kind=kind, handover=self.handover),
+            handover=self.handover,
+        )
 
     def locator_generator(self, flow_name: str) -> LOCATOR_TYPE:
         flow_module_name = f"freak.flows.{flow_name}"
@@ -46,119 +388,567 @@ class Engine:
         )
 
     def get_step(self, from_step: Optional[str]) -> Step:
-        step_definitions = self.flow.successor
-
-        if not from_step:
-            # pick up root of flow.
-            from_step = self.flow.predecessor[from_step][0]
-
-        step = step_definitions.get(from_step)
-        if not step:
-            raise Exception("InvalidStepError")
-        return step
+        return self.plan.steps[self.plan.locate(uid=from_step)]
 
-    def get_next_step_uid(
-        self, resp_ctx: Response, next_steps: List[str]
-    ) -> str:
+    def get_next_step(
+        self, resp_ctx: Response, next_steps: Tuple[int, ...]
+    ) -> int:
         assert len(next_steps) == 1
 
         return next_steps[0]
 
     def get_following_steps(
-        self, from_step: Optional[str], path_traversed: Dict[str, Any]
-    ) -> List[str]:
-        step_graph = self.flow.predecessor
-        if not from_step:
-            # pick up root of flow.
-            from_step = step_graph[from_step][0]
-
-        next_steps = step_graph.get(from_step, [])
+        self, from_step: int, last_step: int
+    ) -> Tuple[int, ...]:
+        next_steps = self.plan.successors[from_step]
         if len(next_steps) > 1:
             # assert self.parallel is True or self.choice is True
             raise Exception("NotAllowed")
 
-        last_step = path_traversed.get("last_step", "")
-        if from_step not in step_graph.get(last_step, []) and last_step:
+        if last_step != NO_STEP and not self.plan.is_edge(
+            parent=last_step, child=from_step
+        ):
             raise Exception("CannotExecuteError")
 
         return next_steps
 
+    def after_step(self, run: Run) -> None:
+        """
+        runs once current step of the run has been performed, before its
+        result is recorded.
+        """
+
+    def perform(self, step: Step, ctx: RequestContext) -> Response:
+        """
+        performs step, unless its run has been cancelled.
+        """
+        cancellation = ctx.cancellation
+        if cancellation is not None:
+            reason = cancellation.cancelled
+            if reason is not None:
+                return cancelled(ctx=ctx, uid=step.uid, reason=reason)
+
+        response: Response = step.function(ctx=ctx)  # type: ignore
+        return response
+
+    def execute_batch(
+        self, step: Step, ctxs: List[RequestContext]
+    ) -> List[Response]:
+        """
+        records of runs which have been cancelled drop out of the batch.
+        """
+        reasons = [
+            ctx.cancellation.cancelled if ctx.cancellation is not None else None
+            for ctx in ctxs
+        ]
+        if not any(reasons):
+            return self.perform_batch(step=step, ctxs=ctxs)
+
+        live = [ctx for ctx, reason in zip(ctxs, reasons) if not reason]
+        performed = iter(
+            self.perform_batch(step=step, ctxs=live) if live else []
+        )
+        return [
+            cancelled(ctx=ctx, uid=step.uid, reason=reason)
+            if reason
+            else next(performed)
+            for ctx, reason in zip(ctxs, reasons)
+        ]
+
+    def perform_batch(
+        self, step: Step, ctxs: List[RequestContext]
+    ) -> List[Response]:
+        call_batch = getattr(step.function, "call_batch", None)
+        if call_batch is None:
+            return [step.function(ctx=ctx) for ctx in ctxs]  # type: ignore
+
+        responses: List[Response] = call_batch(ctxs=ctxs)
+        return responses
+
     def execute(
         self,
         from_step: Optional[str],
         data: Dict[str, Any],
-        executed_steps: Dict[str, Any] = {"traversed": {}, "last_step": ""},
-    ) -> Tuple[EngineResponse, Dict[str, Any]]:
-        path_traversed = copy.deepcopy(executed_steps)
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        join: bool = True,
+        run_id: Optional[str] = None,
+        retention: RETENTION = "all",
+        deadline: Optional[float] = None,
+        cancellation: Optional[Cancellation] = None,
+    ) -> Tuple[EngineResponse, RunState]:
+        """
+        parallel branches launched by the run are attached to its response,
+        with join=False they may still be running when execute returns.
+
+        retention tells which responses are kept, "all", "failures",
+        "summaries" (uid, order, success and messages of every step) or a
+        number of last responses to keep. see freak.retention.
+
+        deadline is a `time.monotonic()` timestamp (see `deadline_in`), steps
+        are not started past it. cancellation is the one of the run which
+        launched this one, if any. see freak.cancellation.
+        """
+        if (
+            self.compiled is not None
+            and deadline is None
+            and cancellation is None
+        ):
+            return self.execute_compiled(
+                from_step=from_step,
+                data=data,
+                executed_steps=executed_steps,
+                run_id=run_id,
+                retention=build_retention(option=retention),
+            )
 
-        step = self.get_step(from_step=from_step)
-        next_steps = self.get_following_steps(
+        run = Run(
+            engine=self,
             from_step=from_step,
-            path_traversed=path_traversed,
-        )
-
-        responses = []
-        last_successful_step, to_step, from_ = (
-            step.order,
-            step.order,
-            step.order,
+            data=data,
+            executed_steps=executed_steps,
+            run_id=run_id,
+            retention=build_retention(option=retention),
+            deadline=deadline,
+            cancellation=cancellation,
         )
 
         while True:
-            ctx = RequestContext(input=data, name=step.name, order=step.order)
-
-            resp_ctx = step.function(ctx=ctx)  # type: ignore
-            responses.append(resp_ctx)
-            to_step = step.order  # this will refer to last performed step.
-            if not resp_ctx.success:
+            resp_ctx = self.perform(step=run.step, ctx=run.context())
+            if not run.record(resp_ctx=resp_ctx):
                 break
 
-            path_traversed["traversed"][step.uid] = next_steps
-            path_traversed["last_step"] = step.uid
+        self.flush_checkpoints()
+        result = run.result()
+        if join:
+            result[0].join()
+        return result
 
-            data = resp_ctx.input
+    def execute_compiled(
+        self,
+        from_step: Optional[str],
+        data: Dict[str, Any],
+        executed_steps: Optional[Mapping[str, Any]],
+        run_id: Optional[str],
+        retention: Retention,
+    ) -> Tuple[EngineResponse, RunState]:
+        """
+        same checks as a run makes before its first step, rest of the run is
+        done by segment of first step.
+        """
+        plan = self.plan
+        current = plan.locate(uid=from_step)
+        state = RunState.coerce(executed_steps=executed_steps)
+        self.get_following_steps(
+            from_step=current, last_step=plan.locate_last(uid=state.last_step)
+        )
 
-            # this will refer last successfully performed action.
-            last_successful_step = step.order
+        order = plan.steps[current].order
+        responses = retention.container()
+        state, to_step, last_successful_step = self.compiled.run(  # type: ignore
+            step=current,
+            data=data,
+            state=state,
+            responses=responses,
+            keep=retention.keep,
+            last=order,
+        )
+        return (
+            EngineResponse(
+                responses=list(responses),
+                from_step=order,
+                to_step=plan.steps[to_step].order,
+                last_successful_step=last_successful_step,
+                run_id=run_id,
+                to_uid=plan.uids[to_step],
+            ),
+            state,
+        )
 
-            if not next_steps:
-                break
+    def stream(
+        self,
+        from_step: Optional[str],
+        data: Dict[str, Any],
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        join: bool = True,
+        run_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Iterator[Tuple[Response, RunState]]:
+        """
+        yields response of every step as soon as it is performed, with state
+        of run after it. responses are not kept, closing the generator stops
+        the run before next step.
+        """
+        run = Run(
+            engine=self,
+            from_step=from_step,
+            data=data,
+            executed_steps=executed_steps,
+            run_id=run_id,
+            retention=KEEP_NONE,
+            deadline=deadline,
+        )
 
-            next_step_uid = self.get_next_step_uid(
-                resp_ctx=resp_ctx, next_steps=next_steps
+        try:
+            while True:
+                resp_ctx = self.perform(step=run.step, ctx=run.context())
+                proceed = run.record(resp_ctx=resp_ctx)
+                yield resp_ctx, run.state
+                if not proceed:
+                    break
+        finally:
+            run.finish()
+            self.flush_checkpoints()
+
+        if join:
+            run.result()[0].join()
+
+    def execute_many(
+        self,
+        from_step: Optional[str],
+        records: Iterable[Dict[str, Any]],
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        join: bool = True,
+        retention: RETENTION = "all",
+        deadline: Optional[float] = None,
+    ) -> List[Tuple[EngineResponse, RunState]]:
+        """
+        executes flow for every record, step by step. every step receives
+        all records which reached it in one batch, records drop out of the
+        batch at the step they failed.
+        """
+        runs = [
+            Run(
+                engine=self,
+                from_step=from_step,
+                data=data,
+                executed_steps=executed_steps,
+                retention=build_retention(option=retention),
+                deadline=deadline,
             )
+            for data in records
+        ]
+
+        batches = deque([runs] if runs else [])
+        while batches:
+            batch = batches.popleft()
+            step = batch[0].step
 
-            next_steps = self.get_following_steps(
-                from_step=next_step_uid,
-                path_traversed=path_traversed,
+            responses = self.execute_batch(
+                step=step, ctxs=[run.context() for run in batch]
             )
-            step = self.get_step(from_step=next_step_uid)
 
-        return (
-            EngineResponse(
-                responses=responses,
-                from_step=from_,
-                to_step=to_step,
-                last_successful_step=last_successful_step,
-            ),
-            path_traversed,
+            # partition remaining records by step they have moved to.
+            following: Dict[int, List[Run]] = {}
+            for run, resp_ctx in zip(batch, responses):
+                if run.record(resp_ctx=resp_ctx):
+                    following.setdefault(run.current, []).append(run)
+
+            batches.extend(following.values())
+
+        self.flush_checkpoints()
+        results = [run.result() for run in runs]
+        if join:
+            for output, _ in results:
+                output.join()
+        return results
+
+    def flush_checkpoints(self) -> None:
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.flush()
+
+    def load_checkpoint(self, run_id: str) -> Checkpoint:
+        if self.checkpoint_store is None:
+            raise Exception("CheckpointStoreMissingError")
+
+        checkpoint = self.checkpoint_store.load(run_id=run_id)
+        if checkpoint is None:
+            raise Exception("CheckpointNotFoundError", run_id)
+        if checkpoint.from_step is None:
+            raise Exception("RunFinishedError", run_id)
+        return checkpoint
+
+    def resume(
+        self, run_id: str, join: bool = True
+    ) -> Tuple[EngineResponse, RunState]:
+        """
+        continues a run from step following its last checkpoint.
+        """
+        checkpoint = self.load_checkpoint(run_id=run_id)
+        return self.execute(
+            from_step=checkpoint.from_step,
+            data=checkpoint.data,
+            executed_steps=checkpoint.executed_steps,
+            join=join,
+            run_id=run_id,
+        )
+
+    def collect_schemas(self) -> Dict[str, Any]:
+        schemas = {}
+        for uid, step in self.flow.successor.items():
+            fetch_schema = getattr(step.function, "fetch_schema", None)
+            if fetch_schema:
+                resp_ctx = fetch_schema()
+            else:
+                ctx = FetchSchemaRequestContext(
+                    name=step.name, order=step.order
+                )
+                resp_ctx = step.function(ctx=ctx)  # type: ignore
+            schemas[uid] = resp_ctx.output["schema"]
+        return schemas
+
+    @property
+    def etag(self) -> str:
+        return self.plan.etag
+
+    @overload
+    def inspect(self, if_none_match: None = None) -> Dict[str, Any]:
+        ...
+
+    @overload
+    def inspect(self, if_none_match: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    def inspect(
+        self, if_none_match: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        graph and input schemas of flow, collected once when flow is located.
+        returns None if if_none_match is etag of current flow, i.e. caller
+        already holds latest response. every response is a copy, callers
+        may change it.
+        """
+        if if_none_match == self.plan.etag:
+            return None
+
+        return {**deepcopy(self.plan.inspection), "etag": self.plan.etag}
+
+
+class AsyncEngine(Engine):
+    """
+    executes flows on an event loop. steps defined with `async def` are
+    awaited, regular steps are offloaded to the engine pool.
+    """
+
+    asynchronous = True
+
+    async def call_step(self, step: int, ctx: RequestContext) -> Response:
+        """
+        a call of a step is bounded by timeout of the step and deadline of
+        its run, steps of a cancelled run are not called.
+        """
+        cancellation = ctx.cancellation
+        if cancellation is not None:
+            reason = cancellation.cancelled
+            if reason is not None:
+                return cancelled(
+                    ctx=ctx, uid=self.plan.uids[step], reason=reason
+                )
+
+        hedge = self.hedges[step]
+        call: Awaitable[Response]
+        if hedge is not None:
+            call = hedge.acall(ctx=ctx, launch=partial(self.launch, step))
+        else:
+            call = self.launch(step=step, ctx=ctx)
+
+        timeout = self.timeouts[step]
+        if timeout is None and cancellation is None:
+            response: Response = await call
+            return response
+
+        response = await bound(
+            call=call, uid=self.plan.uids[step], ctxs=(ctx,), timeout=timeout
+        )
+        return response
+
+    def launch(self, step: int, ctx: RequestContext) -> Awaitable[Response]:
+        """
+        call of a step to await, steps which are not coroutines are offloaded.
+        """
+        function = self.plan.steps[step].function
+        if step in self.plan.coroutines:
+            return function(ctx=ctx)  # type: ignore
+        return self.offload(
+            step=step,
+            ctxs=(ctx,),
+            func=partial(function, ctx=ctx),  # type: ignore
+        )
+
+    async def offload(
+        self,
+        step: int,
+        ctxs: Sequence[RequestContext],
+        func: Callable[[], Any],
+        batch: bool = False,
+    ) -> Any:
+        """
+        runs func on engine pool, or on pool of the step when its calls may
+        time out (see step_pool). a slot of bulkhead of the step is taken on
+        the loop, so that calls waiting for one do not hold a worker.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self.pool
+        if self.timeouts[step] is not None or self.hedges[step] is not None:
+            pool = self.step_pool(uid=self.plan.uids[step])
+
+        bulkhead = self.bulkheads[step]
+        if bulkhead is None:
+            return await loop.run_in_executor(pool, func)
+        return await bulkhead.acall(
+            ctxs=ctxs,
+            func=partial(loop.run_in_executor, pool, func),
+            batch=batch,
         )
 
-    def inspect(self) -> Dict[str, Any]:
-        steps = self.flow.predecessor
-        steps_arr = []
-        [steps_arr.extend(value) for value in steps.values()]  # type: ignore
+    async def join_branches(self, run: Run) -> None:
+        """
+        waits for tasks launched by after_step of the run, they are replaced
+        by completed futures holding their results.
+        """
+        if run.branches:
+            results = await asyncio.gather(*run.branches)
+            run.branches = [completed(result=result) for result in results]
+
+    async def flush_checkpoints_async(self) -> None:
+        if self.checkpoint_store is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.pool, self.flush_checkpoints)
+
+    async def resume(  # type: ignore[override]
+        self, run_id: str, join: bool = True
+    ) -> Tuple[EngineResponse, RunState]:
+        checkpoint = self.load_checkpoint(run_id=run_id)
+        return await self.execute(
+            from_step=checkpoint.from_step,
+            data=checkpoint.data,
+            executed_steps=checkpoint.executed_steps,
+            join=join,
+            run_id=run_id,
+        )
 
-        final_response = {}
-        for _step in steps_arr:
-            step = self.get_step(from_step=_step)
-            ctx = FetchSchemaRequestContext(name=step.name, order=step.order)
+    async def execute(  # type: ignore[override]
+        self,
+        from_step: Optional[str],
+        data: Dict[str, Any],
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        join: bool = True,
+        run_id: Optional[str] = None,
+        retention: RETENTION = "all",
+        deadline: Optional[float] = None,
+        cancellation: Optional[Cancellation] = None,
+    ) -> Tuple[EngineResponse, RunState]:
+        run = Run(
+            engine=self,
+            from_step=from_step,
+            data=data,
+            executed_steps=executed_steps,
+            run_id=run_id,
+            retention=build_retention(option=retention),
+            deadline=deadline,
+            cancellation=cancellation,
+        )
+
+        while True:
+            resp_ctx = await self.call_step(step=run.current, ctx=run.context())
+            if not run.record(resp_ctx=resp_ctx):
+                break
 
-            resp_ctx = step.function(ctx=ctx)  # type: ignore
-            final_response[_step] = {
-                "name": step.name,
-                "order": step.order,
-                "schema": resp_ctx.output["schema"],
-            }
+        await self.flush_checkpoints_async()
 
-        return {"graph": steps, "schema": final_response}
+        if join:
+            await self.join_branches(run=run)
+        return run.result()
+
+    async def stream(  # type: ignore[override]
+        self,
+        from_step: Optional[str],
+        data: Dict[str, Any],
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        join: bool = True,
+        run_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[Tuple[Response, RunState]]:
+        run = Run(
+            engine=self,
+            from_step=from_step,
+            data=data,
+            executed_steps=executed_steps,
+            run_id=run_id,
+            retention=KEEP_NONE,
+            deadline=deadline,
+        )
+
+        try:
+            while True:
+                resp_ctx = await self.call_step(
+                    step=run.current, ctx=run.context()
+                )
+                proceed = run.record(resp_ctx=resp_ctx)
+                yield resp_ctx, run.state
+                if not proceed:
+                    break
+        finally:
+            run.finish()
+            await self.flush_checkpoints_async()
+
+        if join:
+            await self.join_branches(run=run)
+
+    async def execute_many(  # type: ignore[override]
+        self,
+        from_step: Optional[str],
+        records: Iterable[Dict[str, Any]],
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        join: bool = True,
+        retention: RETENTION = "all",
+        deadline: Optional[float] = None,
+    ) -> List[Tuple[EngineResponse, RunState]]:
+        runs = [
+            Run(
+                engine=self,
+                from_step=from_step,
+                data=data,
+                executed_steps=executed_steps,
+                retention=build_retention(option=retention),
+                deadline=deadline,
+            )
+            for data in records
+        ]
+
+        batches = deque([runs] if runs else [])
+        while batches:
+            batch = batches.popleft()
+            current = batch[0].current
+            ctxs = [run.context() for run in batch]
+
+            if current in self.plan.coroutines:
+                responses = await asyncio.gather(
+                    *(self.call_step(step=current, ctx=ctx) for ctx in ctxs)
+                )
+            else:
+                responses = await bound(
+                    call=self.offload(
+                        step=current,
+                        ctxs=ctxs,
+                        func=partial(
+                            self.execute_batch, step=batch[0].step, ctxs=ctxs
+                        ),
+                        batch=True,
+                    ),
+                    uid=self.plan.uids[current],
+                    ctxs=ctxs,
+                    timeout=self.timeouts[current],
+                    batch=True,
+                )
+
+            following: Dict[int, List[Run]] = {}
+            for run, resp_ctx in zip(batch, responses):
+                if run.record(resp_ctx=resp_ctx):
+                    following.setdefault(run.current, []).append(run)
+
+            batches.extend(following.values())
+
+        await self.flush_checkpoints_async()
+        if join:
+            await asyncio.gather(*(self.join_branches(run=run) for run in runs))
+        return [run.result() for run in runs]
@@ -1,4 +1,6 @@
-from typing import Type
+from typing import Any, Awaitable, Callable, List, Mapping, Optional, Type
+
+from time import perf_counter
 
 from freak.models.input import InputModel
 from freak.models.request import RequestContext
@@ -7,23 +9,39 @@ from freak.models.response import (
     Response,
     SuccessResponseContext,
 )
+from freak.tracing import phase
 from freak.types import FUNC_TYPE
-from pydantic import ValidationError
+from pydantic import ValidationError, validate_model
+
+VALIDATOR = Callable[[Mapping[str, Any]], Optional[ValidationError]]
+
+
+def compile_validator(required_model: Type[InputModel]) -> VALIDATOR:
+    """
+    validator of a step is built once, when step is defined. it checks data
+    without creating an instance of the model, returns None if data is valid.
+    """
+
+    def validate(data: Mapping[str, Any]) -> Optional[ValidationError]:
+        error: Optional[ValidationError] = validate_model(
+            required_model, data  # type: ignore
+        )[2]
+        return error
+
+    return validate
 
 
 def evaluate_input(
     ctx: RequestContext, required_model: Type[InputModel]
 ) -> Response:
-    try:
-        required_model(**ctx.input)
+    error = compile_validator(required_model=required_model)(ctx.input)
+    if error is None:
         return SuccessResponseContext(
             input=ctx.input,
             output={},
         )
-    except ValidationError as err:
-        return InputErrorsResponseContext(
-            input=ctx.input, json_errors=err.json()
-        )
+
+    return InputErrorsResponseContext(input=ctx.input, errors=error)
 
 
 # def evaluate_output(
@@ -41,17 +59,41 @@ def evaluate_input(
 #         )
 
 
+def check_input(
+    ctx: RequestContext, validator: VALIDATOR
+) -> Optional[Response]:
+    timings = ctx.timings
+    with phase(ctx=ctx, name="validation"):
+        if timings is None:
+            error = validator(ctx.input)
+        else:
+            started = perf_counter()
+            error = validator(ctx.input)
+            timings["validation"] = perf_counter() - started
+
+    if error is None:
+        return None
+
+    return InputErrorsResponseContext(input=ctx.input, errors=error)
+
+
 def executor(
     func: FUNC_TYPE,
     ctx: RequestContext,
-    input_model: Type[InputModel],
+    validator: VALIDATOR,
     # output_model: Type[Any],
 ) -> Response:
-    check_input = evaluate_input(ctx=ctx, required_model=input_model)
-    if not check_input.success:
-        return check_input
+    input_errors = check_input(ctx=ctx, validator=validator)
+    if input_errors:
+        return input_errors
 
-    response = func(ctx=ctx)  # type: ignore
+    timings = ctx.timings
+    if timings is None:
+        response = func(ctx=ctx)  # type: ignore
+    else:
+        started = perf_counter()
+        response = func(ctx=ctx)  # type: ignore
+        timings["function"] = perf_counter() - started
 
     # TODO: come up with output validation logic.
     # also, see if this is even required.
@@ -61,3 +103,48 @@ def executor(
     #         return check_output
 
     return response
+
+
+async def async_executor(
+    func: Callable[..., Awaitable[Response]],
+    ctx: RequestContext,
+    validator: VALIDATOR,
+) -> Response:
+    input_errors = check_input(ctx=ctx, validator=validator)
+    if input_errors:
+        return input_errors
+
+    timings = ctx.timings
+    if timings is None:
+        return await func(ctx=ctx)
+
+    started = perf_counter()
+    response = await func(ctx=ctx)
+    timings["function"] = perf_counter() - started
+    return response
+
+
+def batch_executor(
+    func: Callable[..., List[Response]],
+    ctxs: List[RequestContext],
+    validator: VALIDATOR,
+) -> List[Response]:
+    """
+    validates every request and calls func once, with all valid requests.
+    """
+    responses: List[Optional[Response]] = []
+    accepted: List[int] = []
+    for position, ctx in enumerate(ctxs):
+        input_errors = check_input(ctx=ctx, validator=validator)
+        if input_errors:
+            responses.append(input_errors)
+        else:
+            responses.append(None)
+            accepted.append(position)
+
+    if accepted:
+        results = func(ctxs=[ctxs[position] for position in accepted])
+        for position, response in zip(accepted, results):
+            responses[position] = response
+
+    return responses  # type: ignore
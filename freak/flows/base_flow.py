@@ -1,49 +1,207 @@
-from typing import Any
+from typing import Any, List
 
-from functools import wraps
+from functools import partial, wraps
+from inspect import iscoroutinefunction
 
-from freak.evaluate import executor
+from freak.cache import build_cache, scope
+from freak.evaluate import (
+    async_executor,
+    batch_executor,
+    compile_validator,
+    executor,
+)
 from freak.flows.locators import Locator
 from freak.models.request import RequestContext
 from freak.models.response import FetchInputSchemaContext, Response
+from freak.tracing import phase
 from freak.types import (
+    ASYNC_FUNC_TYPE,
     DECORATOR_RESPONSE,
     FIRST_WRAPPER_RESPONSE,
     FUNC_TYPE,
+    STEP_FUNC_TYPE,
     Flow,
 )
 
 
 def base_flow(**wkwargs: Any) -> DECORATOR_RESPONSE:
-    def wrapper(func: FUNC_TYPE) -> FIRST_WRAPPER_RESPONSE:
+    """
+    batch=True marks a step which accepts a list of request contexts,
+    `func(ctxs=[...])`, and returns one response per context.
+
+    steps defined with `async def` can only be run by async engines.
+
+    `cache=True` (or StepCache options, or an instance of it) memoizes
+    successful responses of a step by its input, steps must be pure.
+
+    output_model declares data a step passes on to next step, it is not
+    checked. input of every step is validated against its input_model.
+
+    `max_concurrency=N` limits calls of a step in flight at once over every
+    run of an engine, `queue_timeout=` fails calls which waited longer for a
+    slot. both override defaults of the engine.
+
+    `timeout=` bounds a single call of a step, in seconds, overriding
+    step_timeout of the engine. see freak.cancellation.
+
+    `hedge_after_ms=` launches a second attempt of a slow call of a step,
+    only allowed along with `idempotent=True`. `hedge_percentile=` tells
+    which latency of the step a call is slow past. see freak.hedging.
+    """
+    validator = compile_validator(required_model=wkwargs["input_model"])
+    cache = build_cache(option=wkwargs.get("cache"))
+    schema_response: List[Response] = []
+
+    def fetch_schema() -> Response:
+        if not schema_response:
+            schema_response.append(
+                FetchInputSchemaContext(
+                    output={"schema": wkwargs["input_model"].schema()}
+                )
+            )
+        return schema_response[0]
+
+    def async_wrapper(func: ASYNC_FUNC_TYPE) -> FIRST_WRAPPER_RESPONSE:
+        cache_scope = scope(func=func)
+
         @wraps(func)
-        def caller(ctx: RequestContext) -> Response:
+        async def caller(ctx: RequestContext) -> Response:
 
             if ctx.input.get("fetch_schema"):
-                return FetchInputSchemaContext(
-                    output={"schema": wkwargs["input_model"].schema()}
+                return fetch_schema()
+
+            pre_hook = wkwargs.get("pre_hook")
+            if pre_hook:
+                with phase(ctx=ctx, name="pre_hook"):
+                    pre_hook(ctx=ctx)
+
+            call = partial(
+                async_executor, func=func, ctx=ctx, validator=validator
+            )
+            if cache:
+                response = await cache.acall(
+                    ctx=ctx, func=call, scope=cache_scope
                 )
+            else:
+                response = await call()
+
+            post_hook = wkwargs.get("post_hook")
+            if post_hook:
+                with phase(ctx=ctx, name="post_hook"):
+                    post_hook(ctx=ctx)
+
+            return response
+
+        caller.fetch_schema = fetch_schema  # type: ignore
+        caller.cache = cache  # type: ignore
+        caller.options = wkwargs  # type: ignore
+        return caller  # type: ignore
+
+    def wrapper(func: STEP_FUNC_TYPE) -> FIRST_WRAPPER_RESPONSE:
+        if iscoroutinefunction(func):
+            return async_wrapper(func=func)  # type: ignore
+
+        is_batch = wkwargs.get("batch", False)
+        cache_scope = scope(func=func)
+
+        def call_single(ctx: RequestContext) -> Response:
+            response: Response = func(ctxs=[ctx])[0]  # type: ignore
+            return response
+
+        single: FUNC_TYPE = call_single if is_batch else func  # type: ignore
+
+        @wraps(func)
+        def caller(ctx: RequestContext) -> Response:
+
+            if ctx.input.get("fetch_schema"):
+                return fetch_schema()
 
             pre_hook = wkwargs.get("pre_hook")
             if pre_hook:
-                pre_hook(ctx=ctx)
+                with phase(ctx=ctx, name="pre_hook"):
+                    pre_hook(ctx=ctx)
 
-            response = executor(
-                func=func,
+            call = partial(
+                executor,
+                func=single,
                 ctx=ctx,
-                input_model=wkwargs["input_model"],
-                # output_model=wkwargs["output_model"],
+                validator=validator,
+            )
+            response = (
+                cache.call(ctx=ctx, func=call, scope=cache_scope)
+                if cache
+                else call()
             )
 
             # response is actually a context object,
             # post hook runs on response of function.
             post_hook = wkwargs.get("post_hook")
             if post_hook:
-                post_hook(ctx=ctx)
+                with phase(ctx=ctx, name="post_hook"):
+                    post_hook(ctx=ctx)
 
             return response
 
-        return caller
+        def call_cached_batch(ctxs: List[RequestContext]) -> List[Response]:
+            """
+            only records missing from cache are passed to step.
+            """
+            keys = [
+                cache.key(ctx=ctx, scope=cache_scope)  # type: ignore
+                for ctx in ctxs
+            ]
+            responses = [
+                cache.get(key=key) if key is not None else None  # type: ignore
+                for key in keys
+            ]
+            pending = [
+                position
+                for position, response in enumerate(responses)
+                if response is None
+            ]
+            if pending:
+                results = batch_executor(
+                    func=func,  # type: ignore
+                    ctxs=[ctxs[position] for position in pending],
+                    validator=validator,
+                )
+                for position, response in zip(pending, results):
+                    key = keys[position]
+                    if key is not None:
+                        cache.set(key=key, response=response)  # type: ignore
+                    else:
+                        cache.count(counter="uncacheable")  # type: ignore
+                    responses[position] = response
+            return responses  # type: ignore
+
+        def call_batch(ctxs: List[RequestContext]) -> List[Response]:
+            if not is_batch:
+                return [caller(ctx=ctx) for ctx in ctxs]
+
+            pre_hook = wkwargs.get("pre_hook")
+            if pre_hook:
+                for ctx in ctxs:
+                    pre_hook(ctx=ctx)
+
+            if cache:
+                responses = call_cached_batch(ctxs=ctxs)
+            else:
+                responses = batch_executor(
+                    func=func, ctxs=ctxs, validator=validator  # type: ignore
+                )
+
+            post_hook = wkwargs.get("post_hook")
+            if post_hook:
+                for ctx in ctxs:
+                    post_hook(ctx=ctx)
+
+            return responses
+
+        caller.call_batch = call_batch  # type: ignore
+        caller.fetch_schema = fetch_schema  # type: ignore
+        caller.cache = cache  # type: ignore
+        caller.options = wkwargs  # type: ignore
+        return caller  # type: ignore
 
     return wrapper
 
@@ -0,0 +1,497 @@
+"""
+    A dag flow is a flow whose steps may wait for more than one step, listed
+    as `parent_uid=["one", "two"]`. Every step whose parents have succeeded
+    is ready, and ready steps are performed concurrently on engine pool.
+
+    Data handed over by parents of a join step is merged in order of its
+    parents, `merge=` on the decorator of the step replaces the default merge.
+"""
+
+
+"""
+    Note: Do not remove base_flow import.
+"""
+
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from functools import partial
+
+from freak.cancellation import Cancellation
+from freak.engine import AsyncEngine, Engine
+from freak.flows.base_flow import base_flow
+from freak.flows.locators import Locator
+from freak.models.request import RequestContext
+from freak.models.response import EngineResponse, Response
+from freak.models.state import RunState
+from freak.plan import Plan
+from freak.retention import (
+    KEEP_ALL,
+    KEEP_NONE,
+    RETENTION,
+    Retention,
+    build_retention,
+)
+from freak.run import Run
+from freak.types import Flow
+
+dag_flow = base_flow
+
+MERGE = Callable[[List[Dict[str, Any]]], Dict[str, Any]]
+
+# response of a step, with times it started and finished at.
+TIMED = Tuple[Response, float, float]
+
+
+def merge_inputs(inputs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    keys of later parents win over keys of earlier ones.
+    """
+    merged: Dict[str, Any] = {}
+    for data in inputs:
+        merged.update(data)
+    return merged
+
+
+def timed(function: Callable[..., Response], ctx: RequestContext) -> TIMED:
+    started = time.perf_counter()
+    response = function(ctx=ctx)
+    return response, started, time.perf_counter()
+
+
+class Schedule:
+    """
+    bookkeeping of a dag run, done by the caller of engine only. a step is
+    ready once every parent of it taking part in the run has succeeded,
+    steps following a failed step are never performed.
+    """
+
+    def __init__(self, plan: Plan, run: Run, starts: Tuple[int, ...]) -> None:
+        # parents come before their children in topological order, so steps
+        # following starts are found in a single pass.
+        members = set(starts)
+        for step in plan.topological_order:
+            if step not in members and any(
+                parent in members for parent in plan.predecessors[step]
+            ):
+                members.add(step)
+
+        self.plan = plan
+        self.run = run
+        self.members = members
+        self.starts = frozenset(starts)
+        self.waiting = {
+            step: sum(parent in members for parent in plan.predecessors[step])
+            for step in members
+            if step not in self.starts
+        }
+        # data handed over to a step, by its parents.
+        self.inputs: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        # ready steps, with data handed over to them.
+        self.ready: Deque[Tuple[int, Dict[str, Any]]] = deque(
+            (step, run.data) for step in starts
+        )
+        self.finished: Dict[int, Tuple[float, float]] = {}
+
+    def take(self) -> List[Tuple[int, RequestContext]]:
+        """
+        contexts of steps which are ready, every step gets its own context
+        as they run concurrently.
+        """
+        plan = self.plan
+        contexts = []
+        while self.ready:
+            step, data = self.ready.popleft()
+            ctx = RequestContext(
+                input=data,
+                name=plan.steps[step].name,
+                order=plan.steps[step].order,
+            )
+            ctx.span = self.run.span
+            ctx.cancellation = self.run.cancellation
+            contexts.append((step, ctx))
+        return contexts
+
+    def complete(self, step: int, result: TIMED) -> None:
+        plan, run = self.plan, self.run
+        resp_ctx, started, finished = result
+        self.finished[step] = (started, finished)
+
+        run.retention.keep(run.responses, resp_ctx, plan.steps[step])
+        run.to_step = plan.steps[step].order
+        run.to_uid = plan.uids[step]
+        if not resp_ctx.success:
+            return
+
+        children = [
+            child for child in plan.successors[step] if child in self.members
+        ]
+        run.state = run.state.advance(
+            uid=plan.uids[step],
+            path=tuple(plan.uids[child] for child in children),
+        )
+        run.data = data = run.engine.hand_over(resp_ctx)  # type: ignore
+        run.last_successful_step = plan.steps[step].order
+
+        for child in children:
+            self.inputs.setdefault(child, {})[step] = data  # type: ignore
+            self.waiting[child] -= 1
+            if not self.waiting[child]:
+                self.ready.append((child, self.merge(step=child)))
+
+    def merge(self, step: int) -> Dict[str, Any]:
+        handed_over = self.inputs.pop(step)
+        inputs = [
+            handed_over[parent]
+            for parent in self.plan.predecessors[step]
+            if parent in handed_over
+        ]
+        if len(inputs) == 1:
+            return inputs[0]
+
+        merge: MERGE = self.plan.steps[step].options.get("merge", merge_inputs)
+        return merge(inputs)
+
+    def critical_path(self) -> List[Tuple[str, float]]:
+        """
+        chain of steps ending at step which finished last, going back to the
+        parent which finished last, i.e. the one step waited for.
+        """
+        finished = self.finished
+        path: List[Tuple[str, float]] = []
+        step: Optional[int] = max(
+            finished, key=lambda step: finished[step][1], default=None
+        )
+        while step is not None:
+            started, ended = finished[step]
+            path.append((self.plan.uids[step], ended - started))
+            step = max(
+                (
+                    parent
+                    for parent in self.plan.predecessors[step]
+                    if parent in finished
+                ),
+                key=lambda parent: finished[parent][1],
+                default=None,
+            )
+        path.reverse()
+        return path
+
+    def result(self) -> Tuple[EngineResponse, RunState]:
+        output, state = self.run.result()
+        output.critical_path = self.critical_path()
+        return output, state
+
+
+class DagFlowEngine(Engine):
+    def __init__(
+        self,
+        module_name: str,
+        decorator_name: str = "dag_flow",
+        **kwargs: Any,
+    ) -> None:
+        """
+        runs of a dag have more than one step in flight, they can not be
+        checkpointed and resumed.
+        """
+        if kwargs.get("checkpoint_store") is not None:
+            raise Exception("CheckpointNotSupportedError")
+
+        super().__init__(
+            module_name=module_name, decorator_name=decorator_name, **kwargs
+        )
+
+    def get_following_steps(
+        self, from_step: int, last_step: int
+    ) -> Tuple[int, ...]:
+        return self.plan.successors[from_step]
+
+    def starts(self, from_step: Optional[str]) -> Tuple[int, ...]:
+        """
+        a run performs every root of the flow, or from_step and steps
+        following it. parents of a step which are not part of the run are
+        not waited for.
+        """
+        if from_step:
+            return (self.plan.locate(uid=from_step),)
+        return tuple(sorted(self.plan.roots))
+
+    def schedule(
+        self,
+        from_step: Optional[str],
+        data: Dict[str, Any],
+        executed_steps: Optional[Mapping[str, Any]],
+        run_id: Optional[str] = None,
+        retention: Retention = KEEP_ALL,
+        deadline: Optional[float] = None,
+        cancellation: Optional[Cancellation] = None,
+    ) -> Schedule:
+        """
+        run_id is given to response of the run and its span, as with other
+        engines. dag runs do not launch branches themselves, join waits for
+        any attached to their response all the same.
+        """
+        run = Run(
+            engine=self,
+            from_step=from_step,
+            data=data,
+            executed_steps=executed_steps,
+            run_id=run_id,
+            retention=retention,
+            deadline=deadline,
+            cancellation=cancellation,
+        )
+        return Schedule(
+            plan=self.plan, run=run, starts=self.starts(from_step=from_step)
+        )
+
+    def walk(self, schedule: Schedule) -> Iterator[Response]:
+        """
+        ready steps are submitted to engine pool as soon as they are ready,
+        a step is performed by caller of engine only when no other step is in
+        flight. yields responses in order steps finished.
+        """
+        steps = self.plan.steps
+        in_flight: Dict["Future[TIMED]", int] = {}
+        try:
+            while True:
+                ready = schedule.take()
+                if len(ready) == 1 and not in_flight:
+                    step, ctx = ready[0]
+                    result = timed(partial(self.perform, steps[step]), ctx)
+                    schedule.complete(step=step, result=result)
+                    yield result[0]
+                    continue
+
+                for step, ctx in ready:
+                    future = self.pool.submit(
+                        timed, partial(self.perform, steps[step]), ctx
+                    )
+                    in_flight[future] = step
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    schedule.complete(
+                        step=in_flight.pop(future), result=future.result()
+                    )
+                    yield future.result()[0]
+        finally:
+            for future in in_flight:
+                future.cancel()
+            schedule.run.finish()
+
+    def execute(
+        self,
+        from_step: Optional[str],
+        data: Dict[str, Any],
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        join: bool = True,
+        run_id: Optional[str] = None,
+        retention: RETENTION = "all",
+        deadline: Optional[float] = None,
+        cancellation: Optional[Cancellation] = None,
+    ) -> Tuple[EngineResponse, RunState]:
+        schedule = self.schedule(
+            from_step=from_step,
+            data=data,
+            executed_steps=executed_steps,
+            run_id=run_id,
+            retention=build_retention(option=retention),
+            deadline=deadline,
+            cancellation=cancellation,
+        )
+        for _ in self.walk(schedule=schedule):
+            pass
+        result = schedule.result()
+        if join:
+            result[0].join()
+        return result
+
+    def stream(
+        self,
+        from_step: Optional[str],
+        data: Dict[str, Any],
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        join: bool = True,
+        run_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Iterator[Tuple[Response, RunState]]:
+        schedule = self.schedule(
+            from_step=from_step,
+            data=data,
+            executed_steps=executed_steps,
+            run_id=run_id,
+            retention=KEEP_NONE,
+            deadline=deadline,
+        )
+        for resp_ctx in self.walk(schedule=schedule):
+            yield resp_ctx, schedule.run.state
+
+        if join:
+            schedule.run.result()[0].join()
+
+    def execute_many(
+        self,
+        from_step: Optional[str],
+        records: Iterable[Dict[str, Any]],
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        join: bool = True,
+        retention: RETENTION = "all",
+        deadline: Optional[float] = None,
+    ) -> List[Tuple[EngineResponse, RunState]]:
+        return [
+            self.execute(
+                from_step=from_step,
+                data=data,
+                executed_steps=executed_steps,
+                join=join,
+                retention=retention,
+                deadline=deadline,
+            )
+            for data in records
+        ]
+
+
+class AsyncDagFlowEngine(DagFlowEngine, AsyncEngine):
+    """
+    ready steps are performed as tasks on the running event loop.
+    """
+
+    async def call_timed(self, step: int, ctx: RequestContext) -> TIMED:
+        started = time.perf_counter()
+        response = await self.call_step(step=step, ctx=ctx)
+        return response, started, time.perf_counter()
+
+    async def walk_async(self, schedule: Schedule) -> AsyncIterator[Response]:
+        in_flight: Dict["asyncio.Future[TIMED]", int] = {}
+        task: "asyncio.Future[TIMED]"
+        try:
+            while True:
+                for step, ctx in schedule.take():
+                    task = asyncio.ensure_future(
+                        self.call_timed(step=step, ctx=ctx)
+                    )
+                    in_flight[task] = step
+
+                if not in_flight:
+                    break
+
+                done: Set["asyncio.Future[TIMED]"]
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    schedule.complete(
+                        step=in_flight.pop(task), result=task.result()
+                    )
+                    yield task.result()[0]
+        finally:
+            for task in in_flight:
+                task.cancel()
+            schedule.run.finish()
+
+    async def execute(  # type: ignore[override]
+        self,
+        from_step: Optional[str],
+        data: Dict[str, Any],
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        join: bool = True,
+        run_id: Optional[str] = None,
+        retention: RETENTION = "all",
+        deadline: Optional[float] = None,
+        cancellation: Optional[Cancellation] = None,
+    ) -> Tuple[EngineResponse, RunState]:
+        schedule = self.schedule(
+            from_step=from_step,
+            data=data,
+            executed_steps=executed_steps,
+            run_id=run_id,
+            retention=build_retention(option=retention),
+            deadline=deadline,
+            cancellation=cancellation,
+        )
+        async for _ in self.walk_async(schedule=schedule):
+            pass
+        if join:
+            await self.join_branches(run=schedule.run)
+        return schedule.result()
+
+    async def stream(  # type: ignore[override]
+        self,
+        from_step: Optional[str],
+        data: Dict[str, Any],
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        join: bool = True,
+        run_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[Tuple[Response, RunState]]:
+        schedule = self.schedule(
+            from_step=from_step,
+            data=data,
+            executed_steps=executed_steps,
+            run_id=run_id,
+            retention=KEEP_NONE,
+            deadline=deadline,
+        )
+        async for resp_ctx in self.walk_async(schedule=schedule):
+            yield resp_ctx, schedule.run.state
+
+        if join:
+            await self.join_branches(run=schedule.run)
+
+    async def execute_many(  # type: ignore[override]
+        self,
+        from_step: Optional[str],
+        records: Iterable[Dict[str, Any]],
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        join: bool = True,
+        retention: RETENTION = "all",
+        deadline: Optional[float] = None,
+    ) -> List[Tuple[EngineResponse, RunState]]:
+        return list(
+            await asyncio.gather(
+                *(
+                    self.execute(
+                        from_step=from_step,
+                        data=data,
+                        executed_steps=executed_steps,
+                        join=join,
+                        retention=retention,
+                        deadline=deadline,
+                    )
+                    for data in records
+                )
+            )
+        )
+
+
+def locator(module: object, file_path: str, decorator: str) -> Flow:
+    loc = Locator(
+        module=module,
+        file_path=file_path,
+        decorator=decorator,
+        multiple_parents=True,
+    )
+    flow = loc.locate()
+
+    # every step of a dag runs as soon as it is ready, none is launched.
+    assert flow.parallels == set()
+    return flow
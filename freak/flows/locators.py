@@ -1,7 +1,7 @@
 from typing import Any
 
 import inspect
-from ast import FunctionDef, parse
+from ast import AsyncFunctionDef, FunctionDef, literal_eval, parse
 from collections import defaultdict
 from importlib import import_module
 from inspect import isfunction
@@ -21,10 +21,21 @@ COLLECT_ATTRIBUTES = [
 
 
 class Locator:
-    def __init__(self, module: object, file_path: str, decorator: str):
+    def __init__(
+        self,
+        module: object,
+        file_path: str,
+        decorator: str,
+        multiple_parents: bool = False,
+    ):
+        """
+        only flows which wait for every parent of a step (dag flows) allow
+        more than one parent, others would follow the first one alone.
+        """
         self.loaded_module = module
         self.file_path = file_path
         self.decorator = decorator
+        self.multiple_parents = multiple_parents
 
     def locate(self) -> Flow:
         file_path = self.file_path
@@ -36,24 +47,42 @@ class Locator:
             successor = dict()
             parallel_uids = set()
             for part in tree.body:
-                if not (isinstance(part, FunctionDef) and part.decorator_list):
+                if not (
+                    isinstance(part, (FunctionDef, AsyncFunctionDef))
+                    and part.decorator_list
+                ):
                     continue
 
                 for deco in part.decorator_list:
                     if deco.func.id != decorator:  # type: ignore
                         continue
 
-                    deco_kws = {
-                        kw.arg: kw.value.value
-                        for kw in deco.keywords  # type: ignore
-                        if kw.arg in COLLECT_ATTRIBUTES
-                    }
+                    try:
+                        deco_kws = {
+                            kw.arg: literal_eval(kw.value)
+                            for kw in deco.keywords  # type: ignore
+                            if kw.arg in COLLECT_ATTRIBUTES
+                        }
+                    except ValueError:
+                        raise Exception("InvalidFlowDefintiionError")
+
+                    # a step waiting for more than one step lists all of them.
+                    parent_uids = deco_kws.get("parent_uid", "")
+                    if not isinstance(parent_uids, (list, tuple)):
+                        parent_uids = [parent_uids]
 
-                    parent_uid = deco_kws.get("parent_uid", "")
                     uid = deco_kws.get("uid")
                     if (
                         not uid
-                        or (parent_uid == "")
+                        or not parent_uids
+                        or "" in parent_uids
+                        or (
+                            len(parent_uids) > 1
+                            and (
+                                None in parent_uids or not self.multiple_parents
+                            )
+                        )
+                        or len(set(parent_uids)) != len(parent_uids)
                         or not deco_kws.get("order")
                     ):
                         raise Exception("InvalidFlowDefintiionError")
@@ -65,16 +94,18 @@ class Locator:
                     if not isfunction(object=func):
                         continue
 
-                    predecessor[parent_uid].append(uid)
+                    for parent_uid in parent_uids:
+                        predecessor[parent_uid].append(uid)
                     if is_parallel_step:
                         parallel_uids.add(uid)
 
                     successor[uid] = Step(
                         uid=uid,
-                        parent_uid=parent_uid,
+                        parent_uid=parent_uids[0],
                         order=deco_kws["order"],
                         name=part.name,
                         function=func,
+                        options=getattr(func, "options", {}),
                     )
 
         return Flow(
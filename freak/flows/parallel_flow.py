@@ -9,166 +9,429 @@
     Note: Do not remove base_flow import.
 """
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Type
 
-import copy
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
 
-from freak.engine import Engine
-from freak.flows.base_flow import base_flow as parallel_flow
+from freak.cancellation import Cancellation
+from freak.engine import AsyncEngine, Engine
+from freak.flows.base_flow import base_flow
 from freak.flows.locators import Locator
-from freak.models.request import RequestContext
+from freak.metrics import KEY, MetricsRegistry
 from freak.models.response import EngineResponse, Response
+from freak.models.state import RunState
+from freak.plan import NO_STEP
+from freak.retention import KEEP_ALL, Retention
+from freak.run import Run
+from freak.tracing import Span, within, within_async
 from freak.types import Flow
-from freak.utils import submit_and_execute_single_job
+from freak.utils import completed, submit_and_execute_single_job
+
+parallel_flow = base_flow
+
+BACKENDS = ("thread", "process")
+
+# options of an engine its worker processes are built with as well.
+WORKER_OPTIONS = (
+    "max_workers",
+    "cache_dir",
+    "timings",
+    "compiled",
+    "handover",
+    "max_concurrency",
+    "queue_timeout",
+    "step_timeout",
+)
 
 
 class ParallelFlowEngine(Engine):
     def __init__(
-        self, module_name: str, decorator_name: str = "parallel_flow"
+        self,
+        module_name: str,
+        decorator_name: str = "parallel_flow",
+        backend: str = "thread",
+        cancel_branches: bool = False,
+        **kwargs: Any,
     ) -> None:
-        super().__init__(module_name=module_name, decorator_name=decorator_name)
+        """
+        backend="process" runs parallel branches on a process pool, for cpu
+        bound branches. workers rebuild the engine once, at start, with same
+        options (see WORKER_OPTIONS), and only exchange step uid, input data
+        and run state with the engine. metrics workers record are merged
+        into metrics of the engine as their branches return. concurrency
+        limits are enforced by every worker on its own, and branches on
+        workers are not traced.
+
+        branches share deadline of their run. with cancel_branches set, a
+        run which fails cancels branches it launched as well, they stop
+        before their next step. branches on processes get deadline only.
+        """
+        super().__init__(
+            module_name=module_name, decorator_name=decorator_name, **kwargs
+        )
 
-    def get_parallels(self, for_step: Optional[str]) -> List[str]:
+        if backend not in BACKENDS:
+            raise Exception("InvalidBackendError")
+
+        self.backend = backend
+        self.cancel_branches = cancel_branches
+        self.worker_options = {
+            key: value for key, value in kwargs.items() if key in WORKER_OPTIONS
+        }
+        self.worker_options["cancel_branches"] = cancel_branches
+        self.process_executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self.process_executor is None:
+            with self.executor_lock:
+                if self.process_executor is None:
+                    # async engines can not run inside worker processes.
+                    engine_class = (
+                        ParallelFlowEngine if self.asynchronous else type(self)
+                    )
+                    self.process_executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        initializer=init_worker,
+                        initargs=(
+                            engine_class,
+                            self.module_name,
+                            self.decorator_name,
+                            self.worker_options,
+                            self.metrics is not None,
+                        ),
+                    )
+        return self.process_executor
+
+    def shutdown(self, wait: bool = True) -> None:
+        super().shutdown(wait=wait)
+
+        with self.executor_lock:
+            executor, self.process_executor = self.process_executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def get_parallels(self, for_step: int) -> Tuple[int, ...]:
         """
         predecessor = {
             None: [1, 2, 3],
             1: [4, 5],
             2: [6, 7],
         }
+
+        parallels of a step are its siblings marked as parallel, these are
+        precomputed by the plan. parallel steps have none, branches do not
+        launch other branches.
         """
-        step_graph = self.flow.predecessor
-
-        next_steps = []
-        for steps in step_graph.values():
-            if for_step in steps:
-                next_steps = steps
-                break
-
-        if self.flow.parallels:
-            parallel_steps = set(next_steps).intersection(self.flow.parallels)
-            parallel_steps = parallel_steps.difference({for_step})
-            return list(parallel_steps)
-
-        return []
-
-    def execute_parallels(self, for_step, data, executed_steps):
-        parallels = self.get_parallels(for_step=for_step)
-
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            for parallel in parallels:
-                submit_and_execute_single_job(
-                    executor=executor,
-                    func=self.execute,
-                    job_args=(parallel, data, executed_steps),
-                )
+        return self.plan.parallel_siblings[for_step]
 
-    def get_following_steps(
-        self, from_step: Optional[str], path_traversed: Dict[str, Any]
-    ) -> List[str]:
-        step_graph = self.flow.predecessor
-        if not from_step:
-            # pick up root of flow.
-            from_step = step_graph[from_step][0]
+    def execute_parallels(
+        self,
+        for_step: int,
+        data: Dict[str, Any],
+        executed_steps: RunState,
+        span: Optional[Span] = None,
+        retention: Retention = KEEP_ALL,
+        cancellation: Optional[Cancellation] = None,
+        run_id: Optional[str] = None,
+    ) -> List["Future[Tuple[EngineResponse, RunState]]"]:
+        """
+        branches are submitted to engine pool without waiting for them,
+        branch runs do not wait for their own branches either. so nested
+        parallels can neither grow number of threads nor deadlock the pool.
+        """
+        return [
+            self.submit_branch(
+                from_step=self.plan.uids[parallel],
+                data=data,
+                executed_steps=executed_steps,
+                span=span,
+                retention=retention,
+                cancellation=cancellation,
+                run_id=branch_run_id(
+                    run_id=run_id, from_step=self.plan.uids[parallel]
+                ),
+            )
+            for parallel in self.get_parallels(for_step=for_step)
+        ]
+
+    def submit_branch(
+        self,
+        from_step: str,
+        data: Dict[str, Any],
+        executed_steps: RunState,
+        span: Optional[Span] = None,
+        retention: Retention = KEEP_ALL,
+        cancellation: Optional[Cancellation] = None,
+        run_id: Optional[str] = None,
+    ) -> "Future[Tuple[EngineResponse, RunState]]":
+        """
+        span of a traced run gets a child span lasting until branch returns,
+        runs of branches on threads are recorded under it. branches keep
+        responses the way their run does, run_id is given to branch run, see
+        branch_run_id.
+        """
+        branch_span = None
+        if span is not None:
+            branch_span = span.child(name=from_step, category="branch")
+
+        if self.backend == "thread":
+            future = submit_and_execute_single_job(
+                executor=self.pool,
+                func=partial(
+                    within,
+                    branch_span,
+                    partial(
+                        self.execute,
+                        join=False,
+                        run_id=run_id,
+                        retention=retention,
+                        cancellation=cancellation,
+                    ),
+                ),
+                job_args=(from_step, data, executed_steps),
+            )
+        else:
+            job = submit_and_execute_single_job(
+                executor=self.process_pool,
+                func=partial(
+                    execute_branch,
+                    run_id=run_id,
+                    retention=retention,
+                    deadline=(
+                        cancellation.deadline
+                        if cancellation is not None
+                        else None
+                    ),
+                ),
+                job_args=(from_step, data, executed_steps.to_dict()),
+            )
 
-        next_steps = step_graph.get(from_step, [])
-        next_steps_set = set(next_steps) - self.flow.parallels
-        next_steps = list(next_steps_set)
+            future = Future()
+            job.add_done_callback(
+                partial(transfer, future=future, metrics=self.metrics)
+            )
+
+        if branch_span is not None:
+            future.add_done_callback(branch_span.finish)
+        return future
+
+    def after_step(self, run: Run) -> None:
+        # run state is immutable, every branch can share it.
+        run.branches.extend(
+            self.execute_parallels(
+                for_step=run.current,
+                data=run.data,
+                executed_steps=run.state,
+                span=run.span,
+                retention=run.retention,
+                cancellation=self.cancellation(run=run),
+                run_id=run.run_id,
+            )
+        )
+
+    def cancellation(self, run: Run) -> Optional[Cancellation]:
+        """
+        cancellation branches of the run are children of, runs which cancel
+        their branches get one once they launch any.
+        """
+        if (
+            run.cancellation is None
+            and self.cancel_branches
+            and self.get_parallels(for_step=run.current)
+        ):
+            run.cancellation = Cancellation()
+        return run.cancellation
+
+    def get_following_steps(
+        self, from_step: int, last_step: int
+    ) -> Tuple[int, ...]:
+        next_steps = self.plan.main_successors[from_step]
 
         # bug: last_step == "" can only be true for root step.
-        last_step = path_traversed.get("last_step", "")
-        if last_step == "" and from_step not in step_graph[None]:
+        if last_step == NO_STEP and from_step not in self.plan.roots:
             raise Exception("FlowInitiatedMidwayError")
 
-        if from_step not in step_graph.get(last_step, []) and last_step:
+        if last_step != NO_STEP and not self.plan.is_edge(
+            parent=last_step, child=from_step
+        ):
             raise Exception("ExecutionBeforePredecessorError")
 
         return next_steps
 
-    def get_next_step_uid(
-        self, resp_ctx: Response, next_steps: List[str]
-    ) -> str:
+    def get_next_step(
+        self, resp_ctx: Response, next_steps: Tuple[int, ...]
+    ) -> int:
         if resp_ctx.choice:
-            if resp_ctx.choice not in next_steps:
+            next_step = self.plan.index.get(resp_ctx.choice, NO_STEP)
+            if next_step not in next_steps:
                 raise Exception("InvalidChoice")
 
-            return resp_ctx.choice
+            return next_step
 
         assert len(next_steps) == 1
 
         return next_steps[0]
 
-    def execute(
-        self,
-        from_step: Optional[str],
-        data: Dict[str, Any],
-        executed_steps: Dict[str, Any] = {"traversed": {}, "last_step": ""},
-    ) -> Tuple[EngineResponse, Dict[str, Any]]:
-        path_traversed = copy.deepcopy(executed_steps)
-
-        step = self.get_step(from_step=from_step)
-        next_steps = self.get_following_steps(
-            from_step=from_step,
-            path_traversed=path_traversed,
-        )
-
-        responses = []
-        last_successful_step, to_step, from_ = (
-            step.order,
-            step.order,
-            step.order,
-        )
-
-        while True:
-            ctx = RequestContext(input=data, name=step.name, order=step.order)
-
-            resp_ctx = step.function(ctx=ctx)  # type: ignore
-            responses.append(resp_ctx)
-            to_step = step.order  # this will refer to last performed step.
 
-            self.execute_parallels(
-                for_step=step.name, data=data, executed_steps=path_traversed
-            )
-            if not resp_ctx.success:
-                break
-
-            path = next_steps.copy()
-            if next_steps:
-                next_step_uid = self.get_next_step_uid(
-                    resp_ctx=resp_ctx, next_steps=next_steps
+def branch_run_id(run_id: Optional[str], from_step: str) -> Optional[str]:
+    """
+    branch starting at step `two` of run `run-1` is run `run-1.two`, so
+    that a checkpointed branch can be resumed by its id as well.
+    """
+    if run_id is None:
+        return None
+    return f"{run_id}.{from_step}"
+
+
+class AsyncParallelFlowEngine(ParallelFlowEngine, AsyncEngine):
+    """
+    parallel branches are launched as tasks on the running event loop.
+    """
+
+    def after_step(self, run: Run) -> None:
+        parallels = self.get_parallels(for_step=run.current)
+        if not parallels:
+            return
+
+        # branch tasks wait for their own branches, asyncio has no threads
+        # to run out of.
+        cancellation = self.cancellation(run=run)
+        for parallel in parallels:
+            from_step = self.plan.uids[parallel]
+            run_id = branch_run_id(run_id=run.run_id, from_step=from_step)
+            if self.backend == "process":
+                branch = asyncio.wrap_future(
+                    self.submit_branch(
+                        from_step=from_step,
+                        data=run.data,
+                        executed_steps=run.state,
+                        span=run.span,
+                        retention=run.retention,
+                        cancellation=cancellation,
+                        run_id=run_id,
+                    )
                 )
-                path = [next_step_uid]
-
-            path_traversed["traversed"][step.uid] = path
-            path_traversed["last_step"] = step.uid
-
-            data = resp_ctx.input
-
-            # this will refer last successfully performed action.
-            last_successful_step = step.order
+            elif run.span is not None:
+                branch_span = run.span.child(name=from_step, category="branch")
+                branch = asyncio.ensure_future(
+                    within_async(
+                        branch_span,
+                        self.execute(
+                            from_step,
+                            run.data,
+                            run.state,
+                            run_id=run_id,
+                            retention=run.retention,
+                            cancellation=cancellation,
+                        ),
+                    )
+                )
+                branch.add_done_callback(branch_span.finish)
+            else:
+                branch = asyncio.ensure_future(
+                    self.execute(
+                        from_step,
+                        run.data,
+                        run.state,
+                        run_id=run_id,
+                        retention=run.retention,
+                        cancellation=cancellation,
+                    )
+                )
+            run.branches.append(branch)
 
-            if not next_steps:
-                break
 
-            next_step_uid = self.get_next_step_uid(
-                resp_ctx=resp_ctx, next_steps=next_steps
-            )
+"""
+    Process backend, engine of a worker process is built once by init_worker.
+    Branch results travel back with their own branches already joined.
+"""
 
-            next_steps = self.get_following_steps(
-                from_step=next_step_uid,
-                path_traversed=path_traversed,
-            )
-            step = self.get_step(from_step=next_step_uid)
-
-        return (
-            EngineResponse(
-                responses=responses,
-                from_step=from_,
-                to_step=to_step,
-                last_successful_step=last_successful_step,
-            ),
-            path_traversed,
-        )
+PACKED_RESULT = Tuple[EngineResponse, Dict[str, Any]]
+# metrics recorded by a worker while performing a branch.
+OBSERVED = Optional[Dict[KEY, Any]]
+
+WORKER_ENGINE: Optional[ParallelFlowEngine] = None
+
+
+def init_worker(
+    engine_class: Type[ParallelFlowEngine],
+    module_name: str,
+    decorator_name: str,
+    options: Optional[Dict[str, Any]] = None,
+    metered: bool = False,
+) -> None:
+    global WORKER_ENGINE
+    WORKER_ENGINE = engine_class(
+        module_name=module_name,
+        decorator_name=decorator_name,
+        metrics=MetricsRegistry() if metered else None,
+        **(options or {}),
+    )
+
+
+def execute_branch(
+    from_step: str,
+    data: Dict[str, Any],
+    executed_steps: Dict[str, Any],
+    run_id: Optional[str] = None,
+    retention: Retention = KEEP_ALL,
+    deadline: Optional[float] = None,
+) -> Tuple[PACKED_RESULT, OBSERVED]:
+    """
+    a worker performs one branch at a time, so metrics it holds once the
+    branch and its own branches returned were recorded by that branch.
+    """
+    assert WORKER_ENGINE is not None
+
+    output, state = WORKER_ENGINE.execute(
+        from_step=from_step,
+        data=data,
+        executed_steps=executed_steps,
+        run_id=run_id,
+        retention=retention,
+        deadline=deadline,
+    )
+    packed = pack(output=output, state=state)
+
+    observed = None
+    registry = WORKER_ENGINE.metrics
+    if registry is not None:
+        observed = registry.merged()
+        registry.reset()
+    return packed, observed
+
+
+def pack(output: EngineResponse, state: RunState) -> PACKED_RESULT:
+    output.branches = [pack(*branch.result()) for branch in output.branches]
+    return output, state.to_dict()
+
+
+def unpack(packed: PACKED_RESULT) -> Tuple[EngineResponse, RunState]:
+    output, executed_steps = packed
+    output.branches = [
+        completed(result=unpack(packed=branch)) for branch in output.branches
+    ]
+    return output, RunState.coerce(executed_steps=executed_steps)
+
+
+def transfer(
+    job: "Future[Tuple[PACKED_RESULT, OBSERVED]]",
+    future: "Future[Tuple[EngineResponse, RunState]]",
+    metrics: Optional[MetricsRegistry] = None,
+) -> None:
+    error = job.exception()
+    if error is not None:
+        future.set_exception(error)
+        return
+
+    packed, observed = job.result()
+    if metrics is not None and observed:
+        metrics.absorb(observed=observed)
+    future.set_result(unpack(packed=packed))
 
 
 def locator(module: object, file_path: str, decorator: str) -> Flow:
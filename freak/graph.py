@@ -0,0 +1,129 @@
+from typing import (
+    Dict,
+    Hashable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    TypeVar,
+)
+
+from collections import deque
+
+"""
+    Graphs here are adjacency mappings in the shape of `Flow.predecessor`,
+    every node maps to list of nodes following it. `None` key holds roots of
+    a flow and is not a node of the graph.
+"""
+
+NODE = TypeVar("NODE", bound=Hashable)
+GRAPH = Mapping[Optional[NODE], Sequence[NODE]]
+
+
+def adjacency(step_graph: GRAPH[NODE]) -> Dict[NODE, List[NODE]]:
+    """
+    every node of the graph with nodes following it, in order of appearance.
+    """
+    graph: Dict[NODE, List[NODE]] = {}
+    for key, value in step_graph.items():
+        if key is None:
+            for node in value:
+                graph.setdefault(node, [])
+            continue
+
+        graph.setdefault(key, []).extend(value)
+        for node in value:
+            graph.setdefault(node, [])
+    return graph
+
+
+def topological_order(step_graph: GRAPH[NODE]) -> List[NODE]:
+    """
+    nodes ordered so that every node comes after all nodes leading to it.
+    raises FlowShouldBeDAGError if graph has a cycle.
+    """
+    graph = adjacency(step_graph=step_graph)
+
+    in_degree = dict.fromkeys(graph, 0)
+    for following in graph.values():
+        for node in following:
+            in_degree[node] += 1
+
+    ready = deque(node for node, degree in in_degree.items() if degree == 0)
+    order: List[NODE] = []
+    while ready:
+        node = ready.popleft()
+        order.append(node)
+        for child in graph[node]:
+            in_degree[child] -= 1
+            if in_degree[child] == 0:
+                ready.append(child)
+
+    if len(order) != len(graph):
+        raise Exception(
+            "FlowShouldBeDAGError", find_cycle(step_graph=step_graph)
+        )
+
+    return order
+
+
+def find_cycle(step_graph: GRAPH[NODE]) -> List[NODE]:
+    """
+    returns nodes of a cycle, first node repeated at the end, e.g. [1, 2, 1].
+    returns an empty list if graph has no cycle.
+    """
+    graph = adjacency(step_graph=step_graph)
+
+    # 0: not visited, 1: on current path, 2: done.
+    state = dict.fromkeys(graph, 0)
+    for source in graph:
+        if state[source]:
+            continue
+
+        path = [source]
+        iterators = [iter(graph[source])]
+        state[source] = 1
+        while iterators:
+            node = next(iterators[-1], None)
+            if node is None:
+                state[path.pop()] = 2
+                iterators.pop()
+            elif state[node] == 1:
+                return path[path.index(node) :] + [node]
+            elif state[node] == 0:
+                state[node] = 1
+                path.append(node)
+                iterators.append(iter(graph[node]))
+
+    return []
+
+
+def reachable(step_graph: GRAPH[NODE], source: NODE) -> Set[NODE]:
+    """
+    nodes which can be reached from source, source excluded.
+    """
+    graph = adjacency(step_graph=step_graph)
+
+    seen: Set[NODE] = set()
+    pending = list(graph.get(source, []))
+    while pending:
+        node = pending.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        pending.extend(graph[node])
+    return seen
+
+
+def depth(step_graph: GRAPH[NODE]) -> Dict[NODE, int]:
+    """
+    length of longest path leading to every node, roots are at depth 0.
+    """
+    graph = adjacency(step_graph=step_graph)
+
+    depths = dict.fromkeys(graph, 0)
+    for node in topological_order(step_graph=step_graph):
+        for following in graph[node]:
+            depths[following] = max(depths[following], depths[node] + 1)
+    return depths
@@ -0,0 +1,58 @@
+from typing import Any, Callable, Mapping
+
+from collections import ChainMap
+
+from freak.models.response import Response
+
+"""
+    Handover is how data of a run moves from a step to the next one.
+
+    - input: next step receives input of the response, as returned by step.
+    - overlay: output of the response is layered over its input, nothing is
+      copied. steps return only keys they add or change as output, and must
+      not modify their input, since its layers are outputs of earlier steps.
+"""
+
+HANDOVERS = ("input", "overlay")
+
+HANDOVER = Callable[[Response], Mapping[str, Any]]
+
+# layers kept before data is collapsed into a single dict, so that reading
+# a key does not go through every step of a long flow.
+MAX_LAYERS = 16
+
+
+def hand_over_input(resp_ctx: Response) -> Mapping[str, Any]:
+    return resp_ctx.input
+
+
+def hand_over_overlay(resp_ctx: Response) -> Mapping[str, Any]:
+    """
+    collapsing copies references to values only, never the values.
+    """
+    data, output = resp_ctx.input, resp_ctx.output
+    if not output:
+        return data
+
+    if not isinstance(data, ChainMap):
+        return ChainMap(output, data)  # type: ignore
+    if len(data.maps) >= MAX_LAYERS:
+        return ChainMap(output, dict(data))
+    return data.new_child(output)
+
+
+def build_handover(option: str) -> HANDOVER:
+    if option == "input":
+        return hand_over_input
+    if option == "overlay":
+        return hand_over_overlay
+    raise Exception("InvalidHandoverError", option)
+
+
+def plain(value: Any) -> Any:
+    """
+    json default, layered data is written as a plain object.
+    """
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
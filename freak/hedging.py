@@ -0,0 +1,225 @@
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from contextvars import copy_context
+from functools import wraps
+
+from freak.cancellation import budget, cancelled, time_out
+from freak.models.request import RequestContext
+from freak.models.response import Response
+from freak.types import FUNC_TYPE
+from freak.utils import percentile
+
+"""
+    Hedging cuts tail latency of idempotent steps backed by replicas. When a
+    call has not returned after a delay, a second attempt of it is launched
+    on engine pool, whichever returns first is taken and the other one is
+    discarded (cancelled when it can be).
+
+    Delay is the `hedge_percentile` latency of recent attempts of the step,
+    never shorter than `hedge_after_ms`, which is used alone until enough
+    attempts have been observed. So only calls slower than most are hedged,
+    and load grows by about as much as percentile leaves out.
+"""
+
+COUNTERS = ("issued", "won")
+
+# attempts kept to derive delay from, and attempts needed before it is.
+WINDOW = 256
+MIN_SAMPLES = 20
+# delay is derived again after this many attempts.
+REFRESH = 16
+
+
+class Hedge:
+    def __init__(
+        self, uid: str, after_ms: float, fraction: float = 0.95
+    ) -> None:
+        if after_ms < 0 or not 0 < fraction <= 1:
+            raise Exception("InvalidHedgeError", uid)
+
+        self.uid = uid
+        self.after = after_ms / 1000
+        self.fraction = fraction
+        self.delay = self.after
+
+        self.latencies: Deque[float] = deque(maxlen=WINDOW)
+        self.observed = 0
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.lock = threading.Lock()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        hedges issued, hedges which returned first and current delay.
+        """
+        with self.lock:
+            return dict(self.counters, delay=self.delay)
+
+    def count(self, counter: str) -> None:
+        with self.lock:
+            self.counters[counter] += 1
+
+    def observe(self, seconds: float) -> None:
+        with self.lock:
+            self.latencies.append(seconds)
+            self.observed += 1
+            if self.observed >= MIN_SAMPLES and not self.observed % REFRESH:
+                self.delay = max(
+                    self.after,
+                    percentile(
+                        values=sorted(self.latencies), fraction=self.fraction
+                    ),
+                )
+
+    @staticmethod
+    def context(ctx: RequestContext) -> RequestContext:
+        """
+        context of an attempt, a discarded attempt may still be running when
+        run moves on and hands its own context to next step.
+        """
+        attempt = RequestContext(
+            input=ctx.input, name=ctx.name, order=ctx.order
+        )
+        attempt.span = ctx.span
+        attempt.cancellation = ctx.cancellation
+        if ctx.timings is not None:
+            attempt.timings = dict(ctx.timings)
+        return attempt
+
+    def perform(self, function: FUNC_TYPE, ctx: RequestContext) -> Response:
+        started = time.perf_counter()
+        response: Response = function(ctx=ctx)  # type: ignore
+        self.observe(seconds=time.perf_counter() - started)
+        return response
+
+    def call(
+        self,
+        function: FUNC_TYPE,
+        ctx: RequestContext,
+        pool: Executor,
+        timeout: Optional[float] = None,
+    ) -> Response:
+        """
+        attempts are performed on pool, caller waits for them no longer
+        than timeout of the step and deadline of its run.
+        """
+        seconds, reason = budget(ctxs=(ctx,), timeout=timeout)
+        until = None if seconds is None else time.perf_counter() + seconds
+
+        def remaining() -> Optional[float]:
+            return None if until is None else until - time.perf_counter()
+
+        def launch() -> "Future[Response]":
+            return pool.submit(
+                copy_context().run,
+                self.perform,
+                function,
+                self.context(ctx=ctx),
+            )
+
+        attempts: Dict["Future[Response]", bool] = {launch(): False}
+        try:
+            left = remaining()
+            done, _ = wait(
+                attempts,
+                timeout=self.delay if left is None else min(self.delay, left),
+            )
+            left = remaining()
+            if not done and (left is None or left > 0):
+                self.count(counter="issued")
+                attempts[launch()] = True
+
+            while attempts:
+                done, _ = wait(
+                    attempts, timeout=remaining(), return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    return cancelled(ctx=ctx, uid=self.uid, reason=reason)
+
+                for future in done:
+                    hedged = attempts.pop(future)
+                    # an attempt which raised loses to one still running.
+                    if future.exception() is not None and attempts:
+                        continue
+                    if hedged:
+                        self.count(counter="won")
+                    return future.result()
+        finally:
+            for future in attempts:
+                future.cancel()
+
+        raise AssertionError()  # pragma: no cover
+
+    async def acall(
+        self,
+        ctx: RequestContext,
+        launch: Callable[[RequestContext], Awaitable[Response]],
+    ) -> Response:
+        """
+        attempts run as tasks, launch starts an attempt with its context.
+        """
+
+        async def perform(attempt: RequestContext) -> Response:
+            started = time.perf_counter()
+            response = await launch(ctx=attempt)  # type: ignore
+            self.observe(seconds=time.perf_counter() - started)
+            return response
+
+        def start() -> "asyncio.Future[Response]":
+            return asyncio.ensure_future(perform(self.context(ctx=ctx)))
+
+        attempts: Dict["asyncio.Future[Response]", bool] = {start(): False}
+        try:
+            done: Set["asyncio.Future[Response]"]
+            done, _ = await asyncio.wait(attempts, timeout=self.delay)
+            if not done:
+                self.count(counter="issued")
+                attempts[start()] = True
+
+            while attempts:
+                done, _ = await asyncio.wait(
+                    attempts, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    hedged = attempts.pop(task)
+                    if task.exception() is not None and attempts:
+                        continue
+                    if hedged:
+                        self.count(counter="won")
+                    return task.result()
+        finally:
+            for task in attempts:
+                task.cancel()
+
+        raise AssertionError()  # pragma: no cover
+
+
+def hedged(
+    function: FUNC_TYPE,
+    hedge: Hedge,
+    timeout: Optional[float],
+    pool: Callable[[], Executor],
+) -> FUNC_TYPE:
+    """
+    wraps a step of a threaded engine, timeout of the step is enforced by
+    the wrapper as well. batches are not hedged.
+    """
+
+    @wraps(function)
+    def caller(ctx: RequestContext) -> Response:
+        return hedge.call(
+            function=function, ctx=ctx, pool=pool(), timeout=timeout
+        )
+
+    if hasattr(function, "call_batch"):
+        if timeout is not None:
+            function = time_out(
+                function=function, uid=hedge.uid, timeout=timeout, pool=pool
+            )
+        caller.call_batch = function.call_batch  # type: ignore
+
+    return caller
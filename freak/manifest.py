@@ -0,0 +1,199 @@
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import hashlib
+import inspect
+import json
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from inspect import isfunction
+
+from freak import __version__
+from freak.types import Flow, Step
+
+"""
+    A manifest is everything engine learns about a flow module on startup,
+    the located graph, step metadata, validation result and input schemas.
+
+    Manifests are stored in `__pycache__` next to flow module, or in
+    FREAK_CACHE_DIR when set, and are keyed by hash of flow module source
+    (and sources of its input models) and by freak version. So they are
+    reused only as long as nothing they were built from has changed.
+"""
+
+# bump whenever locators start collecting something new.
+MANIFEST_VERSION = 1
+
+CACHE_DIR_ENV = "FREAK_CACHE_DIR"
+DISABLE_CACHE_ENV = "FREAK_NO_CACHE"
+
+
+@dataclass
+class Manifest:
+    decorator: str
+    steps: List[Dict[str, Any]]
+    predecessor: List[List[Any]]
+    parallels: List[str]
+    schemas: Dict[str, Any]
+    valid: bool
+    dependencies: Dict[str, str]
+
+    @classmethod
+    def from_flow(
+        cls, flow: Flow, decorator: str, valid: bool, file_path: str
+    ) -> "Manifest":
+        models = [
+            step.options.get("input_model") for step in flow.successor.values()
+        ]
+        return cls(
+            decorator=decorator,
+            steps=[
+                {
+                    "uid": step.uid,
+                    "parent_uid": step.parent_uid,
+                    "order": step.order,
+                    "name": step.name,
+                }
+                for step in flow.successor.values()
+            ],
+            predecessor=[
+                [parent, children]
+                for parent, children in flow.predecessor.items()
+            ],
+            parallels=sorted(flow.parallels),
+            schemas=flow.schemas,
+            valid=valid,
+            dependencies=hash_files(
+                file_paths=[file_path, *source_files(objects=models)]
+            ),
+        )
+
+    def to_flow(self, module: object) -> Optional[Flow]:
+        successor = {}
+        for step in self.steps:
+            func = module.__dict__.get(step["name"])
+            if not isfunction(func):
+                return None
+
+            successor[step["uid"]] = Step(
+                uid=step["uid"],
+                parent_uid=step["parent_uid"],
+                order=step["order"],
+                name=step["name"],
+                function=func,
+                options=getattr(func, "options", {}),
+            )
+
+        predecessor = defaultdict(list)
+        for parent, children in self.predecessor:
+            predecessor[parent] = children
+
+        return Flow(
+            successor=successor,
+            predecessor=predecessor,
+            parallels=set(self.parallels),
+            schemas=self.schemas,
+        )
+
+
+def source_files(objects: Iterable[Any]) -> List[str]:
+    files: Set[str] = set()
+    for obj in objects:
+        if obj is None:
+            continue
+        try:
+            source = inspect.getsourcefile(obj)
+        except TypeError:
+            continue
+        if source is not None:
+            files.add(os.path.abspath(source))
+    return sorted(files)
+
+
+def hash_files(file_paths: Iterable[str]) -> Dict[str, str]:
+    hashes = {}
+    for file_path in file_paths:
+        with open(file=file_path, mode="rb") as file:
+            hashes[file_path] = hashlib.sha256(file.read()).hexdigest()
+    return hashes
+
+
+def manifest_path(
+    file_path: str, decorator: str, cache_dir: Optional[str] = None
+) -> str:
+    cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV)
+    module_name = os.path.splitext(os.path.basename(file_path))[0]
+
+    if cache_dir:
+        # modules from different directories may share their name.
+        directory = hashlib.sha256(file_path.encode()).hexdigest()[:16]
+        module_name = f"{module_name}-{directory}"
+    else:
+        cache_dir = os.path.join(os.path.dirname(file_path), "__pycache__")
+
+    return os.path.join(
+        cache_dir, f"{module_name}.{decorator}.freak-{__version__}.json"
+    )
+
+
+def is_cache_enabled() -> bool:
+    return not os.environ.get(DISABLE_CACHE_ENV)
+
+
+def load_manifest(
+    file_path: str, decorator: str, cache_dir: Optional[str] = None
+) -> Optional[Manifest]:
+    path = manifest_path(
+        file_path=file_path, decorator=decorator, cache_dir=cache_dir
+    )
+    try:
+        with open(file=path, mode="rt") as file:
+            content = json.load(file)
+
+        if (
+            content.pop("manifest_version") != MANIFEST_VERSION
+            or content.pop("freak_version") != __version__
+        ):
+            return None
+
+        manifest = Manifest(**content)
+        if manifest.decorator != decorator:
+            return None
+
+        # flow module or one of models it depends on has changed.
+        if (
+            hash_files(file_paths=manifest.dependencies)
+            != manifest.dependencies
+        ):
+            return None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    return manifest
+
+
+def save_manifest(
+    manifest: Manifest, file_path: str, cache_dir: Optional[str] = None
+) -> Optional[str]:
+    path = manifest_path(
+        file_path=file_path, decorator=manifest.decorator, cache_dir=cache_dir
+    )
+    content = {
+        "manifest_version": MANIFEST_VERSION,
+        "freak_version": __version__,
+        **manifest.__dict__,
+    }
+
+    # like bytecode caches, a manifest that can not be written is skipped.
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(file=temp_path, mode="wt") as file:
+            json.dump(content, file)
+        os.replace(temp_path, path)
+    except (OSError, TypeError, ValueError):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return None
+
+    return path
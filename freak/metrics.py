@@ -0,0 +1,318 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from freak.models.request import RequestContext
+from freak.models.response import Response
+from freak.types import FUNC_TYPE
+
+"""
+    Metrics registry keeps histograms and counters of steps, keyed by flow
+    and step uid. Every thread writes into its own shard without locking,
+    shards are merged only when metrics are read.
+
+    Engines instrument steps only when a registry (or timings) is given, so
+    disabled metrics cost nothing.
+"""
+
+# upper bounds of histogram buckets, in seconds.
+BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    float("inf"),
+)
+
+# wall and cpu time of a step, time spent validating input and in function,
+# and time spent waiting for a slot of its bulkhead.
+HISTOGRAMS = ("wall", "cpu", "validation", "function", "queue")
+# calls of a step, calls which failed and calls which raised.
+COUNTERS = ("calls", "failures", "errors")
+
+KEY = Tuple[str, str, str]
+
+
+class Histogram:
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        for position, count in enumerate(other.counts):
+            self.counts[position] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(BUCKETS, self.counts)),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.local = threading.local()
+        self.shards: List[Dict[KEY, Any]] = []
+        self.lock = threading.Lock()
+
+    def shard(self) -> Dict[KEY, Any]:
+        try:
+            shard: Dict[KEY, Any] = self.local.shard
+        except AttributeError:
+            shard = self.local.shard = {}
+            with self.lock:
+                self.shards.append(shard)
+        return shard
+
+    def observe(self, flow: str, step: str, metric: str, value: float) -> None:
+        shard = self.shard()
+        key = (flow, step, metric)
+        histogram = shard.get(key)
+        if histogram is None:
+            histogram = shard[key] = Histogram()
+        histogram.observe(value=value)
+
+    def increment(
+        self, flow: str, step: str, counter: str, value: int = 1
+    ) -> None:
+        shard = self.shard()
+        key = (flow, step, counter)
+        shard[key] = shard.get(key, 0) + value
+
+    def absorb(self, observed: Dict[KEY, Any]) -> None:
+        """
+        adds metrics merged by another registry, e.g. of a worker process.
+        """
+        shard = self.shard()
+        for key, value in observed.items():
+            if isinstance(value, Histogram):
+                histogram = shard.get(key)
+                if histogram is None:
+                    histogram = shard[key] = Histogram()
+                histogram.merge(other=value)
+            else:
+                shard[key] = shard.get(key, 0) + value
+
+    def merged(self) -> Dict[KEY, Any]:
+        with self.lock:
+            shards = list(self.shards)
+
+        merged: Dict[KEY, Any] = {}
+        for shard in shards:
+            for key, value in list(shard.items()):
+                if isinstance(value, Histogram):
+                    histogram = merged.get(key)
+                    if histogram is None:
+                        histogram = merged[key] = Histogram()
+                    histogram.merge(other=value)
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        metrics by flow and step uid, e.g.
+        `{"flow": {"step": {"calls": 1, "wall": {"count": 1, ...}}}}`.
+        """
+        snapshot: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (flow, step, metric), value in self.merged().items():
+            metrics = snapshot.setdefault(flow, {}).setdefault(step, {})
+            if isinstance(value, Histogram):
+                metrics[metric] = value.to_dict()
+            else:
+                metrics[metric] = value
+        return snapshot
+
+    def prometheus(self) -> str:
+        """
+        metrics in prometheus text exposition format.
+        """
+        histograms: Dict[str, List[str]] = {}
+        counters: Dict[str, List[str]] = {}
+        for (flow, step, metric), value in sorted(self.merged().items()):
+            labels = f'flow="{escape(flow)}",step="{escape(step)}"'
+            if isinstance(value, Histogram):
+                name = f"freak_step_{metric}_seconds"
+                lines = histograms.setdefault(name, [])
+                cumulative = 0
+                for bound, count in zip(BUCKETS, value.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(
+                        f'{name}_bucket{{{labels},le="{le}"}} {cumulative}'
+                    )
+                lines.append(f"{name}_sum{{{labels}}} {value.sum!r}")
+                lines.append(f"{name}_count{{{labels}}} {value.count}")
+            else:
+                name = f"freak_step_{metric}_total"
+                counters.setdefault(name, []).append(
+                    f"{name}{{{labels}}} {value}"
+                )
+
+        output = []
+        for name, lines in histograms.items():
+            output.append(f"# TYPE {name} histogram")
+            output.extend(lines)
+        for name, lines in counters.items():
+            output.append(f"# TYPE {name} counter")
+            output.extend(lines)
+        return "\n".join(output) + "\n" if output else ""
+
+    def reset(self) -> None:
+        with self.lock:
+            for shard in self.shards:
+                shard.clear()
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def record(
+    registry: Optional[MetricsRegistry],
+    flow: str,
+    uid: str,
+    response: Response,
+    timings: Dict[str, float],
+) -> None:
+    if registry is None:
+        return
+
+    registry.increment(flow=flow, step=uid, counter="calls")
+    if not response.success:
+        registry.increment(flow=flow, step=uid, counter="failures")
+    for metric, value in timings.items():
+        registry.observe(flow=flow, step=uid, metric=metric, value=value)
+
+
+def instrument(
+    function: FUNC_TYPE,
+    flow: str,
+    uid: str,
+    registry: Optional[MetricsRegistry],
+    attach: bool,
+) -> FUNC_TYPE:
+    """
+    wraps a step so that its timings are recorded into registry, and also
+    attached to its responses when attach is set. timings recorded before
+    the step is called (e.g. by a bulkhead) are kept.
+    """
+
+    def failed() -> None:
+        if registry is not None:
+            registry.increment(flow=flow, step=uid, counter="errors")
+
+    if iscoroutinefunction(function):
+
+        @wraps(function)
+        async def async_caller(ctx: RequestContext) -> Response:
+            # cpu time of a coroutine can not be told apart from the loop's.
+            ctx.timings = timings = ctx.timings or {}
+            started = time.perf_counter()
+            try:
+                response: Response = await function(ctx=ctx)  # type: ignore
+            except BaseException:
+                failed()
+                raise
+            timings["wall"] = time.perf_counter() - started
+
+            record(
+                registry=registry,
+                flow=flow,
+                uid=uid,
+                response=response,
+                timings=timings,
+            )
+            if attach:
+                response.timings = timings
+            return response
+
+        return async_caller  # type: ignore
+
+    @wraps(function)
+    def caller(ctx: RequestContext) -> Response:
+        ctx.timings = timings = ctx.timings or {}
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        try:
+            response = function(ctx=ctx)  # type: ignore
+        except BaseException:
+            failed()
+            raise
+        timings["wall"] = time.perf_counter() - started
+        timings["cpu"] = time.thread_time() - cpu_started
+
+        record(
+            registry=registry,
+            flow=flow,
+            uid=uid,
+            response=response,
+            timings=timings,
+        )
+        if attach:
+            response.timings = timings
+        return response
+
+    call_batch = getattr(function, "call_batch", None)
+    if call_batch is not None:
+
+        def instrumented_batch(ctxs: List[RequestContext]) -> List[Response]:
+            """
+            a batch is timed as a whole, its wall and cpu time are recorded
+            once per batch.
+            """
+            started, cpu_started = time.perf_counter(), time.thread_time()
+            try:
+                responses: List[Response] = call_batch(ctxs=ctxs)
+            except BaseException:
+                failed()
+                raise
+            timings = {
+                "wall": time.perf_counter() - started,
+                "cpu": time.thread_time() - cpu_started,
+            }
+
+            if registry is not None:
+                for response in responses:
+                    registry.increment(flow=flow, step=uid, counter="calls")
+                    if not response.success:
+                        registry.increment(
+                            flow=flow, step=uid, counter="failures"
+                        )
+                for metric, value in timings.items():
+                    registry.observe(
+                        flow=flow,
+                        step=f"{uid}[batch]",
+                        metric=metric,
+                        value=value,
+                    )
+            if attach:
+                for response in responses:
+                    response.timings = timings
+            return responses
+
+        caller.call_batch = instrumented_batch  # type: ignore
+
+    return caller
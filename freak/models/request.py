@@ -1,28 +1,66 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import abc
 
 
 class Request(abc.ABC):
 
+    __slots__ = ()
+
     name: str
     order: int
     input: Dict[str, Any]
+    # set by engine when metrics are enabled, steps record phases into it.
+    timings: Optional[Dict[str, float]]
+    # current span of request when run is traced, see freak.tracing.
+    span: Optional[Any]
+    # cancellation of the run, with its deadline, see freak.cancellation.
+    cancellation: Optional[Any]
 
 
 class RequestContext(Request):
-    """Class for defining structure of request structure."""
+    """Class for defining structure of request structure.
+
+    A run hands the same context to each of its steps in turn, steps should
+    not keep it once they return.
+    """
+
+    __slots__ = (
+        "input",
+        "name",
+        "order",
+        "timings",
+        "span",
+        "cancellation",
+    )
 
-    def __init__(self, input: Dict[str, Any], name: str, order: int) -> None:
+    def __init__(
+        self,
+        input: Dict[str, Any],
+        name: str,
+        order: int,
+    ) -> None:
         self.input = input
         self.name = name
         self.order = order
+        self.timings: Optional[Dict[str, float]] = None
+        self.span: Optional[Any] = None
+        self.cancellation: Optional[Any] = None
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """
+        `time.monotonic()` timestamp the run must finish by, if any.
+        """
+        if self.cancellation is None:
+            return None
+        deadline: Optional[float] = self.cancellation.deadline
+        return deadline
 
 
 class FetchSchemaRequestContext(RequestContext):
 
-    input: Dict[str, Any] = {"fetch_schema": True}
+    __slots__ = ()
 
     def __init__(self, name: str, order: int) -> None:
-        self.name = name
-        self.order = order
+        super().__init__(input={"fetch_schema": True}, name=name, order=order)
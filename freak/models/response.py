@@ -1,26 +1,32 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
 
 import abc
 import json
-from dataclasses import dataclass, field
+
+from pydantic import ValidationError
 
 
 class Response(abc.ABC):
 
-    input: Dict[str, Any]
+    __slots__ = ("timings",)
+
+    input: Mapping[str, Any]
     json_errors: str
     messages: List[str]
     output: Dict[str, Any]
     success: bool
     choice: Optional[str]
+    # timings of step which returned response, see Engine(timings=True).
+    timings: Optional[Dict[str, float]]
 
 
 class SuccessResponseContext(Response):
     """Class for defining structure of response structure."""
 
+    __slots__ = ("input", "output", "choice")
+
     success: bool = True
     json_errors: str = ""
-    messages: List[str] = []
 
     def __init__(
         self,
@@ -31,12 +37,18 @@ class SuccessResponseContext(Response):
         self.input = input
         self.output = output
         self.choice = choice
+        self.timings: Optional[Dict[str, float]] = None
+
+    @property
+    def messages(self) -> List[str]:  # type: ignore
+        return []
 
 
 class ErrorResponseContext(Response):
     """Class for defining structure of error response structure."""
 
-    output: Dict[str, Any] = {}
+    __slots__ = ("input", "messages")
+
     success: bool = False
     json_errors: str = ""
     choice: Optional[str] = None
@@ -44,48 +56,169 @@ class ErrorResponseContext(Response):
     def __init__(self, input: Dict[str, Any], messages: List[str]) -> None:
         self.input = input
         self.messages = messages
+        self.timings: Optional[Dict[str, float]] = None
+
+    @property
+    def output(self) -> Dict[str, Any]:  # type: ignore
+        return {}
 
 
 class InputErrorsResponseContext(Response):
 
-    messages: List[str] = []
-    output: Dict[str, Any] = {}
+    __slots__ = ("input", "errors", "_json_errors", "_messages")
+
     success: bool = False
     choice: Optional[str] = None
 
-    def __init__(self, input: Dict[str, Any], json_errors: str):
+    def __init__(
+        self,
+        input: Dict[str, Any],
+        json_errors: Optional[str] = None,
+        errors: Optional[ValidationError] = None,
+    ):
+        """
+        errors are formatted only when json_errors or messages are read.
+        """
         self.input = input
-        self.json_errors = json_errors
-        self.messages = InputErrorsResponseContext.get_messages(
-            json_errors=json_errors
-        )
+        self.errors = errors
+        self._json_errors = json_errors
+        self._messages: Optional[List[str]] = None
+        self.timings: Optional[Dict[str, float]] = None
+
+    @property
+    def output(self) -> Dict[str, Any]:  # type: ignore
+        return {}
+
+    @property
+    def json_errors(self) -> str:  # type: ignore
+        if self._json_errors is None:
+            self._json_errors = self.errors.json() if self.errors else "[]"
+        return self._json_errors
+
+    @property
+    def messages(self) -> List[str]:  # type: ignore
+        if self._messages is None:
+            if self.errors is not None:
+                self._messages = InputErrorsResponseContext.format_messages(
+                    errors=self.errors.errors()
+                )
+            else:
+                self._messages = InputErrorsResponseContext.get_messages(
+                    json_errors=self.json_errors
+                )
+        return self._messages
 
     @staticmethod
-    def get_messages(json_errors: str) -> List[str]:
-        errors = json.loads(json_errors)
+    def format_messages(errors: Sequence[Mapping[str, Any]]) -> List[str]:
         return [
             f"Variable: {error['loc'][0]} | Type: {error['type']} | Message: {error['msg']}"
             for error in errors
         ]
 
+    @staticmethod
+    def get_messages(json_errors: str) -> List[str]:
+        return InputErrorsResponseContext.format_messages(
+            errors=json.loads(json_errors)
+        )
+
 
 class FetchInputSchemaContext(Response):
 
-    messages: List[str] = field(default_factory=list)
-    success: bool = field(default=True)
-    json_errors: str = field(default="")
-    input: Dict[str, Any] = {"fetch_schema": True}
+    __slots__ = ("output",)
+
+    success: bool = True
+    json_errors: str = ""
     choice: Optional[str] = None
 
     def __init__(self, output: Dict[str, Any]):
         self.output = output
+        self.timings: Optional[Dict[str, float]] = None
+
+    @property
+    def input(self) -> Dict[str, Any]:  # type: ignore
+        return {"fetch_schema": True}
+
+    @property
+    def messages(self) -> List[str]:  # type: ignore
+        return []
 
 
-@dataclass
 class EngineResponse:
     """Class for defining structure of engine response structure."""
 
-    responses: List[Response]
-    from_step: int
-    to_step: int
-    last_successful_step: int
+    __slots__ = (
+        "responses",
+        "from_step",
+        "to_step",
+        "to_uid",
+        "last_successful_step",
+        "branches",
+        "run_id",
+        "critical_path",
+    )
+
+    def __init__(
+        self,
+        responses: List[Response],
+        from_step: int,
+        to_step: int,
+        last_successful_step: int,
+        branches: Optional[List[Any]] = None,
+        run_id: Optional[str] = None,
+        to_uid: str = "",
+    ) -> None:
+        self.responses = responses
+        self.from_step = from_step
+        self.to_step = to_step
+        # uid of last performed step, orders of steps need not be unique.
+        self.to_uid = to_uid
+        self.last_successful_step = last_successful_step
+        # futures of parallel branches launched by the run, in launch order.
+        self.branches: List[Any] = branches if branches is not None else []
+        # id of run, checkpoints of it are saved under this id.
+        self.run_id = run_id
+        # (uid, seconds) of steps which kept a dag run from finishing sooner.
+        self.critical_path: Optional[List[Tuple[str, float]]] = None
+
+    def __eq__(self, other: object) -> bool:
+        # compares field by field, as it did as a dataclass.
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__
+        )
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return (
+            f"EngineResponse(responses={self.responses!r}, "
+            f"from_step={self.from_step!r}, to_step={self.to_step!r}, "
+            f"last_successful_step={self.last_successful_step!r}, "
+            f"branches={self.branches!r}, run_id={self.run_id!r})"
+        )
+
+    @property
+    def timings(self) -> List[Optional[Dict[str, float]]]:
+        """
+        timings of every response, None for responses without timings.
+        responses of other classes may never set timings.
+        """
+        return [
+            getattr(resp_ctx, "timings", None) for resp_ctx in self.responses
+        ]
+
+    def join(
+        self, timeout: Optional[float] = None
+    ) -> List[Tuple["EngineResponse", Mapping[str, Any]]]:
+        """
+        waits for parallel branches, and branches launched by them.
+        returns (response, path traversed) of every branch in launch order.
+        """
+        results = []
+        for branch in self.branches:
+            output, path_traversed = branch.result(timeout=timeout)
+            output.join(timeout=timeout)
+            results.append((output, path_traversed))
+        return results
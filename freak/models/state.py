@@ -0,0 +1,78 @@
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+"""
+    Trail is a persistent (immutable, singly linked) list of traversed steps,
+    newest entry first: (uid, path, previous trail).
+"""
+
+TRAIL = Optional[Tuple[str, Tuple[str, ...], Any]]
+
+KEYS = ("traversed", "last_step")
+
+
+class RunState(Mapping[str, Any]):
+    """Class for defining structure of path traversed by a run.
+
+    Run state is immutable, recording a step returns a new state that shares
+    every previously recorded step, so forking or resuming a run is O(1).
+    It reads like `{"traversed": {...}, "last_step": ""}`.
+    """
+
+    __slots__ = ("trail", "last_step")
+
+    def __init__(self, trail: TRAIL = None, last_step: str = "") -> None:
+        self.trail = trail
+        self.last_step = last_step
+
+    @classmethod
+    def coerce(cls, executed_steps: Optional[Mapping[str, Any]]) -> "RunState":
+        if isinstance(executed_steps, RunState):
+            return executed_steps
+
+        if not executed_steps:
+            return EMPTY_STATE
+
+        trail: TRAIL = None
+        traversed = executed_steps.get("traversed", {})
+        for uid, path in traversed.items():
+            trail = (uid, tuple(path), trail)
+
+        return cls(trail=trail, last_step=executed_steps.get("last_step", ""))
+
+    def advance(self, uid: str, path: Tuple[str, ...]) -> "RunState":
+        return RunState(trail=(uid, path, self.trail), last_step=uid)
+
+    @property
+    def traversed(self) -> Dict[str, List[str]]:
+        entries = []
+        trail = self.trail
+        while trail is not None:
+            entries.append(trail)
+            trail = trail[2]
+
+        traversed: Dict[str, List[str]] = {}
+        for uid, path, _ in reversed(entries):
+            traversed[uid] = list(path)
+        return traversed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"traversed": self.traversed, "last_step": self.last_step}
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "traversed":
+            return self.traversed
+        if key == "last_step":
+            return self.last_step
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(KEYS)
+
+    def __len__(self) -> int:
+        return len(KEYS)
+
+    def __repr__(self) -> str:
+        return f"RunState({self.to_dict()!r})"
+
+
+EMPTY_STATE = RunState()
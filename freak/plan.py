@@ -0,0 +1,153 @@
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import hashlib
+import json
+from dataclasses import dataclass
+from inspect import iscoroutinefunction
+
+from freak.graph import depth, topological_order
+from freak.types import Flow, Step
+
+"""
+    A plan is a flow compiled into dense integer step ids, so that engines can
+    walk it using tuple indexing instead of string keyed lookups.
+"""
+
+NO_STEP = -1
+UNKNOWN_STEP = -2
+
+
+@dataclass(frozen=True)
+class Plan:
+    uids: Tuple[str, ...]
+    index: Dict[str, int]
+    steps: Tuple[Step, ...]
+    successors: Tuple[Tuple[int, ...], ...]
+    # every parent of a step, more than one for join steps of a dag.
+    predecessors: Tuple[Tuple[int, ...], ...]
+    successor_sets: Tuple[FrozenSet[int], ...]
+    main_successors: Tuple[Tuple[int, ...], ...]
+    parallel_siblings: Tuple[Tuple[int, ...], ...]
+    roots: FrozenSet[int]
+    root: int
+    coroutines: FrozenSet[int]
+    # steps in topological order, and length of longest path to every step.
+    topological_order: Tuple[int, ...]
+    depths: Tuple[int, ...]
+    # response of Engine.inspect, and content hash of it.
+    inspection: Dict[str, Any]
+    etag: str
+
+    def locate(self, uid: Optional[str]) -> int:
+        if not uid:
+            # pick up root of flow.
+            if self.root == NO_STEP:
+                raise Exception("InvalidStepError")
+            return self.root
+
+        step = self.index.get(uid, NO_STEP)
+        if step == NO_STEP:
+            raise Exception("InvalidStepError")
+        return step
+
+    def locate_last(self, uid: str) -> int:
+        if not uid:
+            return NO_STEP
+
+        return self.index.get(uid, UNKNOWN_STEP)
+
+    def is_edge(self, parent: int, child: int) -> bool:
+        return parent >= 0 and child in self.successor_sets[parent]
+
+
+def describe(flow: Flow) -> Tuple[Dict[str, Any], str]:
+    """
+    graph and input schemas of a flow, with a hash which changes only when
+    one of them changes.
+    """
+    final_response = {}
+    for children in flow.predecessor.values():
+        for uid in children:
+            if uid in final_response:
+                continue
+
+            step = flow.successor[uid]
+            final_response[uid] = {
+                "name": step.name,
+                "order": step.order,
+                "schema": flow.schemas.get(uid, {}),
+            }
+
+    content = json.dumps(
+        [list(flow.predecessor.items()), final_response],
+        sort_keys=True,
+        default=str,
+    )
+    etag = hashlib.sha256(content.encode()).hexdigest()
+    return {"graph": flow.predecessor, "schema": final_response}, etag
+
+
+def compile_plan(flow: Flow) -> Plan:
+    uids = tuple(flow.successor)
+    index = {uid: position for position, uid in enumerate(uids)}
+    steps = tuple(flow.successor[uid] for uid in uids)
+
+    def children(uid: Optional[str]) -> Tuple[int, ...]:
+        return tuple(index[child] for child in flow.predecessor.get(uid, []))
+
+    successors = tuple(children(uid) for uid in uids)
+    predecessors: Tuple[List[int], ...] = tuple([] for _ in uids)
+    for position, following in enumerate(successors):
+        for child in following:
+            if position not in predecessors[child]:
+                predecessors[child].append(position)
+
+    parallels = frozenset(index[uid] for uid in flow.parallels if uid in index)
+
+    main_successors = tuple(
+        tuple(child for child in following if child not in parallels)
+        for following in successors
+    )
+
+    # branches are launched from main path only, a branch which launched
+    # its parallel siblings again would never stop launching them.
+    parallel_siblings = tuple(
+        ()
+        if position in parallels
+        else tuple(
+            sibling
+            for sibling in children(step.parent_uid)
+            if sibling in parallels
+        )
+        for position, step in enumerate(steps)
+    )
+
+    roots = children(None)
+    depths = depth(step_graph=flow.predecessor)
+    inspection, etag = describe(flow=flow)
+
+    return Plan(
+        uids=uids,
+        index=index,
+        steps=steps,
+        successors=successors,
+        predecessors=tuple(tuple(parents) for parents in predecessors),
+        successor_sets=tuple(frozenset(value) for value in successors),
+        main_successors=main_successors,
+        parallel_siblings=parallel_siblings,
+        roots=frozenset(roots),
+        root=roots[0] if roots else NO_STEP,
+        coroutines=frozenset(
+            position
+            for position, step in enumerate(steps)
+            if iscoroutinefunction(step.function)
+        ),
+        topological_order=tuple(
+            index[uid]
+            for uid in topological_order(step_graph=flow.predecessor)
+            if uid in index
+        ),
+        depths=tuple(depths.get(uid, 0) for uid in uids),
+        inspection=inspection,
+        etag=etag,
+    )
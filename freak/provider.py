@@ -5,17 +5,21 @@ from importlib import import_module
 
 
 class EngineProvider:
-    def __init__(self, flow_name: str) -> None:
+    def __init__(self, flow_name: str, asynchronous: bool = False) -> None:
         look_here = f"freak.flows.{flow_name}"
         module = import_module(name=look_here)
-        self.engine = self.find_engine(module=module)
+        self.engine = self.find_engine(module=module, asynchronous=asynchronous)
 
-    def find_engine(self, module: object) -> Any:
-        from freak.engine import Engine
+    def find_engine(self, module: object, asynchronous: bool = False) -> Any:
+        from freak.engine import AsyncEngine, Engine
 
         for _, cls in inspect.getmembers(module, inspect.isclass):
-            if issubclass(cls, Engine) and cls != Engine:
+            if (
+                issubclass(cls, Engine)
+                and cls not in (Engine, AsyncEngine)
+                and cls.asynchronous == asynchronous
+            ):
                 return cls
         else:
 
-            return Engine
+            return AsyncEngine if asynchronous else Engine
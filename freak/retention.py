@@ -0,0 +1,133 @@
+from typing import Any, MutableSequence, Union
+
+import abc
+from collections import deque
+
+from freak.models.response import Response
+from freak.types import Step, StepSummary
+
+"""
+    Retention decides which responses of its steps a run keeps in
+    `EngineResponse.responses`, so that memory held by a run in flight can be
+    bounded. Path traversed by a run is recorded in full whatever is kept.
+"""
+
+RETENTIONS = ("all", "failures", "summaries", "none")
+
+
+class Retention(abc.ABC):
+
+    __slots__ = ()
+
+    def container(self) -> MutableSequence[Any]:
+        """
+        responses of a run are kept in container, which is turned into a
+        list once the run is over.
+        """
+        return []
+
+    @abc.abstractmethod
+    def keep(
+        self, responses: MutableSequence[Any], resp_ctx: Response, step: Step
+    ) -> None:
+        pass
+
+
+class KeepAll(Retention):
+
+    __slots__ = ()
+
+    def keep(
+        self, responses: MutableSequence[Any], resp_ctx: Response, step: Step
+    ) -> None:
+        responses.append(resp_ctx)
+
+
+class KeepNone(Retention):
+    """
+    used by streams, which hand every response over as soon as it is made.
+    """
+
+    __slots__ = ()
+
+    def keep(
+        self, responses: MutableSequence[Any], resp_ctx: Response, step: Step
+    ) -> None:
+        pass
+
+
+class KeepFailures(Retention):
+
+    __slots__ = ()
+
+    def keep(
+        self, responses: MutableSequence[Any], resp_ctx: Response, step: Step
+    ) -> None:
+        if not resp_ctx.success:
+            responses.append(resp_ctx)
+
+
+class KeepSummaries(Retention):
+    """
+    keeps uid, order, success and messages of every step, not its data.
+    """
+
+    __slots__ = ()
+
+    def keep(
+        self, responses: MutableSequence[Any], resp_ctx: Response, step: Step
+    ) -> None:
+        responses.append(
+            StepSummary(
+                uid=step.uid,
+                order=step.order,
+                success=resp_ctx.success,
+                messages=list(resp_ctx.messages),
+            )
+        )
+
+
+class KeepLast(Retention):
+
+    __slots__ = ("count",)
+
+    def __init__(self, count: int) -> None:
+        if count < 1:
+            raise Exception("InvalidRetentionError", count)
+        self.count = count
+
+    def container(self) -> MutableSequence[Any]:
+        # a bounded deque drops its oldest response in constant time.
+        return deque(maxlen=self.count)
+
+    def keep(
+        self, responses: MutableSequence[Any], resp_ctx: Response, step: Step
+    ) -> None:
+        responses.append(resp_ctx)
+
+
+KEEP_ALL = KeepAll()
+KEEP_NONE = KeepNone()
+
+POLICIES = {
+    "all": KEEP_ALL,
+    "failures": KeepFailures(),
+    "summaries": KeepSummaries(),
+    "none": KEEP_NONE,
+}
+
+RETENTION = Union[str, int, Retention]
+
+
+def build_retention(option: RETENTION) -> Retention:
+    """
+    one of RETENTIONS, a number of last responses to keep, or an instance
+    of Retention which is used as is.
+    """
+    if isinstance(option, Retention):
+        return option
+    if isinstance(option, int) and not isinstance(option, bool):
+        return KeepLast(count=option)
+    if option not in POLICIES:
+        raise Exception("InvalidRetentionError", option)
+    return POLICIES[option]
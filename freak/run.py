@@ -0,0 +1,205 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Tuple
+
+from uuid import uuid4
+
+from freak.cancellation import Cancellation
+from freak.models.request import RequestContext
+from freak.models.response import EngineResponse, Response
+from freak.models.state import RunState
+from freak.retention import KEEP_ALL, Retention
+from freak.tracing import CURRENT_SPAN
+from freak.types import Checkpoint
+
+if TYPE_CHECKING:  # pragma: no cover
+    from freak.engine import Engine
+
+
+class Run:
+    """Class for defining state of a single in-flight execution of a flow.
+
+    A run is owned by the caller of the engine, engines themselves do not
+    hold any per-run state.
+    """
+
+    __slots__ = (
+        "engine",
+        "current",
+        "step",
+        "next_steps",
+        "data",
+        "state",
+        "responses",
+        "from_step",
+        "to_step",
+        "to_uid",
+        "last_successful_step",
+        "branches",
+        "run_id",
+        "retention",
+        "span",
+        "ctx",
+        "cancellation",
+    )
+
+    def __init__(
+        self,
+        engine: "Engine",
+        from_step: Optional[str],
+        data: Dict[str, Any],
+        executed_steps: Optional[Mapping[str, Any]] = None,
+        run_id: Optional[str] = None,
+        retention: Retention = KEEP_ALL,
+        deadline: Optional[float] = None,
+        cancellation: Optional[Cancellation] = None,
+    ) -> None:
+        """
+        retention decides which responses the run keeps, runs which are
+        streamed keep none.
+
+        a run with a deadline, or launched by a run which can be cancelled
+        (its cancellation), can be cancelled itself.
+        """
+        plan = engine.plan
+        state = RunState.coerce(executed_steps=executed_steps)
+
+        current = plan.locate(uid=from_step)
+        self.next_steps = engine.get_following_steps(
+            from_step=current,
+            last_step=plan.locate_last(uid=state.last_step),
+        )
+
+        self.engine = engine
+        self.current = current
+        self.step = plan.steps[current]
+        self.data = data
+        self.state = state
+        self.responses = retention.container()
+        self.retention = retention
+        self.branches: List[Any] = []
+
+        # runs of engines with a checkpoint store always have an id.
+        if run_id is None and engine.checkpoint_store is not None:
+            run_id = uuid4().hex
+        self.run_id = run_id
+
+        tracer = engine.tracer
+        self.span = (
+            tracer.start(
+                name="run",
+                category="run",
+                parent=CURRENT_SPAN.get(),
+                flow=engine.module_name,
+                from_step=self.step.uid,
+                run_id=run_id,
+            )
+            if tracer is not None
+            else None
+        )
+
+        order = self.step.order
+        self.from_step, self.to_step, self.last_successful_step = (
+            order,
+            order,
+            order,
+        )
+        self.to_uid = self.step.uid
+        self.ctx: Optional[RequestContext] = None
+        self.cancellation = (
+            Cancellation(deadline=deadline, parent=cancellation)
+            if deadline is not None or cancellation is not None
+            else None
+        )
+
+    def context(self) -> RequestContext:
+        """
+        steps of a run are performed one after another, so a single context
+        is handed to each of them in turn.
+        """
+        step = self.step
+        ctx = self.ctx
+        if ctx is None:
+            ctx = self.ctx = RequestContext(
+                input=self.data,
+                name=step.name,
+                order=step.order,
+            )
+        else:
+            ctx.input = self.data
+            ctx.name = step.name
+            ctx.order = step.order
+            ctx.timings = None
+        ctx.span = self.span
+        ctx.cancellation = self.cancellation
+        return ctx
+
+    def record(self, resp_ctx: Response) -> bool:
+        """
+        records response of current step and moves the run to next step,
+        returns False once run can not go any further.
+        """
+        engine = self.engine
+        step = self.step
+
+        self.retention.keep(self.responses, resp_ctx, step)
+        self.to_step = step.order  # this will refer to last performed step.
+        self.to_uid = step.uid
+
+        engine.after_step(run=self)
+        if not resp_ctx.success:
+            # branches still in flight are of no use to a failed run.
+            if self.cancellation is not None and engine.cancel_branches:
+                self.cancellation.cancel()
+            return False
+
+        next_steps = self.next_steps
+        path: Tuple[str, ...] = ()
+        if next_steps:
+            next_step = engine.get_next_step(
+                resp_ctx=resp_ctx, next_steps=next_steps
+            )
+            path = (engine.plan.uids[next_step],)
+
+        self.state = self.state.advance(uid=step.uid, path=path)
+        self.data = engine.hand_over(resp_ctx)  # type: ignore
+
+        # this will refer last successfully performed action.
+        self.last_successful_step = step.order
+
+        if engine.checkpoint_store is not None:
+            engine.checkpoint_store.save(
+                checkpoint=Checkpoint(
+                    run_id=self.run_id,  # type: ignore
+                    from_step=path[0] if path else None,
+                    data=self.data,
+                    executed_steps=self.state.to_dict(),
+                )
+            )
+
+        if not next_steps:
+            return False
+
+        self.next_steps = engine.get_following_steps(
+            from_step=next_step, last_step=self.current
+        )
+        self.current = next_step
+        self.step = engine.plan.steps[next_step]
+        return True
+
+    def finish(self) -> None:
+        if self.span is not None:
+            self.span.finish()
+
+    def result(self) -> Tuple[EngineResponse, RunState]:
+        self.finish()
+        return (
+            EngineResponse(
+                responses=list(self.responses),
+                from_step=self.from_step,
+                to_step=self.to_step,
+                last_successful_step=self.last_successful_step,
+                branches=self.branches,
+                run_id=self.run_id,
+                to_uid=self.to_uid,
+            ),
+            self.state,
+        )
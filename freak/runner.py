@@ -0,0 +1,238 @@
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+)
+
+import asyncio
+import csv
+import json
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from freak.engine import Engine
+from freak.models.response import EngineResponse
+from freak.models.state import RunState
+from freak.utils import percentile
+
+"""
+    Runner executes a flow for every record of a stream, used by `freak run`.
+
+    At most `window` records are in flight at a time, results are written in
+    order of records as soon as every record before them has finished. So
+    memory stays bounded whatever the number of records.
+"""
+
+RECORD_FORMATS = ("jsonl", "csv")
+
+WRITER = Callable[[Dict[str, Any]], None]
+
+
+def detect_format(path: Optional[str]) -> str:
+    if path and path.lower().endswith(".csv"):
+        return "csv"
+    return "jsonl"
+
+
+def read_records(file: TextIO, record_format: str) -> Iterator[Dict[str, Any]]:
+    """
+    csv cells holding a JSON literal (number, boolean, null) are decoded,
+    other cells are kept as strings.
+    """
+    if record_format not in RECORD_FORMATS:
+        raise Exception("InvalidRecordFormatError", record_format)
+
+    if record_format == "csv":
+        for row in csv.DictReader(file):
+            yield {key: decode_cell(value=value) for key, value in row.items()}
+        return
+
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def decode_cell(value: str) -> Any:
+    try:
+        decoded = json.loads(value)
+    except ValueError:
+        return value
+    return decoded if not isinstance(decoded, (dict, list, str)) else value
+
+
+class Runner:
+    def __init__(
+        self,
+        engine: Engine,
+        from_step: Optional[str] = None,
+        workers: int = 8,
+        window: Optional[int] = None,
+    ) -> None:
+        """
+        window defaults to four records per worker. async engines run steps
+        which are not coroutines on engine pool, workers is not used.
+        """
+        window = window or 4 * workers
+        if workers < 1 or window < 1:
+            raise Exception("InvalidWindowError")
+
+        self.engine = engine
+        self.from_step = from_step
+        self.workers = workers
+        self.window = window
+
+        self.latencies: List[float] = []
+        self.failures: Dict[str, int] = {}
+        self.succeeded = 0
+        self.failed = 0
+
+    def describe(
+        self,
+        index: int,
+        output: EngineResponse,
+        path_traversed: RunState,
+        latency: float,
+    ) -> Dict[str, Any]:
+        last = output.responses[-1] if output.responses else None
+        success = last is not None and last.success
+        result = {
+            "index": index,
+            "success": success,
+            "last_successful_step": output.last_successful_step,
+            "to_step": output.to_step,
+            "path_traversed": path_traversed.to_dict(),
+            "latency": latency,
+        }
+        if success:
+            result["output"] = last.output  # type: ignore
+        elif last is not None:
+            result["failed_step"] = output.to_uid
+            result["messages"] = last.messages
+        return result
+
+    def failure(
+        self, index: int, err: Exception, latency: float
+    ) -> Dict[str, Any]:
+        return {
+            "index": index,
+            "success": False,
+            "error": repr(err),
+            "latency": latency,
+        }
+
+    def record(self, result: Dict[str, Any], write: WRITER) -> None:
+        self.latencies.append(result["latency"])
+        if result["success"]:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+            step = result.get("failed_step", "exception")
+            self.failures[step] = self.failures.get(step, 0) + 1
+        write(result)
+
+    def execute(self, index: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            output, path_traversed = self.engine.execute(
+                from_step=self.from_step, data=data
+            )
+        except Exception as err:
+            return self.failure(
+                index=index, err=err, latency=time.perf_counter() - started
+            )
+        return self.describe(
+            index=index,
+            output=output,
+            path_traversed=path_traversed,
+            latency=time.perf_counter() - started,
+        )
+
+    async def execute_async(
+        self, index: int, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            output, path_traversed = await self.engine.execute(  # type: ignore
+                from_step=self.from_step, data=data
+            )
+        except Exception as err:
+            return self.failure(
+                index=index, err=err, latency=time.perf_counter() - started
+            )
+        return self.describe(
+            index=index,
+            output=output,
+            path_traversed=path_traversed,
+            latency=time.perf_counter() - started,
+        )
+
+    def run(
+        self, records: Iterable[Dict[str, Any]], write: WRITER
+    ) -> Dict[str, Any]:
+        """
+        executes flow for every record, write is called with result of every
+        record in order of records. returns summary of the run.
+        """
+        started = time.perf_counter()
+        if self.engine.asynchronous:
+            asyncio.run(self.run_async(records=records, write=write))
+        else:
+            self.run_threads(records=records, write=write)
+        return self.summary(elapsed=time.perf_counter() - started)
+
+    def run_threads(
+        self, records: Iterable[Dict[str, Any]], write: WRITER
+    ) -> None:
+        # runs wait for their parallel branches, which run on engine pool.
+        # so records get a pool of their own.
+        in_flight: Deque["Future[Dict[str, Any]]"] = deque()
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="freak-runner"
+        ) as pool:
+            for index, data in enumerate(records):
+                if len(in_flight) >= self.window:
+                    result = in_flight.popleft().result()
+                    self.record(result=result, write=write)
+                in_flight.append(pool.submit(self.execute, index, data))
+
+            while in_flight:
+                self.record(result=in_flight.popleft().result(), write=write)
+
+    async def run_async(
+        self, records: Iterable[Dict[str, Any]], write: WRITER
+    ) -> None:
+        in_flight: Deque["asyncio.Task[Dict[str, Any]]"] = deque()
+        for index, data in enumerate(records):
+            if len(in_flight) >= self.window:
+                self.record(result=await in_flight.popleft(), write=write)
+            in_flight.append(
+                asyncio.ensure_future(self.execute_async(index, data))
+            )
+
+        while in_flight:
+            self.record(result=await in_flight.popleft(), write=write)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        records = len(latencies)
+        return {
+            "records": records,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed": elapsed,
+            "throughput": records / elapsed if elapsed else 0.0,
+            "latency": {
+                "p50": percentile(values=latencies, fraction=0.5),
+                "p95": percentile(values=latencies, fraction=0.95),
+                "p99": percentile(values=latencies, fraction=0.99),
+                "max": latencies[-1] if latencies else 0.0,
+            },
+            "failures": dict(self.failures),
+        }
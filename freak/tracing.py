@@ -0,0 +1,256 @@
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    ContextManager,
+    Dict,
+    List,
+    Optional,
+)
+
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from itertools import count
+
+from freak.models.request import RequestContext
+from freak.models.response import Response
+from freak.types import FUNC_TYPE
+
+"""
+    Tracer records spans of runs (run, step, validation, hooks, branch) with
+    links to their parent span and ids of threads they ran on. Spans can be
+    exported as Chrome trace events, to be opened in chrome://tracing or
+    Perfetto.
+
+    Span of a run is parent of its steps, span of a step is parent of its
+    phases, and span of a branch (which lasts until branch returns) is
+    parent of run of the branch.
+"""
+
+# span under which runs started in current context are recorded.
+CURRENT_SPAN: ContextVar[Optional["Span"]] = ContextVar(
+    "CURRENT_SPAN", default=None
+)
+
+NO_SPAN = nullcontext()
+
+
+class Span:
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "category",
+        "span_id",
+        "parent_id",
+        "start",
+        "end",
+        "thread_id",
+        "args",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        category: str,
+        parent_id: Optional[int],
+        args: Dict[str, Any],
+    ) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.span_id = next(tracer.ids)
+        self.parent_id = parent_id
+        self.thread_id = threading.get_native_id()
+        self.args = args
+        self.end: Optional[float] = None
+        self.start = time.perf_counter()
+
+    def child(self, name: str, category: str, **args: Any) -> "Span":
+        return self.tracer.start(
+            name=name, category=category, parent=self, **args
+        )
+
+    def finish(self, *_: Any) -> None:
+        """
+        also used as done callback of futures, which passes the future.
+        spans may be finished more than once, e.g. by a run and its stream.
+        """
+        if self.end is None:
+            self.end = time.perf_counter()
+            self.tracer.spans.append(self)
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.finish()
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.ids = count(1)
+        self.origin = time.perf_counter()
+        # finished spans, list.append is atomic so no lock is needed.
+        self.spans: List[Span] = []
+
+    def start(
+        self,
+        name: str,
+        category: str,
+        parent: Optional[Span] = None,
+        **args: Any,
+    ) -> Span:
+        return Span(
+            tracer=self,
+            name=name,
+            category=category,
+            parent_id=parent.span_id if parent else None,
+            args=args,
+        )
+
+    def clear(self) -> None:
+        self.spans = []
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """
+        spans as complete ("X") events. a span started on a different thread
+        than its parent also gets a flow arrow from parent to it.
+        """
+        pid = os.getpid()
+        spans = list(self.spans)
+        threads = {span.span_id: span.thread_id for span in spans}
+
+        events = []
+        for span in spans:
+            start = (span.start - self.origin) * 1e6
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": start,
+                    "dur": (span.end - span.start) * 1e6,  # type: ignore
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": {
+                        "span_id": span.span_id,
+                        "parent_id": span.parent_id,
+                        **span.args,
+                    },
+                }
+            )
+
+            parent_thread = threads.get(span.parent_id)  # type: ignore
+            if parent_thread is not None and parent_thread != span.thread_id:
+                link = {
+                    "name": "link",
+                    "cat": "link",
+                    "id": span.span_id,
+                    "ts": start,
+                    "pid": pid,
+                }
+                events.append({**link, "ph": "s", "tid": parent_thread})
+                events.append(
+                    {**link, "ph": "f", "bp": "e", "tid": span.thread_id}
+                )
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str) -> str:
+        """
+        writes chrome trace of recorded spans to path.
+        """
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(file=temp_path, mode="wt") as file:
+            json.dump(self.to_chrome(), file, default=str)
+        os.replace(temp_path, path)
+        return path
+
+
+def phase(ctx: RequestContext, name: str) -> ContextManager[Any]:
+    """
+    span of a phase of step (validation, hooks), nothing if run is not traced.
+    """
+    span = ctx.span
+    if span is None:
+        return NO_SPAN
+    child: Span = span.child(name=name, category="phase")
+    return child
+
+
+def within(span: Optional[Span], func: Callable[..., Any], *args: Any) -> Any:
+    """
+    calls func with span as current span, used for runs of branches.
+    """
+    token = CURRENT_SPAN.set(span)
+    try:
+        return func(*args)
+    finally:
+        CURRENT_SPAN.reset(token)
+
+
+async def within_async(span: Optional[Span], awaitable: Awaitable[Any]) -> Any:
+    # a task runs in its own copy of context, nothing to reset.
+    CURRENT_SPAN.set(span)
+    return await awaitable
+
+
+def trace(function: FUNC_TYPE, uid: str) -> FUNC_TYPE:
+    """
+    wraps a step so that every call of it is recorded as a span, under span
+    of its run.
+    """
+    if iscoroutinefunction(function):
+
+        @wraps(function)
+        async def async_caller(ctx: RequestContext) -> Response:
+            parent = ctx.span
+            if parent is None:
+                return await function(ctx=ctx)  # type: ignore
+
+            ctx.span = span = parent.child(name=uid, category="step")
+            try:
+                response: Response = await function(ctx=ctx)  # type: ignore
+            finally:
+                span.finish()
+                ctx.span = parent
+            return response
+
+        return async_caller  # type: ignore
+
+    @wraps(function)
+    def caller(ctx: RequestContext) -> Response:
+        parent = ctx.span
+        if parent is None:
+            return function(ctx=ctx)  # type: ignore
+
+        ctx.span = span = parent.child(name=uid, category="step")
+        try:
+            return function(ctx=ctx)  # type: ignore
+        finally:
+            span.finish()
+            ctx.span = parent
+
+    call_batch = getattr(function, "call_batch", None)
+    if call_batch is not None:
+
+        def traced_batch(ctxs: List[RequestContext]) -> List[Response]:
+            parent = ctxs[0].span if ctxs else None
+            if parent is None:
+                responses: List[Response] = call_batch(ctxs=ctxs)
+                return responses
+
+            with parent.child(name=uid, category="step", batch=len(ctxs)):
+                return call_batch(ctxs=ctxs)  # type: ignore
+
+        caller.call_batch = traced_batch  # type: ignore
+
+    return caller
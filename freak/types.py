@@ -1,36 +1,94 @@
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+from types import MappingProxyType
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Protocol,
+    Set,
+    Tuple,
+    Union,
+)
 
 from collections import deque
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from freak.models.request import RequestContext
 from freak.models.response import Response
 
 CONTEXT = Dict[str, Any]
 FUNC_TYPE = Callable[[RequestContext], Response]
-FIRST_WRAPPER_RESPONSE = FUNC_TYPE
-DECORATOR_RESPONSE = Callable[[FUNC_TYPE], FUNC_TYPE]
+# steps marked batch=True take every context of a batch at once.
+BATCH_FUNC_TYPE = Callable[[List[RequestContext]], List[Response]]
+# steps defined with `async def`, run by async engines only.
+ASYNC_FUNC_TYPE = Callable[[RequestContext], Awaitable[Response]]
+STEP_FUNC_TYPE = Union[FUNC_TYPE, BATCH_FUNC_TYPE, ASYNC_FUNC_TYPE]
 
 LIST_OF_TUPLE = List[Tuple[int, str]]
 
 
-@dataclass
-class Step:
+class StepFunction(Protocol):
+    """
+    step as returned by flow decorators, see base_flow.
+    """
+
+    options: Mapping[str, Any]
+
+    def __call__(self, ctx: RequestContext) -> Response:
+        ...
+
+    def fetch_schema(self) -> Response:
+        ...
+
+
+FIRST_WRAPPER_RESPONSE = StepFunction
+DECORATOR_RESPONSE = Callable[[STEP_FUNC_TYPE], FIRST_WRAPPER_RESPONSE]
+
+
+class Step(NamedTuple):
     uid: str
     parent_uid: Optional[str]
     order: int
     name: str
     function: Optional[FUNC_TYPE] = None
+    # keyword arguments given to flow decorator of the step.
+    options: Mapping[str, Any] = MappingProxyType({})
 
 
 Steps = List[Step]
 
 
+class StepSummary(NamedTuple):
+    """
+    kept by runs in place of responses, see freak.retention.
+    """
+
+    uid: str
+    order: int
+    success: bool
+    messages: List[str]
+
+
 @dataclass
 class Flow:
     successor: Dict[str, Step]
     predecessor: Dict[Union[str, None], List[str]]
     parallels: Set[str]
+    # input schema of every step, by uid.
+    schemas: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Checkpoint:
+    run_id: str
+    # step a resumed run starts from, None once run has finished.
+    from_step: Optional[str]
+    data: Dict[str, Any]
+    executed_steps: Dict[str, Any]
 
 
 ORGANIZER_TYPE = Callable[..., Flow]
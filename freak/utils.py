@@ -1,36 +1,37 @@
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
 
 from concurrent.futures import Executor, Future
-from itertools import repeat
 
-from freak.models.response import EngineResponse
-from networkx import DiGraph
-from networkx.algorithms.dag import is_directed_acyclic_graph
+from freak.graph import find_cycle
 
 
 def submit_and_execute_single_job(
     executor: Executor,
-    func: Callable[..., Tuple[EngineResponse, Dict[str, Any]]],
-    job_args: Tuple[str, Any, Dict[str, Any]],
+    func: Callable[..., Any],
+    job_args: Tuple[str, Any, Mapping[str, Any]],
 ) -> Future:  # type: ignore
     future = executor.submit(func, *job_args)
     return future
 
 
-def validate_flow(step_graph: Dict[Optional[str], List[str]]) -> bool:
-    """
-    flow must be a DAG.
-    """
+def completed(result: Any) -> Future:  # type: ignore
+    future: Future = Future()  # type: ignore
+    future.set_result(result)
+    return future
 
-    edges: List[str] = []
-    for key, value in step_graph.items():
-        if key is None or not value:
-            continue
 
-        edges.extend(zip(repeat(key, len(value)), value))  # type: ignore
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    values must be sorted.
+    """
+    if not values:
+        return 0.0
+    position = min(int(len(values) * fraction), len(values) - 1)
+    return values[position]
 
-    graph = DiGraph()
-    graph.add_edges_from(edges)
 
-    is_dag: bool = is_directed_acyclic_graph(graph)
-    return is_dag
+def validate_flow(step_graph: Dict[Optional[str], List[str]]) -> bool:
+    """
+    flow must be a DAG.
+    """
+    return not find_cycle(step_graph=step_graph)
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from freak.bulkhead import Bulkhead
+from freak.flows.base_flow import base_flow
+from freak.metrics import MetricsRegistry
+from freak.models.input import InputModel
+from freak.models.request import RequestContext
+from freak.models.response import Response, SuccessResponseContext
+from freak.provider import EngineProvider
+
+lock = threading.Lock()
+in_flight = {"now": 0, "most": 0}
+
+
+def enter() -> None:
+    with lock:
+        in_flight["now"] += 1
+        in_flight["most"] = max(in_flight["most"], in_flight["now"])
+
+
+def leave() -> None:
+    with lock:
+        in_flight["now"] -= 1
+
+
+@base_flow(
+    name="slow_one",
+    order=1,
+    input_model=InputModel,
+    uid="slow_one",
+    parent_uid=None,
+    max_concurrency=2,
+)
+def slow_one(ctx: RequestContext) -> Response:
+    enter()
+    time.sleep(0.02)
+    leave()
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+@base_flow(
+    name="slow_two",
+    order=2,
+    input_model=InputModel,
+    uid="slow_two",
+    parent_uid="slow_one",
+)
+async def slow_two(ctx: RequestContext) -> Response:
+    enter()
+    await asyncio.sleep(0.02)
+    leave()
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+def test_bulkhead_rejects_after_queue_timeout():
+    bulkhead = Bulkhead(uid="step", limit=1, queue_timeout=0.01, timed=True)
+    ctx = RequestContext(input={"a": 1}, name="step", order=1)
+
+    def nested():
+        # slot is held by the outer call.
+        return bulkhead.call(ctxs=(ctx,), func=lambda: "called")
+
+    rejection = bulkhead.call(ctxs=(ctx,), func=nested)
+    assert rejection.success == False
+    assert rejection.messages == ["ConcurrencyLimitError: step"]
+    assert bulkhead.rejected == 1
+
+    assert bulkhead.call(ctxs=(ctx,), func=lambda: "called") == "called"
+    assert ctx.timings["queue"] < 0.01
+
+    for limit in (0, True, 1.5):
+        try:
+            Bulkhead(uid="step", limit=limit)
+        except Exception as err:
+            assert err.args == ("InvalidConcurrencyError", "step", limit)
+        else:
+            assert False
+
+
+def test_bulkhead_limits_async_engine():
+    engine = EngineProvider(flow_name="base_flow", asynchronous=True).engine
+    registry = MetricsRegistry()
+    executioner = engine(
+        module_name=__name__,
+        decorator_name="base_flow",
+        max_concurrency=1,
+        metrics=registry,
+    )
+    # decorator of a step overrides limit of the engine.
+    assert [bulkhead.limit for bulkhead in executioner.bulkheads] == [2, 1]
+
+    in_flight["most"] = 0
+
+    async def execute_all():
+        return await asyncio.gather(
+            *(
+                executioner.execute(from_step="slow_one", data={"a": 1, "b": 2})
+                for _ in range(6)
+            )
+        )
+
+    results = asyncio.run(execute_all())
+    assert all(output.last_successful_step == 2 for output, _ in results)
+    # steps overlap, but calls of a step never exceed its limit.
+    assert 1 <= in_flight["most"] <= 3
+
+    snapshot = registry.snapshot()[__name__]
+    assert snapshot["slow_one"]["queue"]["count"] == 6
+    assert snapshot["slow_two"]["queue"]["count"] == 6
+    # calls of second step queue up behind a single slot.
+    assert snapshot["slow_two"]["queue"]["sum"] >= 0.1
+    executioner.shutdown()
+
+
+def test_bulkhead_limits_threads():
+    bulkhead = Bulkhead(uid="step", limit=2)
+    ctx = RequestContext(input={}, name="step", order=1)
+    in_flight["most"] = 0
+
+    def call():
+        enter()
+        time.sleep(0.01)
+        leave()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(16):
+            pool.submit(bulkhead.call, (ctx,), call)
+
+    assert in_flight["most"] == 2
@@ -0,0 +1,203 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from freak.cache import StepCache, build_cache
+from freak.flows.base_flow import base_flow
+from freak.models.input import InputModel
+from freak.models.request import RequestContext
+from freak.models.response import ErrorResponseContext, SuccessResponseContext
+
+CALLS = []
+
+
+@base_flow(
+    name="add",
+    order=1,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="add",
+    parent_uid=None,
+    cache=True,
+)
+def add(ctx: RequestContext) -> SuccessResponseContext:
+    CALLS.append(ctx.input)
+    return SuccessResponseContext(
+        input=ctx.input, output={"sum": ctx.input["a"] + ctx.input["b"]}
+    )
+
+
+def build_ctx(**data: int) -> RequestContext:
+    return RequestContext(input=data, name="add", order=1)
+
+
+def test_cache_memoizes_step() -> None:
+    CALLS.clear()
+    add.cache.clear()
+
+    first = add(ctx=build_ctx(a=1, b=2))
+    second = add(ctx=build_ctx(b=2, a=1))
+    assert first.output == second.output == {"sum": 3}
+    assert first is not second
+    assert len(CALLS) == 1
+
+    # invalid input is not cached.
+    assert add(ctx=build_ctx(a=1)).success == False
+    assert add(ctx=build_ctx(a=1)).success == False
+
+    stats = add.cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["size"] == 1
+
+
+def test_cache_lru_and_ttl() -> None:
+    cache = StepCache(max_size=2, ttl=0.05)
+    for value in range(3):
+        cache.set(
+            key=str(value),
+            response=SuccessResponseContext(input={}, output={"v": value}),
+        )
+    cache.set(key="error", response=ErrorResponseContext(input={}, messages=[]))
+
+    assert cache.get(key="0") is None
+    assert cache.get(key="2").output == {"v": 2}
+    assert cache.get(key="error") is None
+
+    time.sleep(0.06)
+    assert cache.get(key="2") is None
+    assert cache.stats()["evictions"] == 2
+
+
+def test_cache_disk_tier(tmp_path) -> None:
+    writer = StepCache(directory=str(tmp_path))
+    writer.set(key="k", response=SuccessResponseContext(input={}, output={}))
+
+    reader = build_cache(option={"directory": str(tmp_path)})
+    assert reader.get(key="k").success == True
+    assert reader.get(key="k").success == True
+    assert reader.stats()["disk_hits"] == 1
+    assert reader.stats()["hits"] == 1
+
+    reader.clear()
+    assert writer.read(key="k") is None
+
+
+def test_cache_single_flight() -> None:
+    cache = StepCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def func() -> SuccessResponseContext:
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return SuccessResponseContext(input={}, output={"done": True})
+
+    ctx = build_ctx(a=1, b=1)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(cache.call, ctx, func)
+        started.wait(timeout=5)
+        followers = [pool.submit(cache.call, ctx, func) for _ in range(3)]
+        while cache.stats()["coalesced"] < 3:
+            time.sleep(0.001)
+        release.set()
+
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1
+    assert all(result.output == {"done": True} for result in results)
+
+
+def test_cache_single_flight_async() -> None:
+    cache = StepCache()
+    calls = []
+
+    async def func() -> SuccessResponseContext:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return SuccessResponseContext(input={}, output={"done": True})
+
+    async def main() -> list:
+        ctx = build_ctx(a=1, b=1)
+        return await asyncio.gather(
+            *[cache.acall(ctx=ctx, func=func) for _ in range(4)]
+        )
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert len(results) == 4
+    assert cache.stats()["coalesced"] == 3
+
+
+def test_cache_is_scoped_by_step(tmp_path) -> None:
+    shared = StepCache(directory=str(tmp_path))
+
+    # two flows with a step of same name, sharing a cache.
+    def doubled(ctx: RequestContext) -> SuccessResponseContext:
+        return SuccessResponseContext(
+            input=ctx.input, output={"total": 2 * ctx.input["a"]}
+        )
+
+    def squared(ctx: RequestContext) -> SuccessResponseContext:
+        return SuccessResponseContext(
+            input=ctx.input, output={"total": ctx.input["a"] ** 2}
+        )
+
+    steps = [
+        base_flow(
+            name="total",
+            order=1,
+            input_model=InputModel,
+            uid="total",
+            parent_uid=None,
+            cache=shared,
+        )(func)
+        for func in (doubled, squared)
+    ]
+    assert [step(ctx=build_ctx(a=3, b=0)).output for step in steps] == [
+        {"total": 6},
+        {"total": 9},
+    ]
+
+    # disk tier keeps them apart as well.
+    shared.entries.clear()
+    assert [step(ctx=build_ctx(a=3, b=0)).output for step in steps] == [
+        {"total": 6},
+        {"total": 9},
+    ]
+    assert shared.stats()["disk_hits"] == 2
+
+
+def test_cache_skips_input_which_is_not_json() -> None:
+    class Point:
+        def __init__(self, x: int) -> None:
+            self.x = x
+
+        def __repr__(self) -> str:
+            return "Point"
+
+    cache = StepCache()
+    calls = []
+
+    def call(x: int) -> SuccessResponseContext:
+        ctx = RequestContext(input={"p": Point(x=x)}, name="add", order=1)
+        assert cache.key(ctx=ctx) is None
+
+        def func() -> SuccessResponseContext:
+            calls.append(x)
+            return SuccessResponseContext(input={}, output={"x": x})
+
+        return cache.call(ctx=ctx, func=func)
+
+    # points of same repr are not mistaken for each other.
+    assert [call(x=x).output for x in (1, 2, 1)] == [
+        {"x": 1},
+        {"x": 2},
+        {"x": 1},
+    ]
+    assert calls == [1, 2, 1]
+    assert cache.stats()["uncacheable"] == 3
+    assert cache.stats()["size"] == 0
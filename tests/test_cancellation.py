@@ -0,0 +1,241 @@
+import asyncio
+import threading
+import time
+
+from freak.cancellation import Cancellation, deadline_in
+from freak.flows.base_flow import base_flow
+from freak.flows.parallel_flow import parallel_flow
+from freak.models.input import InputModel
+from freak.models.request import RequestContext
+from freak.models.response import (
+    ErrorResponseContext,
+    Response,
+    SuccessResponseContext,
+)
+from freak.provider import EngineProvider
+
+released = threading.Event()
+branch_started = threading.Event()
+
+
+@base_flow(
+    name="quick",
+    order=1,
+    input_model=InputModel,
+    uid="quick",
+    parent_uid=None,
+)
+def quick(ctx: RequestContext) -> Response:
+    time.sleep(ctx.input.get("sleep", 0))
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+@base_flow(
+    name="hung",
+    order=2,
+    input_model=InputModel,
+    uid="hung",
+    parent_uid="quick",
+    timeout=0.05,
+)
+def hung(ctx: RequestContext) -> Response:
+    released.wait(timeout=5)
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+@parallel_flow(
+    name="main_one",
+    order=1,
+    input_model=InputModel,
+    uid="main_one",
+    parent_uid=None,
+)
+def main_one(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+@parallel_flow(
+    name="main_two",
+    order=2,
+    input_model=InputModel,
+    uid="main_two",
+    parent_uid="main_one",
+)
+def main_two(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+@parallel_flow(
+    name="main_three",
+    order=3,
+    input_model=InputModel,
+    uid="main_three",
+    parent_uid="main_two",
+)
+def main_three(ctx: RequestContext) -> Response:
+    # fails once branch launched by main_two is in flight.
+    branch_started.wait(timeout=5)
+    return ErrorResponseContext(input=ctx.input, messages=["failed"])
+
+
+@parallel_flow(
+    name="branch_one",
+    order=4,
+    input_model=InputModel,
+    uid="branch_one",
+    parent_uid="main_one",
+    is_parallel=True,
+)
+def branch_one(ctx: RequestContext) -> Response:
+    branch_started.set()
+    released.wait(timeout=5)
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+@parallel_flow(
+    name="branch_two",
+    order=5,
+    input_model=InputModel,
+    uid="branch_two",
+    parent_uid="branch_one",
+)
+def branch_two(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+def test_cancellation():
+    parent = Cancellation(deadline=deadline_in(60))
+    child = Cancellation(deadline=deadline_in(120), parent=parent)
+    assert child.deadline == parent.deadline
+    assert child.cancelled is None
+
+    child.cancel()
+    assert (parent.cancelled, child.cancelled) == (None, "CancelledError")
+
+    parent.cancel(reason="DeadlineExceededError")
+    assert Cancellation(parent=parent).cancelled == "DeadlineExceededError"
+    assert Cancellation(deadline=deadline_in(0)).cancelled == (
+        "DeadlineExceededError"
+    )
+
+
+def test_step_timeout_and_deadline():
+    engine = EngineProvider(flow_name="base_flow").engine
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+    released.clear()
+
+    started = time.perf_counter()
+    output, path_traversed = executioner.execute(
+        from_step="quick", data={"a": 1, "b": 2}
+    )
+    assert time.perf_counter() - started < 1
+    assert output.last_successful_step == 1
+    assert output.responses[1].messages == ["StepTimeoutError: hung"]
+    assert path_traversed["last_step"] == "quick"
+
+    # deadline bounds steps further than their timeout.
+    output, _ = executioner.execute(
+        from_step="quick", data={"a": 1, "b": 2}, deadline=deadline_in(0.03)
+    )
+    assert output.responses[1].messages == ["DeadlineExceededError: hung"]
+
+    # steps are not started past deadline of their run.
+    output, _ = executioner.execute(
+        from_step="quick",
+        data={"a": 1, "b": 2, "sleep": 0.02},
+        deadline=deadline_in(0.01),
+    )
+    assert output.responses[0].success == True
+    assert output.responses[1].messages == ["DeadlineExceededError: hung"]
+
+    output, _ = executioner.execute(
+        from_step="quick", data={"a": 1, "b": 2}, deadline=deadline_in(0)
+    )
+    assert [resp.messages for resp in output.responses] == [
+        ["DeadlineExceededError: quick"]
+    ]
+
+    released.set()
+    executioner.shutdown()
+
+
+def test_step_timeout_async():
+    engine = EngineProvider(flow_name="base_flow", asynchronous=True).engine
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+    released.clear()
+
+    output, _ = asyncio.run(
+        executioner.execute(from_step="quick", data={"a": 1, "b": 2})
+    )
+    assert output.responses[1].messages == ["StepTimeoutError: hung"]
+
+    results = asyncio.run(
+        executioner.execute_many(
+            from_step="quick",
+            records=[{"a": 1, "b": 2, "sleep": 0.02}],
+            deadline=deadline_in(0.01),
+        )
+    )
+    [(output, _)] = results
+    # sync steps of async engines are bounded by deadline as well.
+    assert output.responses[0].messages == ["DeadlineExceededError: quick"]
+
+    released.set()
+    executioner.shutdown()
+
+
+def test_failed_run_cancels_branches():
+    engine = EngineProvider(flow_name="parallel_flow").engine
+    executioner = engine(module_name=__name__, cancel_branches=True)
+    released.clear()
+    branch_started.clear()
+
+    output, _ = executioner.execute(
+        from_step="main_one", data={"a": 1, "b": 2}, join=False
+    )
+    assert output.responses[-1].success == False
+    released.set()
+
+    [(branch, path_traversed)] = output.join(timeout=5)
+    assert branch.last_successful_step == 4
+    assert branch.responses[-1].messages == ["CancelledError: branch_two"]
+    assert path_traversed["last_step"] == "branch_one"
+
+    executioner.shutdown()
+
+
+def test_hung_step_does_not_starve_other_steps():
+    engine = EngineProvider(flow_name="base_flow").engine
+    executioner = engine(
+        module_name=__name__,
+        decorator_name="base_flow",
+        max_workers=1,
+        step_timeout=0.5,
+    )
+    released.clear()
+
+    # every run leaves a call of hung behind, filling its only worker.
+    for _ in range(3):
+        output, _ = executioner.execute(
+            from_step="quick", data={"a": 1, "b": 2}
+        )
+        assert output.responses[0].success == True
+        assert output.responses[1].messages == ["StepTimeoutError: hung"]
+
+    engine = EngineProvider(flow_name="base_flow", asynchronous=True).engine
+    async_executioner = engine(
+        module_name=__name__,
+        decorator_name="base_flow",
+        max_workers=1,
+        step_timeout=0.5,
+    )
+    for _ in range(3):
+        output, _ = asyncio.run(
+            async_executioner.execute(from_step="quick", data={"a": 1, "b": 2})
+        )
+        assert output.responses[0].success == True
+        assert output.responses[1].messages == ["StepTimeoutError: hung"]
+
+    released.set()
+    executioner.shutdown()
+    async_executioner.shutdown()
@@ -0,0 +1,214 @@
+import asyncio
+import datetime
+
+import pytest
+from freak.checkpoint import FileCheckpointStore, SQLiteCheckpointStore
+from freak.engine import AsyncEngine, Engine
+from freak.flows.base_flow import base_flow
+from freak.models.input import InputModel
+from freak.models.request import RequestContext
+from freak.models.response import (
+    ErrorResponseContext,
+    Response,
+    SuccessResponseContext,
+)
+from freak.types import Checkpoint
+
+CALLS = []
+FAILING = set()
+
+
+def build_step(name: str):  # type: ignore
+    def step(ctx: RequestContext) -> Response:
+        CALLS.append(name)
+        if name in FAILING:
+            return ErrorResponseContext(input=ctx.input, messages=["failed"])
+
+        ctx.input["a"] += 1
+        return SuccessResponseContext(input=ctx.input, output={})
+
+    step.__name__ = name
+    return step
+
+
+@base_flow(
+    name="step_one",
+    order=1,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="step_one",
+    parent_uid=None,
+)
+def step_one(ctx: RequestContext) -> Response:
+    return build_step(name="step_one")(ctx=ctx)
+
+
+@base_flow(
+    name="step_two",
+    order=2,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="step_two",
+    parent_uid="step_one",
+)
+def step_two(ctx: RequestContext) -> Response:
+    return build_step(name="step_two")(ctx=ctx)
+
+
+@base_flow(
+    name="step_three",
+    order=3,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="step_three",
+    parent_uid="step_two",
+)
+def step_three(ctx: RequestContext) -> Response:
+    return build_step(name="step_three")(ctx=ctx)
+
+
+def test_checkpoint_resume(tmp_path) -> None:  # type: ignore
+    for store_class in (SQLiteCheckpointStore, FileCheckpointStore):
+        check_resume(
+            store_class=store_class,
+            path=str(tmp_path / store_class.__name__),
+        )
+
+
+def check_resume(store_class, path: str) -> None:  # type: ignore
+    CALLS.clear()
+    FAILING.clear()
+    FAILING.add("step_three")
+
+    store = store_class(path)
+    engine = Engine(
+        module_name=__name__, decorator_name="base_flow", checkpoint_store=store
+    )
+    output, _ = engine.execute(from_step=None, data={"a": 0, "b": 0})
+    assert output.last_successful_step == 2
+    run_id = output.run_id
+    store.close()
+
+    # a new process picks up the run from its last checkpoint.
+    FAILING.clear()
+    CALLS.clear()
+    store = store_class(path)
+    engine = Engine(
+        module_name=__name__, decorator_name="base_flow", checkpoint_store=store
+    )
+    assert store.load(run_id=run_id).data == {"a": 2, "b": 0}
+
+    output, path_traversed = engine.resume(run_id=run_id)
+    assert CALLS == ["step_three"]
+    assert output.run_id == run_id
+    assert path_traversed["traversed"] == {
+        "step_one": ["step_two"],
+        "step_two": ["step_three"],
+        "step_three": [],
+    }
+
+    with pytest.raises(Exception, match="RunFinishedError"):
+        engine.resume(run_id=run_id)
+    with pytest.raises(Exception, match="CheckpointNotFoundError"):
+        engine.resume(run_id="missing")
+    store.close()
+
+
+def test_checkpoint_resume_async(tmp_path) -> None:  # type: ignore
+    FAILING.clear()
+    FAILING.add("step_two")
+
+    store = SQLiteCheckpointStore(":memory:")
+    engine = AsyncEngine(
+        module_name=__name__, decorator_name="base_flow", checkpoint_store=store
+    )
+    output, _ = asyncio.run(
+        engine.execute(from_step=None, data={"a": 0, "b": 0})
+    )
+    assert output.last_successful_step == 1
+
+    FAILING.clear()
+    output, _ = asyncio.run(engine.resume(run_id=output.run_id))
+    assert output.from_step == 2
+    assert output.last_successful_step == 3
+    engine.shutdown()
+
+
+def test_checkpoint_group_commit(tmp_path) -> None:  # type: ignore
+    path = str(tmp_path / "checkpoints.jsonl")
+    store = FileCheckpointStore(path, batch_size=3, flush_interval=60)
+
+    for position in range(5):
+        store.save(
+            checkpoint=Checkpoint(
+                run_id=f"run-{position % 2}",
+                from_step="step_two",
+                data={"a": position},
+                executed_steps={},
+            )
+        )
+        # both runs fit in one batch, nothing is written before flush.
+        assert store.read(run_id="run-0") is None
+
+    assert store.load(run_id="run-0").data == {"a": 4}
+    store.flush()
+    with open(path) as file:
+        assert len(file.readlines()) == 2
+
+    with open(path, "a") as file:
+        file.write('{"run_id": "run-')
+
+    reopened = FileCheckpointStore(path)
+    assert reopened.load(run_id="run-1").data == {"a": 3}
+    reopened.compact()
+    with open(path) as file:
+        assert len(file.readlines()) == 2
+
+
+def test_checkpoint_file_recovers_from_torn_write(tmp_path) -> None:  # type: ignore
+    path = str(tmp_path / "checkpoints.jsonl")
+
+    def checkpoint(run_id: str) -> Checkpoint:
+        return Checkpoint(
+            run_id=run_id, from_step=None, data={"a": 1}, executed_steps={}
+        )
+
+    store = FileCheckpointStore(path, batch_size=1)
+    store.save(checkpoint=checkpoint(run_id="a"))
+    store.close()
+    # crash while writing checkpoint of run c.
+    with open(path, "a") as file:
+        file.write('{"run_id": "c", "da')
+
+    store = FileCheckpointStore(path, batch_size=1)
+    assert list(store.index) == ["a"]
+    store.save(checkpoint=checkpoint(run_id="b"))
+    store.close()
+
+    reopened = FileCheckpointStore(path)
+    assert list(reopened.index) == ["a", "b"]
+    assert reopened.load(run_id="b").data == {"a": 1}
+    assert reopened.load(run_id="c") is None
+
+
+def test_checkpoint_of_unserializable_data(tmp_path) -> None:  # type: ignore
+    FAILING.clear()
+    data = {"a": 0, "b": 0, "day": datetime.date(2020, 1, 2)}
+
+    # runs go on when their checkpoints can not be written.
+    store = SQLiteCheckpointStore(":memory:", batch_size=1)
+    engine = Engine(
+        module_name=__name__, decorator_name="base_flow", checkpoint_store=store
+    )
+    output, _ = engine.execute(from_step=None, data=dict(data))
+    assert output.last_successful_step == 3
+    assert store.load(run_id=output.run_id) is None
+
+    store = SQLiteCheckpointStore(":memory:", batch_size=1, default=str)
+    engine = Engine(
+        module_name=__name__, decorator_name="base_flow", checkpoint_store=store
+    )
+    output, _ = engine.execute(from_step=None, data=dict(data))
+    checkpoint = store.load(run_id=output.run_id)
+    assert checkpoint.data == {"a": 3, "b": 0, "day": "2020-01-02"}
+    store.close()
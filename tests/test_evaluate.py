@@ -1,7 +1,45 @@
-from freak.evaluate import evaluate_input
+import json
+
+from freak.engine import Engine
+from freak.evaluate import compile_validator, evaluate_input, executor
+from freak.flows.base_flow import base_flow
+from freak.flows.dag_flow import DagFlowEngine
 from freak.models.input import InputModel
 from freak.models.request import RequestContext
-from freak.models.response import Response
+from freak.models.response import (
+    InputErrorsResponseContext,
+    Response,
+    SuccessResponseContext,
+)
+
+
+@base_flow(
+    name="producer",
+    order=1,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="producer",
+    parent_uid=None,
+)
+def producer(ctx: RequestContext) -> Response:
+    # breaks output_model of the step once asked to.
+    data = dict(ctx.input)
+    if data.pop("drop", False):
+        del data["b"]
+    return SuccessResponseContext(input=data, output={})
+
+
+@base_flow(
+    name="consumer",
+    order=2,
+    input_model=InputModel,
+    uid="consumer",
+    parent_uid="producer",
+)
+def consumer(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(
+        input=ctx.input, output={"sum": ctx.input["a"] + ctx.input["b"]}
+    )
 
 
 def test_evaluate_func_success() -> None:
@@ -21,3 +59,52 @@ def test_evaluate_func_error() -> None:
     response = evaluate_input(ctx=request, required_model=InputModel)
     assert isinstance(response, Response) == True
     assert response.success == False
+
+
+def test_evaluate_func_error_messages() -> None:
+    request = RequestContext(name="test_func", order=-1, input={"a": 1})
+
+    response = evaluate_input(ctx=request, required_model=InputModel)
+    assert response.messages == [
+        "Variable: b | Type: value_error.missing | Message: field required"
+    ]
+    assert json.loads(response.json_errors)[0]["loc"] == ["b"]
+
+
+def test_executor_validates_input() -> None:
+    validator = compile_validator(required_model=InputModel)
+    assert validator({"a": 1, "b": 2}) is None
+    assert validator({"a": 1}) is not None
+
+    def func(ctx: RequestContext) -> Response:
+        return SuccessResponseContext(input=ctx.input, output={})
+
+    request = RequestContext(name="test_func", order=-1, input={"a": 1})
+    assert (
+        executor(func=func, ctx=request, validator=validator).success == False
+    )
+
+    request.input = {"a": 1, "b": 2}
+    assert executor(func=func, ctx=request, validator=validator).success == True
+
+
+def test_input_breaking_output_model_of_parent() -> None:
+    engines = [
+        Engine(module_name=__name__, decorator_name="base_flow"),
+        Engine(module_name=__name__, decorator_name="base_flow", compiled=True),
+        DagFlowEngine(module_name=__name__, decorator_name="base_flow"),
+    ]
+    # output_model is not checked, input of next step is.
+    for engine in engines:
+        output, _ = engine.execute(from_step=None, data={"a": 1, "b": 2})
+        assert output.responses[1].output == {"sum": 3}
+
+        output, _ = engine.execute(
+            from_step=None, data={"a": 1, "b": 2, "drop": True}
+        )
+        assert output.last_successful_step == 1
+        assert isinstance(output.responses[1], InputErrorsResponseContext)
+        assert output.responses[1].messages == [
+            "Variable: b | Type: value_error.missing | Message: field required"
+        ]
+        engine.shutdown()
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from freak.engine import AsyncEngine
+from freak.flows.base_flow import base_flow
+from freak.models.input import InputModel, InputModelB
+from freak.models.request import RequestContext
+from freak.models.response import Response, SuccessResponseContext
+from freak.provider import EngineProvider
+
+
+@base_flow(
+    name="func_one",
+    order=1,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="func_one",
+    parent_uid=None,
+)
+async def func_one(ctx: RequestContext) -> Response:
+    await asyncio.sleep(0)
+    return SuccessResponseContext(
+        input=ctx.input, output={"a": ctx.input["a"] + 1}
+    )
+
+
+@base_flow(
+    name="func_two",
+    order=2,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="func_two",
+    parent_uid="func_one",
+)
+def func_two(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(
+        input=ctx.input, output={"b": ctx.input["b"] + 2}
+    )
+
+
+@base_flow(
+    name="func_three",
+    order=3,
+    input_model=InputModelB,
+    output_model=InputModelB,
+    uid="func_three",
+    parent_uid="func_two",
+)
+async def func_three(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(
+        input=ctx.input, output={"c": ctx.input["c"] + 3}
+    )
+
+
+def test_async_flow():
+    engine = EngineProvider(flow_name="base_flow", asynchronous=True).engine
+    assert engine is AsyncEngine
+
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+
+    output, path_traversed = asyncio.run(
+        executioner.execute(from_step="func_one", data={"a": 1, "b": 2})
+    )
+
+    assert output.last_successful_step == 2
+    assert output.to_step == 3
+    assert output.responses[0].output == {"a": 2}
+    assert output.responses[1].output == {"b": 4}
+    assert output.responses[2].success == False
+    assert path_traversed["last_step"] == "func_two"
+
+    output, path_traversed = asyncio.run(
+        executioner.execute(
+            from_step="func_three",
+            data={"a": 1, "b": 2, "c": 3},
+            executed_steps=path_traversed,
+        )
+    )
+
+    assert output.responses[0].output == {"c": 6}
+    assert path_traversed["traversed"]["func_three"] == []
+
+
+def test_async_flow_execute_many():
+    engine = EngineProvider(flow_name="base_flow", asynchronous=True).engine
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+
+    results = asyncio.run(
+        executioner.execute_many(
+            from_step="func_one",
+            records=[{"a": 1, "b": 2, "c": 3}, {"a": 1, "b": 2}],
+        )
+    )
+
+    assert [output.last_successful_step for output, _ in results] == [3, 2]
+
+
+def test_async_flow_requires_async_engine():
+    engine = EngineProvider(flow_name="base_flow").engine
+
+    with pytest.raises(Exception, match="AsyncStepError"):
+        engine(module_name=__name__, decorator_name="base_flow")
+
+
+def test_async_flow_fetch_schema():
+    executioner = AsyncEngine(module_name=__name__, decorator_name="base_flow")
+    responses = executioner.inspect()
+
+    assert responses["schema"]["func_one"]["schema"] == InputModel.schema()
+    assert responses["schema"]["func_three"]["schema"] == InputModelB.schema()
+
+
+def test_async_flow_stream():
+    engine = EngineProvider(flow_name="base_flow", asynchronous=True).engine
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+
+    async def consume():
+        streamed = []
+        async for resp_ctx, state in executioner.stream(
+            from_step="func_one", data={"a": 1, "b": 2}
+        ):
+            streamed.append((resp_ctx.success, state.last_step))
+        return streamed
+
+    assert asyncio.run(consume()) == [
+        (True, "func_one"),
+        (True, "func_two"),
+        (False, "func_two"),
+    ]
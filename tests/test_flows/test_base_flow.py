@@ -1,8 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from freak.flows.base_flow import base_flow
 from freak.models.input import InputModel, InputModelB
 from freak.models.request import RequestContext
 from freak.models.response import Response, SuccessResponseContext
 from freak.provider import EngineProvider
+from freak.run import Run
+from freak.tracing import Tracer
 from freak.types import Flow
 
 
@@ -192,3 +196,233 @@ def test_base_flow_fetch_schema():
     assert schema_info["func_two"]["schema"] == input_model_schema
     assert schema_info["func_three"]["schema"] == input_model_schema
     assert schema_info["func_four"]["schema"] == input_model_b_schema
+
+
+def test_base_flow_inspect_etag():
+    engine = EngineProvider(flow_name="base_flow").engine
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+    responses = executioner.inspect()
+
+    assert responses["etag"] == executioner.etag
+    assert executioner.inspect(if_none_match=executioner.etag) is None
+    assert executioner.inspect(if_none_match="stale") == responses
+
+    # responses are copies, changing one leaves plan as it was.
+    responses["schema"]["func_one"]["schema"].clear()
+    assert executioner.inspect()["schema"]["func_one"]["schema"]
+
+    # hash depends only on graph and schemas, not on engine instance.
+    other = engine(module_name=__name__, decorator_name="base_flow")
+    assert other.etag == executioner.etag
+
+    assert func_one.fetch_schema() is func_one.fetch_schema()
+
+
+def test_base_flow_execute_many():
+    engine = EngineProvider(flow_name="base_flow").engine
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+
+    results = executioner.execute_many(
+        from_step="func_one",
+        records=[
+            {"a": 4, "b": 7},
+            {"a": 4, "b": 7, "c": 5},
+            {"a": "a", "b": 7},
+        ],
+    )
+
+    assert len(results) == 3
+
+    output, path_traversed = results[0]
+    assert output.last_successful_step == 3
+    assert output.to_step == 4
+    assert path_traversed["last_step"] == "func_three"
+
+    output, path_traversed = results[1]
+    assert output.last_successful_step == 4
+    assert output.responses[3].output == {"a": 8, "b": 12, "c": 11}
+    assert path_traversed["traversed"]["func_four"] == []
+
+    output, path_traversed = results[2]
+    assert len(output.responses) == 1
+    assert output.responses[0].success == False
+    assert output.to_step == 1
+    assert path_traversed == {"last_step": "", "traversed": {}}
+
+
+def test_base_flow_stream():
+    engine = EngineProvider(flow_name="base_flow").engine
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+
+    stream = executioner.stream(from_step="func_one", data={"a": 4, "b": 7})
+    resp_ctx, state = next(stream)
+    assert resp_ctx.output == {"a": 5, "b": 9}
+    assert state["last_step"] == "func_one"
+
+    # caller may stop early, remaining steps are not performed.
+    stream.close()
+
+    streamed = list(
+        executioner.stream(from_step="func_one", data={"a": 4, "b": 7})
+    )
+    assert [resp_ctx.success for resp_ctx, _ in streamed] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    assert streamed[-1][1]["last_step"] == "func_three"
+
+
+def test_base_flow_run_reuses_context():
+    engine = EngineProvider(flow_name="base_flow").engine
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+
+    run = Run(engine=executioner, from_step="func_one", data={"a": 4, "b": 7})
+    first = run.context()
+    assert (first.name, first.order) == ("func_one", 1)
+
+    assert run.step.function is not None
+    run.record(resp_ctx=run.step.function(ctx=first))  # type: ignore
+    second = run.context()
+    assert second is first
+    assert (second.name, second.order) == ("func_two", 2)
+    assert second.input == {"a": 4, "b": 7}
+
+
+def test_base_flow_compiled():
+    engine = EngineProvider(flow_name="base_flow").engine
+    interpreted = engine(module_name=__name__, decorator_name="base_flow")
+    compiled = engine(
+        module_name=__name__, decorator_name="base_flow", compiled=True
+    )
+    # with a tracer runs are interpreted.
+    traced = engine(
+        module_name=__name__,
+        decorator_name="base_flow",
+        compiled=True,
+        tracer=Tracer(),
+    )
+    assert compiled.compiled is not None and traced.compiled is None
+
+    for from_step in ("func_one", "func_three"):
+        output, path_traversed = compiled.execute(
+            from_step=from_step, data={"a": 4, "b": 7}
+        )
+        expected, expected_path = interpreted.execute(
+            from_step=from_step, data={"a": 4, "b": 7}
+        )
+        assert [resp.output for resp in output.responses] == [
+            resp.output for resp in expected.responses
+        ]
+        assert output.responses[-1].messages == expected.responses[-1].messages
+        assert (output.to_step, output.last_successful_step) == (
+            expected.to_step,
+            expected.last_successful_step,
+        )
+        assert path_traversed == expected_path
+
+
+def test_base_flow_overlay():
+    engine = EngineProvider(flow_name="base_flow").engine
+
+    for compiled in (False, True):
+        executioner = engine(
+            module_name=__name__,
+            decorator_name="base_flow",
+            handover="overlay",
+            compiled=compiled,
+        )
+        output, path_traversed = executioner.execute(
+            from_step="func_one", data={"a": 4, "b": 7}
+        )
+
+        # every step receives output of step before it.
+        assert [resp.output for resp in output.responses[:3]] == [
+            {"a": 5, "b": 9},
+            {"a": 7, "b": 12},
+            {"a": 10, "b": 16},
+        ]
+        assert output.responses[3].success == False
+        assert path_traversed["last_step"] == "func_three"
+
+
+def test_base_flow_retention():
+    engine = EngineProvider(flow_name="base_flow").engine
+
+    for compiled in (False, True):
+        executioner = engine(
+            module_name=__name__, decorator_name="base_flow", compiled=compiled
+        )
+
+        def execute(retention):
+            return executioner.execute(
+                from_step="func_one", data={"a": 4, "b": 7}, retention=retention
+            )
+
+        output, path_traversed = execute(retention="failures")
+        assert [resp.success for resp in output.responses] == [False]
+        # path traversed is complete whatever is kept.
+        assert path_traversed["last_step"] == "func_three"
+        assert len(path_traversed["traversed"]) == 3
+        assert (output.to_step, output.last_successful_step) == (4, 3)
+
+        output, _ = execute(retention=2)
+        assert isinstance(output.responses, list)
+        assert [resp.success for resp in output.responses] == [True, False]
+        assert output.responses[0].output == {"a": 7, "b": 11}
+
+        output, _ = execute(retention="summaries")
+        assert [
+            (summary.uid, summary.order, summary.success)
+            for summary in output.responses
+        ] == [
+            ("func_one", 1, True),
+            ("func_two", 2, True),
+            ("func_three", 3, True),
+            ("func_four", 4, False),
+        ]
+        assert output.responses[3].messages == [
+            "Variable: c | Type: value_error.missing | Message: field required"
+        ]
+
+    for retention in ("some", 0):
+        try:
+            execute(retention=retention)
+        except Exception as err:
+            assert err.args == ("InvalidRetentionError", retention)
+        else:
+            raise AssertionError("InvalidRetentionError not raised")
+
+
+def test_base_flow_max_concurrency():
+    engine = EngineProvider(flow_name="base_flow").engine
+
+    for compiled in (False, True):
+        executioner = engine(
+            module_name=__name__,
+            decorator_name="base_flow",
+            compiled=compiled,
+            max_concurrency=1,
+            timings=True,
+        )
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(
+                pool.map(
+                    lambda data: executioner.execute(
+                        from_step="func_one", data=data
+                    ),
+                    [{"a": 4, "b": 7, "c": 1}] * 8,
+                )
+            )
+
+        for output, _ in results:
+            assert output.last_successful_step == 4
+            assert all(
+                "queue" in resp.timings and "wall" in resp.timings
+                for resp in output.responses
+            )
+        assert all(
+            bulkhead.semaphore.acquire(blocking=False)
+            for bulkhead in executioner.bulkheads
+        )
@@ -0,0 +1,83 @@
+from typing import List
+
+from freak.flows.base_flow import base_flow
+from freak.models.input import InputModel, InputModelB
+from freak.models.request import RequestContext
+from freak.models.response import Response, SuccessResponseContext
+from freak.provider import EngineProvider
+
+BATCH_SIZES: List[int] = []
+
+
+@base_flow(
+    name="func_one",
+    order=1,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="func_one",
+    parent_uid=None,
+    batch=True,
+)
+def func_one(ctxs: List[RequestContext]) -> List[Response]:
+    BATCH_SIZES.append(len(ctxs))
+    return [
+        SuccessResponseContext(
+            input=ctx.input,
+            output={"a": ctx.input["a"] + 1, "b": ctx.input["b"] + 2},
+        )
+        for ctx in ctxs
+    ]
+
+
+@base_flow(
+    name="func_two",
+    order=2,
+    input_model=InputModelB,
+    output_model=InputModelB,
+    uid="func_two",
+    parent_uid="func_one",
+    batch=True,
+)
+def func_two(ctxs: List[RequestContext]) -> List[Response]:
+    BATCH_SIZES.append(len(ctxs))
+    return [
+        SuccessResponseContext(input=ctx.input, output={"c": ctx.input["c"]})
+        for ctx in ctxs
+    ]
+
+
+def test_batch_flow_execute_many():
+    engine = EngineProvider(flow_name="base_flow").engine
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+
+    BATCH_SIZES.clear()
+    results = executioner.execute_many(
+        from_step="func_one",
+        records=[
+            {"a": 1, "b": 2, "c": 3},
+            {"a": 1, "b": 2},
+            {"a": 1, "b": 2, "c": 4},
+        ],
+    )
+
+    assert BATCH_SIZES == [3, 2]
+
+    assert [output.last_successful_step for output, _ in results] == [2, 1, 2]
+    assert results[0][0].responses[1].output == {"c": 3}
+    assert results[1][0].responses[1].success == False
+    assert results[2][0].responses[1].output == {"c": 4}
+
+
+def test_batch_flow_execute():
+    engine = EngineProvider(flow_name="base_flow").engine
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+
+    BATCH_SIZES.clear()
+    output, path_traversed = executioner.execute(
+        from_step="func_one", data={"a": 1, "b": 2, "c": 3}
+    )
+
+    assert BATCH_SIZES == [1, 1]
+    assert output.last_successful_step == 2
+    assert output.responses[0].output == {"a": 2, "b": 4}
+    assert path_traversed["last_step"] == "func_two"
@@ -1,4 +1,8 @@
-from freak.flows.choice_flow import choice_flow
+import asyncio
+import os
+import sys
+
+from freak.flows.choice_flow import ChoiceFlowEngine, choice_flow
 from freak.models.input import InputModel, InputModelB, InputModelC
 from freak.models.request import RequestContext
 from freak.models.response import Response, SuccessResponseContext
@@ -287,3 +291,177 @@ def test_choice_flow_fetch_schema():
     assert schema_info["func_three"]["schema"] == input_model_schema
     assert schema_info["func_four"]["schema"] == input_model_b_schema
     assert schema_info["func_five"]["schema"] == input_model_c_schema
+
+
+def test_choice_flow_execute_many():
+    engine = EngineProvider(flow_name="choice_flow").engine
+    executioner = engine(module_name=__name__)
+
+    results = executioner.execute_many(
+        from_step="func_one",
+        records=[
+            {"a": 4, "b": 7, "d": 1},
+            {"a": 4, "b": 3, "c": 8},
+            {"a": 4, "b": 9},
+        ],
+    )
+
+    output, path_traversed = results[0]
+    assert output.last_successful_step == 5
+    assert path_traversed["traversed"] == {
+        "func_one": ["func_two"],
+        "func_two": ["func_five"],
+        "func_five": [],
+    }
+
+    output, path_traversed = results[1]
+    assert output.last_successful_step == 4
+    assert path_traversed["traversed"] == {
+        "func_one": ["func_three"],
+        "func_three": ["func_four"],
+        "func_four": [],
+    }
+
+    output, path_traversed = results[2]
+    assert output.last_successful_step == 2
+    assert output.responses[2].success == False
+    assert path_traversed["last_step"] == "func_two"
+
+
+def test_choice_flow_async():
+    engine = EngineProvider(flow_name="choice_flow", asynchronous=True).engine
+    executioner = engine(module_name=__name__)
+
+    output, path_traversed = asyncio.run(
+        executioner.execute(data={"a": 4, "b": 3, "c": 8}, from_step="func_one")
+    )
+
+    assert output.last_successful_step == 4
+    assert path_traversed == {
+        "last_step": "func_four",
+        "traversed": {
+            "func_one": ["func_three"],
+            "func_three": ["func_four"],
+            "func_four": [],
+        },
+    }
+
+
+def test_choice_flow_compiled():
+    interpreted = ChoiceFlowEngine(module_name=__name__)
+    compiled = ChoiceFlowEngine(module_name=__name__, compiled=True)
+    assert interpreted.compiled is None
+    assert compiled.compiled is not None
+
+    def summary(result):
+        output, path_traversed = result
+        return (
+            [
+                (resp_ctx.success, resp_ctx.output, resp_ctx.messages)
+                for resp_ctx in output.responses
+            ],
+            output.from_step,
+            output.to_step,
+            output.to_uid,
+            output.last_successful_step,
+            path_traversed.to_dict(),
+        )
+
+    runs = [
+        ({"a": 4, "b": 7}, "func_one", None),
+        ({"a": 4, "b": 3, "c": 1}, "func_one", None),
+        ({"a": 4, "b": 3}, None, None),
+        # segment starting at a step which can not be chosen.
+        (
+            {"a": 4, "b": 3, "c": 2},
+            "func_four",
+            {
+                "traversed": {"func_three": ["func_four"]},
+                "last_step": "func_three",
+            },
+        ),
+    ]
+    for data, from_step, executed_steps in runs:
+        assert summary(
+            compiled.execute(
+                from_step=from_step, data=data, executed_steps=executed_steps
+            )
+        ) == summary(
+            interpreted.execute(
+                from_step=from_step, data=data, executed_steps=executed_steps
+            )
+        )
+
+    try:
+        compiled.execute(
+            from_step="func_five",
+            data={"a": 1, "b": 2, "d": 3},
+            executed_steps={"traversed": {}, "last_step": "func_one"},
+        )
+    except Exception as err:
+        assert err.args == ("CannotExecuteError",)
+    else:
+        raise AssertionError("CannotExecuteError not raised")
+
+
+CHAIN_STEP = """
+@choice_flow(
+    name="{uid}",
+    order={order},
+    input_model=InputModel,
+    uid="{uid}",
+    parent_uid={parent_uid!r},
+)
+def {uid}(ctx):
+    return SuccessResponseContext(input=ctx.input, output={{}}, choice={choice!r})
+"""
+
+
+def test_choice_flow_compiled_long_chain(tmp_path, monkeypatch):
+    # every step chooses between next link of chain and a leaf.
+    length = sys.getrecursionlimit() + 100
+    source = [
+        "from freak.flows.choice_flow import choice_flow\n"
+        "from freak.models.input import InputModel\n"
+        "from freak.models.response import SuccessResponseContext\n"
+    ]
+    for link in range(length):
+        parent_uid = f"link_{link - 1}" if link else None
+        source.append(
+            CHAIN_STEP.format(
+                uid=f"link_{link}",
+                order=2 * link + 1,
+                parent_uid=parent_uid,
+                choice=f"link_{link + 1}" if link + 1 < length else None,
+            )
+        )
+        if link:
+            source.append(
+                CHAIN_STEP.format(
+                    uid=f"leaf_{link}",
+                    order=2 * link + 2,
+                    parent_uid=parent_uid,
+                    choice=None,
+                )
+            )
+    (tmp_path / "chain_flow.py").write_text("".join(source))
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    cache_dir = str(tmp_path / "cache")
+    try:
+        executioner = ChoiceFlowEngine(
+            module_name="chain_flow", compiled=True, cache_dir=cache_dir
+        )
+        output, path_traversed = executioner.execute(
+            from_step=None, data={"a": 1, "b": 2}
+        )
+    finally:
+        sys.modules.pop("chain_flow", None)
+
+    assert len(output.responses) == length
+    assert output.to_uid == path_traversed["last_step"] == f"link_{length - 1}"
+
+    # generated code is never cached, so never read back either.
+    for name in os.listdir(cache_dir):
+        with open(os.path.join(cache_dir, name)) as file:
+            assert "def segment" not in file.read()
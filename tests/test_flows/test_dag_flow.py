@@ -0,0 +1,219 @@
+import asyncio
+import sys
+import threading
+import time
+
+from freak.flows.dag_flow import AsyncDagFlowEngine, DagFlowEngine, dag_flow
+from freak.flows.locators import Locator
+from freak.models.input import InputModel, InputModelB
+from freak.models.request import RequestContext
+from freak.models.response import (
+    ErrorResponseContext,
+    Response,
+    SuccessResponseContext,
+)
+from freak.provider import EngineProvider
+
+# both branches wait here for each other, so they must run concurrently.
+BARRIER = threading.Barrier(2, timeout=5)
+
+
+@dag_flow(
+    name="root",
+    order=1,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="root",
+    parent_uid=None,
+)
+def root(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+@dag_flow(
+    name="left",
+    order=2,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="left",
+    parent_uid="root",
+)
+def left(ctx: RequestContext) -> Response:
+    if ctx.input.get("concurrent"):
+        BARRIER.wait()
+    if ctx.input.get("fail"):
+        return ErrorResponseContext(input=ctx.input, messages=["failed"])
+    return SuccessResponseContext(input={**ctx.input, "c": 3}, output={})
+
+
+@dag_flow(
+    name="right",
+    order=3,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="right",
+    parent_uid="root",
+)
+def right(ctx: RequestContext) -> Response:
+    if ctx.input.get("concurrent"):
+        BARRIER.wait()
+    return SuccessResponseContext(input={**ctx.input, "d": 4}, output={})
+
+
+@dag_flow(
+    name="join",
+    order=4,
+    input_model=InputModelB,
+    output_model=InputModelB,
+    uid="join",
+    parent_uid=["left", "right"],
+)
+def join(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(
+        input=ctx.input, output={"total": sum(ctx.input.values())}
+    )
+
+
+def test_dag_flow():
+    engine = EngineProvider(flow_name="dag_flow").engine
+    assert engine is DagFlowEngine
+
+    executioner = engine(module_name=__name__)
+    assert executioner.flow.predecessor == {
+        None: ["root"],
+        "root": ["left", "right"],
+        "left": ["join"],
+        "right": ["join"],
+    }
+    assert executioner.plan.predecessors[executioner.plan.index["join"]] == (
+        executioner.plan.index["left"],
+        executioner.plan.index["right"],
+    )
+
+    output, path_traversed = executioner.execute(
+        from_step=None, data={"a": 1, "b": 2, "concurrent": True}
+    )
+    assert [resp_ctx.success for resp_ctx in output.responses] == [True] * 4
+    assert output.responses[-1].input == {
+        "a": 1,
+        "b": 2,
+        "concurrent": True,
+        "c": 3,
+        "d": 4,
+    }
+    assert path_traversed["traversed"] == {
+        "root": ["left", "right"],
+        "left": ["join"],
+        "right": ["join"],
+        "join": [],
+    }
+    assert path_traversed["last_step"] == "join"
+
+    assert output.critical_path is not None
+    uids = [uid for uid, _ in output.critical_path]
+    assert uids[0] == "root" and uids[-1] == "join" and len(uids) == 3
+    executioner.shutdown()
+
+
+def test_dag_flow_failure_and_from_step():
+    executioner = DagFlowEngine(module_name=__name__)
+
+    output, path_traversed = executioner.execute(
+        from_step=None, data={"a": 1, "b": 2, "fail": True}
+    )
+    # join waits for left, which failed.
+    assert len(output.responses) == 3
+    assert set(path_traversed["traversed"]) == {"root", "right"}
+
+    # steps which are not part of the run are not waited for.
+    output, path_traversed = executioner.execute(
+        from_step="left", data={"a": 1, "b": 2}, run_id="run-1"
+    )
+    assert output.responses[-1].output == {"total": 6}
+    assert output.run_id == "run-1"
+    assert path_traversed["traversed"] == {"left": ["join"], "join": []}
+    executioner.shutdown()
+
+
+TIMED_STEP = """
+@dag_flow(
+    name="{uid}",
+    order={order},
+    input_model=InputModel,
+    uid="{uid}",
+    parent_uid={parent_uid!r},
+)
+def {uid}(ctx):
+    time.sleep({seconds})
+    return SuccessResponseContext(input=ctx.input, output={{}})
+"""
+
+
+def test_dag_flow_independent_branches(tmp_path, monkeypatch):
+    # slow root runs next to chain b -> c -> d, which takes longer.
+    steps = [
+        ("slow", None, 0.4),
+        ("b", None, 0.05),
+        ("c", "b", 0.25),
+        ("d", "c", 0.25),
+    ]
+    source = [
+        "import time\n"
+        "from freak.flows.dag_flow import dag_flow\n"
+        "from freak.models.input import InputModel\n"
+        "from freak.models.response import SuccessResponseContext\n"
+    ]
+    for order, (uid, parent_uid, seconds) in enumerate(steps, start=1):
+        source.append(
+            TIMED_STEP.format(
+                uid=uid, order=order, parent_uid=parent_uid, seconds=seconds
+            )
+        )
+    (tmp_path / "timed_dag_flow.py").write_text("".join(source))
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    try:
+        executioner = DagFlowEngine(module_name="timed_dag_flow")
+        started = time.perf_counter()
+        output, _ = executioner.execute(from_step=None, data={"a": 1, "b": 2})
+        elapsed = time.perf_counter() - started
+    finally:
+        sys.modules.pop("timed_dag_flow", None)
+
+    # steps following b do not wait for slow.
+    assert elapsed < 0.8
+    assert [resp_ctx.success for resp_ctx in output.responses] == [True] * 4
+    assert output.critical_path is not None
+    assert [uid for uid, _ in output.critical_path] == ["b", "c", "d"]
+    executioner.shutdown()
+
+
+def test_multiple_parents_only_in_dag_flow():
+    # other flows would follow first parent of join alone.
+    try:
+        Locator(
+            module=sys.modules[__name__],
+            file_path=__file__,
+            decorator="dag_flow",
+        ).locate()
+    except Exception as err:
+        assert err.args == ("InvalidFlowDefintiionError",)
+    else:
+        assert False
+
+
+def test_async_dag_flow():
+    engine = EngineProvider(flow_name="dag_flow", asynchronous=True).engine
+    assert engine is AsyncDagFlowEngine
+
+    executioner = engine(module_name=__name__)
+
+    async def run():
+        return await executioner.execute(
+            from_step=None, data={"a": 1, "b": 2, "concurrent": True}
+        )
+
+    output, path_traversed = asyncio.run(run())
+    assert output.responses[-1].output == {"total": 11}
+    assert path_traversed["last_step"] == "join"
+    executioner.shutdown()
@@ -1,10 +1,21 @@
+from typing import List
+
+import asyncio
+import json
+import sys
+
+from freak.checkpoint import SQLiteCheckpointStore
 from freak.flows.parallel_flow import parallel_flow
+from freak.metrics import MetricsRegistry
 from freak.models.input import InputModel, InputModelB, InputModelC
 from freak.models.request import RequestContext
 from freak.models.response import Response, SuccessResponseContext
 from freak.provider import EngineProvider
+from freak.tracing import Tracer
 from freak.types import Flow
 
+BRANCHES: List[str] = []
+
 
 @parallel_flow(
     name="func_one",
@@ -55,6 +66,7 @@ def func_two(ctx: RequestContext) -> SuccessResponseContext:
     is_parallel=True,
 )
 def func_three(ctx: RequestContext) -> SuccessResponseContext:
+    BRANCHES.append(ctx.name)
     a = ctx.input["a"]
     b = ctx.input["b"]
     return SuccessResponseContext(
@@ -177,3 +189,219 @@ def test_parallel_flow_prosecutioner():
             "func_five": [],
         },
     }
+
+
+def test_parallel_flow_async():
+    engine = EngineProvider(flow_name="parallel_flow", asynchronous=True).engine
+    executioner = engine(module_name=__name__)
+
+    BRANCHES.clear()
+    output, path_traversed = asyncio.run(
+        executioner.execute(data={"a": 4, "b": 7, "d": 1}, from_step="func_one")
+    )
+
+    assert BRANCHES == ["func_three"]
+    assert output.last_successful_step == 5
+
+    [(branch, _)] = output.join()
+    assert branch.last_successful_step == 3
+    assert path_traversed == {
+        "last_step": "func_five",
+        "traversed": {
+            "func_one": ["func_two"],
+            "func_two": ["func_five"],
+            "func_five": [],
+        },
+    }
+
+
+def test_parallel_flow_branches():
+    engine = EngineProvider(flow_name="parallel_flow").engine
+    executioner = engine(module_name=__name__, max_workers=1)
+
+    output, _ = executioner.execute(data={"a": 4, "b": 7}, from_step="func_one")
+
+    assert len(output.branches) == 1
+    assert output.branches[0].done() == True
+
+    [(branch, branch_traversed)] = output.join()
+    assert branch.from_step == 3
+    assert branch.last_successful_step == 3
+    assert branch.responses[0].output == {"a": 7, "b": 11}
+    assert branch.responses[1].success == False
+    assert branch_traversed == {
+        "last_step": "func_three",
+        "traversed": {
+            "func_one": ["func_two"],
+            "func_three": ["func_four"],
+        },
+    }
+
+    output, _ = executioner.execute(
+        data={"a": 4, "b": 7}, from_step="func_one", join=False
+    )
+    [(branch, _)] = output.join(timeout=5)
+    assert branch.last_successful_step == 3
+
+    executioner.shutdown()
+
+
+def test_parallel_flow_branch_run_ids():
+    store = SQLiteCheckpointStore(":memory:")
+    engine = EngineProvider(flow_name="parallel_flow").engine
+    executioner = engine(module_name=__name__, checkpoint_store=store)
+
+    output, _ = executioner.execute(
+        data={"a": 4, "b": 7}, from_step="func_one", run_id="run-1"
+    )
+    [(branch, _)] = output.join()
+    assert branch.run_id == "run-1.func_three"
+
+    # branches are checkpointed under their own id, which can be resumed.
+    store.flush()
+    checkpoint = store.load(run_id="run-1.func_three")
+    assert checkpoint is not None and checkpoint.from_step == "func_four"
+    executioner.shutdown()
+    store.close()
+
+
+SIBLING_STEP = """
+@parallel_flow(
+    name="{uid}",
+    order={order},
+    input_model=InputModel,
+    uid="{uid}",
+    parent_uid={parent_uid!r},
+    is_parallel={is_parallel},
+)
+def {uid}(ctx):
+    return SuccessResponseContext(input=ctx.input, output={{}})
+"""
+
+
+def test_parallel_flow_sibling_branches(tmp_path, monkeypatch):
+    steps = [
+        ("main", None, False),
+        ("after", "main", False),
+        ("left", "main", True),
+        ("right", "main", True),
+    ]
+    source = [
+        "from freak.flows.parallel_flow import parallel_flow\n"
+        "from freak.models.input import InputModel\n"
+        "from freak.models.response import SuccessResponseContext\n"
+    ]
+    for order, (uid, parent_uid, is_parallel) in enumerate(steps, start=1):
+        source.append(
+            SIBLING_STEP.format(
+                uid=uid,
+                order=order,
+                parent_uid=parent_uid,
+                is_parallel=is_parallel,
+            )
+        )
+    (tmp_path / "siblings_flow.py").write_text("".join(source))
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    engine = EngineProvider(flow_name="parallel_flow").engine
+    try:
+        executioner = engine(module_name="siblings_flow")
+    finally:
+        sys.modules.pop("siblings_flow", None)
+
+    output, path_traversed = executioner.execute(
+        data={"a": 1, "b": 2}, from_step="main", join=False
+    )
+    assert path_traversed["traversed"] == {"main": ["after"], "after": []}
+
+    # every branch runs once and launches no branches of its own.
+    branches = output.join(timeout=5)
+    assert sorted(branch.to_uid for branch, _ in branches) == ["left", "right"]
+    assert [len(branch.branches) for branch, _ in branches] == [0, 0]
+    executioner.shutdown()
+
+
+def test_parallel_flow_process_backend():
+    engine = EngineProvider(flow_name="parallel_flow").engine
+    executioner = engine(module_name=__name__, backend="process", max_workers=1)
+
+    output, path_traversed = executioner.execute(
+        data={"a": 4, "b": 7}, from_step="func_one"
+    )
+
+    assert output.last_successful_step == 2
+    assert path_traversed["last_step"] == "func_two"
+
+    [(branch, branch_traversed)] = output.join()
+    assert branch.last_successful_step == 3
+    assert branch.responses[0].output == {"a": 7, "b": 11}
+    assert branch_traversed["last_step"] == "func_three"
+
+    executioner.shutdown()
+
+
+def test_parallel_flow_backend_parity():
+    engine = EngineProvider(flow_name="parallel_flow").engine
+
+    def branch_run(backend):
+        metrics = MetricsRegistry()
+        executioner = engine(
+            module_name=__name__,
+            backend=backend,
+            max_workers=1,
+            handover="overlay",
+            timings=True,
+            metrics=metrics,
+        )
+        output, _ = executioner.execute(
+            data={"a": 4, "b": 7, "x": 1}, from_step="func_one"
+        )
+        [(branch, branch_traversed)] = output.join()
+        executioner.shutdown()
+        return branch, branch_traversed, metrics.snapshot()[__name__]
+
+    thread_branch, thread_traversed, thread_metrics = branch_run("thread")
+    process_branch, process_traversed, process_metrics = branch_run("process")
+
+    def summary(branch):
+        return [
+            (dict(resp_ctx.input), resp_ctx.output, resp_ctx.messages)
+            for resp_ctx in branch.responses
+        ]
+
+    # input of func_four is output of func_three layered over its input.
+    assert summary(process_branch) == summary(thread_branch)
+    assert summary(process_branch)[1][0] == {"a": 8, "b": 13, "x": 1}
+    assert all(resp_ctx.timings for resp_ctx in process_branch.responses)
+    assert process_traversed == thread_traversed
+
+    # metrics of branches performed by workers are merged into engine.
+    for uid in ("func_three", "func_four"):
+        assert process_metrics[uid]["calls"] == thread_metrics[uid]["calls"]
+        assert process_metrics[uid]["wall"]["count"] == 1
+
+
+def test_parallel_flow_tracing(tmp_path):
+    engine = EngineProvider(flow_name="parallel_flow").engine
+    tracer = Tracer()
+    executioner = engine(module_name=__name__, max_workers=1, tracer=tracer)
+
+    executioner.execute(data={"a": 4, "b": 7}, from_step="func_one")
+    executioner.shutdown()
+
+    spans = {(span.category, span.name): span for span in tracer.spans}
+    branch = spans[("branch", "func_three")]
+    branch_run = next(
+        span
+        for span in tracer.spans
+        if span.category == "run" and span.parent_id == branch.span_id
+    )
+    main_run = spans[("step", "func_one")].parent_id
+
+    assert branch.parent_id == main_run
+    assert branch_run.args["from_step"] == "func_three"
+    assert branch_run.thread_id != spans[("step", "func_one")].thread_id
+
+    trace = json.load(open(tracer.export(path=str(tmp_path / "trace.json"))))
+    phases = {event["ph"] for event in trace["traceEvents"]}
+    assert phases == {"X", "s", "f"}
@@ -0,0 +1,36 @@
+import pytest
+from freak.graph import depth, find_cycle, reachable, topological_order
+
+STEP_GRAPH = {
+    None: [1],
+    1: [2, 3],
+    2: [3, 4],
+}
+
+CYCLIC_STEP_GRAPH = {
+    None: [1],
+    1: [2, 3],
+    2: [3, 4],
+    4: [1, 5],
+}
+
+
+def test_topological_order() -> None:
+    assert topological_order(step_graph=STEP_GRAPH) == [1, 2, 3, 4]
+
+    with pytest.raises(Exception, match="FlowShouldBeDAGError"):
+        topological_order(step_graph=CYCLIC_STEP_GRAPH)
+
+
+def test_find_cycle() -> None:
+    assert find_cycle(step_graph=STEP_GRAPH) == []
+    assert find_cycle(step_graph=CYCLIC_STEP_GRAPH) == [1, 2, 4, 1]
+    assert find_cycle(step_graph={None: ["a"], "a": ["a"]}) == ["a", "a"]
+
+
+def test_reachable_and_depth() -> None:
+    assert reachable(step_graph=STEP_GRAPH, source=1) == {2, 3, 4}
+    assert reachable(step_graph=STEP_GRAPH, source=2) == {3, 4}
+    assert reachable(step_graph=STEP_GRAPH, source=4) == set()
+
+    assert depth(step_graph=STEP_GRAPH) == {1: 0, 2: 1, 3: 2, 4: 2}
@@ -0,0 +1,51 @@
+import json
+from collections import ChainMap
+
+from freak.handover import MAX_LAYERS, build_handover, hand_over_overlay, plain
+from freak.models.response import SuccessResponseContext
+
+
+def test_hand_over_overlay():
+    payload = {"blob": "x" * 1024}
+    data = {"a": 1, "payload": payload}
+
+    handed_over = hand_over_overlay(
+        SuccessResponseContext(input=data, output={"a": 2})
+    )
+    assert handed_over == {"a": 2, "payload": payload}
+    # nothing is copied, input is a layer of data handed over.
+    assert handed_over.maps[1] is data
+    assert data == {"a": 1, "payload": payload}
+
+    # responses without output pass their input on as it is.
+    assert (
+        hand_over_overlay(SuccessResponseContext(input=data, output={})) is data
+    )
+
+    for position in range(2 * MAX_LAYERS):
+        handed_over = hand_over_overlay(
+            SuccessResponseContext(
+                input=handed_over, output={f"key_{position}": position}
+            )
+        )
+        assert len(handed_over.maps) <= MAX_LAYERS
+    assert handed_over["payload"] is payload
+    assert handed_over["key_0"] == 0 and handed_over["a"] == 2
+
+
+def test_build_handover_and_plain():
+    assert build_handover(option="input")(
+        SuccessResponseContext(input={"a": 1}, output={"a": 2})
+    ) == {"a": 1}
+
+    try:
+        build_handover(option="copy")
+    except Exception as err:
+        assert err.args == ("InvalidHandoverError", "copy")
+    else:
+        raise AssertionError("InvalidHandoverError not raised")
+
+    data = ChainMap({"a": 2}, {"a": 1, "b": 3})
+    assert json.loads(json.dumps({"data": data}, default=plain)) == {
+        "data": {"a": 2, "b": 3}
+    }
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+from freak.flows.base_flow import base_flow
+from freak.hedging import MIN_SAMPLES, REFRESH, Hedge
+from freak.models.input import InputModel
+from freak.models.request import RequestContext
+from freak.models.response import Response, SuccessResponseContext
+from freak.provider import EngineProvider
+from freak.types import Step
+
+lock = threading.Lock()
+attempts = []
+
+
+@base_flow(
+    name="lookup",
+    order=1,
+    input_model=InputModel,
+    uid="lookup",
+    parent_uid=None,
+    idempotent=True,
+    hedge_after_ms=20,
+)
+def lookup(ctx: RequestContext) -> Response:
+    with lock:
+        attempts.append(ctx.input["a"])
+        first = len(attempts) == 1
+    # first attempt hits a slow replica.
+    if first:
+        time.sleep(0.5)
+    return SuccessResponseContext(
+        input=ctx.input, output={"a": ctx.input["a"], "first": first}
+    )
+
+
+@base_flow(
+    name="store",
+    order=2,
+    input_model=InputModel,
+    uid="store",
+    parent_uid="lookup",
+)
+def store(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+def test_hedge_delay():
+    hedge = Hedge(uid="lookup", after_ms=5, fraction=0.5)
+    assert hedge.delay == 0.005
+
+    for position in range(MIN_SAMPLES):
+        hedge.observe(seconds=position / 1000)
+    # delay is derived on refresh only.
+    assert hedge.delay == 0.005
+
+    for position in range(MIN_SAMPLES, 2 * REFRESH):
+        hedge.observe(seconds=position / 1000)
+    # median of attempts observed, never below hedge_after_ms.
+    assert hedge.delay == REFRESH / 1000
+    assert hedge.stats() == {"issued": 0, "won": 0, "delay": hedge.delay}
+
+    for fraction in (0, 1.5):
+        try:
+            Hedge(uid="lookup", after_ms=5, fraction=fraction)
+        except Exception as err:
+            assert err.args == ("InvalidHedgeError", "lookup")
+        else:
+            assert False
+
+
+def test_hedged_step():
+    engine = EngineProvider(flow_name="base_flow").engine
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+    attempts.clear()
+
+    started = time.perf_counter()
+    output, _ = executioner.execute(from_step="lookup", data={"a": 1, "b": 2})
+    assert time.perf_counter() - started < 0.4
+    assert output.last_successful_step == 2
+    # hedge returned first, slow attempt was discarded.
+    assert output.responses[0].output == {"a": 1, "first": False}
+    assert attempts == [1, 1]
+    assert executioner.hedge_stats() == {
+        "lookup": {"issued": 1, "won": 1, "delay": 0.02}
+    }
+
+    # fast calls are never hedged.
+    executioner.execute(from_step="lookup", data={"a": 2, "b": 2})
+    assert attempts == [1, 1, 2]
+    assert executioner.hedge_stats()["lookup"]["issued"] == 1
+
+    try:
+        executioner.build_hedge(
+            step=Step(
+                uid="store",
+                parent_uid="lookup",
+                order=2,
+                name="store",
+                function=store,
+                options={"hedge_after_ms": 20},
+            )
+        )
+    except Exception as err:
+        assert err.args == ("HedgeNotIdempotentError", "store")
+    else:
+        assert False
+
+    executioner.shutdown()
+
+
+def test_hedged_step_async():
+    engine = EngineProvider(flow_name="base_flow", asynchronous=True).engine
+    executioner = engine(module_name=__name__, decorator_name="base_flow")
+    attempts.clear()
+
+    started = time.perf_counter()
+    output, _ = asyncio.run(
+        executioner.execute(from_step="lookup", data={"a": 1, "b": 2})
+    )
+    assert time.perf_counter() - started < 0.4
+    assert output.responses[0].output == {"a": 1, "first": False}
+    assert executioner.hedge_stats()["lookup"]["won"] == 1
+
+    executioner.shutdown()
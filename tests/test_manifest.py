@@ -0,0 +1,95 @@
+import sys
+
+import pytest
+from freak.engine import Engine
+from freak.flows.locators import Locator
+from freak.manifest import load_manifest
+
+FLOW_MODULE = """
+from freak.flows.base_flow import base_flow
+from freak.models.input import InputModel
+from freak.models.response import SuccessResponseContext
+
+
+@base_flow(
+    name="func_one",
+    order=1,
+    input_model=InputModel,
+    uid="func_one",
+    parent_uid=None,
+)
+def func_one(ctx):
+    return SuccessResponseContext(input=ctx.input, output={"a": ctx.input["a"]})
+
+
+@base_flow(
+    name="func_two",
+    order=2,
+    input_model=InputModel,
+    uid="func_two",
+    parent_uid="func_one",
+)
+def func_two(ctx):
+    return SuccessResponseContext(input=ctx.input, output={"b": ctx.input["b"]})
+"""
+
+
+@pytest.fixture
+def flow_module(tmp_path, monkeypatch):
+    path = tmp_path / "manifest_flow.py"
+    path.write_text(FLOW_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield str(path)
+    sys.modules.pop("manifest_flow", None)
+
+
+def test_manifest_cache(flow_module, tmp_path, monkeypatch) -> None:
+    cache_dir = str(tmp_path / "cache")
+    executioner = Engine(
+        module_name="manifest_flow",
+        decorator_name="base_flow",
+        cache_dir=cache_dir,
+    )
+
+    manifest = load_manifest(
+        file_path=flow_module, decorator="base_flow", cache_dir=cache_dir
+    )
+
+    assert manifest is not None
+    assert manifest.valid == True
+    assert flow_module in manifest.dependencies
+    assert set(manifest.schemas) == {"func_one", "func_two"}
+
+    def locate(self):
+        raise AssertionError("flow should be loaded from manifest")
+
+    monkeypatch.setattr(Locator, "locate", locate)
+
+    cached = Engine(
+        module_name="manifest_flow",
+        decorator_name="base_flow",
+        cache_dir=cache_dir,
+    )
+
+    assert cached.flow.predecessor == executioner.flow.predecessor
+    assert cached.inspect() == executioner.inspect()
+
+    output, _ = cached.execute(data={"a": 4, "b": 3}, from_step=None)
+    assert output.last_successful_step == 2
+
+
+def test_manifest_invalidated(flow_module, tmp_path) -> None:
+    cache_dir = str(tmp_path / "cache")
+    Engine(
+        module_name="manifest_flow",
+        decorator_name="base_flow",
+        cache_dir=cache_dir,
+    )
+
+    assert load_manifest(flow_module, "base_flow", cache_dir) is not None
+    assert load_manifest(flow_module, "choice_flow", cache_dir) is None
+
+    with open(flow_module, "at") as file:
+        file.write("\n# changed\n")
+
+    assert load_manifest(flow_module, "base_flow", cache_dir) is None
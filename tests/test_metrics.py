@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from freak.engine import Engine
+from freak.flows.base_flow import base_flow
+from freak.metrics import MetricsRegistry
+from freak.models.input import InputModel, InputModelB
+from freak.models.request import RequestContext
+from freak.models.response import Response, SuccessResponseContext
+
+
+@base_flow(
+    name="first",
+    order=1,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="first",
+    parent_uid=None,
+)
+def first(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+@base_flow(
+    name="second",
+    order=2,
+    input_model=InputModelB,
+    output_model=InputModelB,
+    uid="second",
+    parent_uid="first",
+)
+def second(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+def test_metrics_record_steps() -> None:
+    registry = MetricsRegistry()
+    engine = Engine(
+        module_name=__name__,
+        decorator_name="base_flow",
+        metrics=registry,
+        timings=True,
+    )
+
+    output, _ = engine.execute(from_step=None, data={"a": 1, "b": 2, "c": 3})
+    output, _ = engine.execute(from_step=None, data={"a": 1, "b": 2})
+
+    timings = output.timings
+    assert set(timings[0]) == {"wall", "cpu", "validation", "function"}
+    # input of second step is not valid, its function is never called.
+    assert set(timings[1]) == {"wall", "cpu", "validation"}
+
+    metrics = registry.snapshot()[__name__]
+    assert metrics["first"]["calls"] == 2
+    assert metrics["first"]["wall"]["count"] == 2
+    assert metrics["second"]["calls"] == 2
+    assert metrics["second"]["failures"] == 1
+    assert "failures" not in metrics["first"]
+
+    text = registry.prometheus()
+    assert "# TYPE freak_step_wall_seconds histogram" in text
+    assert (
+        f'freak_step_wall_seconds_bucket{{flow="{__name__}",step="first",le="+Inf"}} 2'
+        in text
+    )
+    assert (
+        f'freak_step_failures_total{{flow="{__name__}",step="second"}} 1'
+        in text
+    )
+
+
+def test_metrics_merge_thread_shards() -> None:
+    registry = MetricsRegistry()
+
+    def observe(value: float) -> None:
+        registry.observe(flow="flow", step="step", metric="wall", value=value)
+        registry.increment(flow="flow", step="step", counter="calls")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(observe, [0.00001, 0.002, 0.3, 20.0] * 10))
+
+    metrics = registry.snapshot()["flow"]["step"]
+    assert metrics["calls"] == 40
+    buckets = metrics["wall"]["buckets"]
+    assert buckets[0.0001] == 10
+    assert buckets[0.005] == 10
+    assert buckets[0.5] == 10
+    assert buckets[float("inf")] == 10
+
+    registry.reset()
+    assert registry.snapshot() == {}
+
+
+def test_metrics_disabled() -> None:
+    engine = Engine(module_name=__name__, decorator_name="base_flow")
+
+    # steps are called as they are, without being wrapped.
+    assert engine.plan.steps[0].function is first
+    output, _ = engine.execute(from_step=None, data={"a": 1, "b": 2, "c": 3})
+    assert output.timings == [None, None]
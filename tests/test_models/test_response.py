@@ -0,0 +1,89 @@
+import pickle
+
+from freak.models.request import FetchSchemaRequestContext, RequestContext
+from freak.models.response import (
+    EngineResponse,
+    ErrorResponseContext,
+    FetchInputSchemaContext,
+    InputErrorsResponseContext,
+    Response,
+    SuccessResponseContext,
+)
+
+
+def test_contexts_are_slotted() -> None:
+    contexts = [
+        RequestContext(input={}, name="one", order=1),
+        FetchSchemaRequestContext(name="one", order=1),
+        SuccessResponseContext(input={}, output={}),
+        ErrorResponseContext(input={}, messages=["failed"]),
+        InputErrorsResponseContext(input={}, json_errors="[]"),
+        FetchInputSchemaContext(output={}),
+        EngineResponse(
+            responses=[], from_step=1, to_step=1, last_successful_step=1
+        ),
+    ]
+    for context in contexts:
+        assert not hasattr(context, "__dict__")
+        assert type(pickle.loads(pickle.dumps(context))) is type(context)
+
+
+def test_contexts_do_not_share_defaults() -> None:
+    first = SuccessResponseContext(input={}, output={})
+    second = SuccessResponseContext(input={}, output={})
+    first.messages.append("changed")
+    assert second.messages == []
+
+    error = ErrorResponseContext(input={}, messages=[])
+    error.output["changed"] = True
+    assert ErrorResponseContext(input={}, messages=[]).output == {}
+
+    schema = FetchSchemaRequestContext(name="one", order=1)
+    schema.input["changed"] = True
+    assert FetchSchemaRequestContext(name="one", order=1).input == {
+        "fetch_schema": True
+    }
+
+    first_response = EngineResponse(
+        responses=[], from_step=1, to_step=1, last_successful_step=1
+    )
+    first_response.branches.append(None)
+    assert (
+        EngineResponse(
+            responses=[], from_step=1, to_step=1, last_successful_step=1
+        ).branches
+        == []
+    )
+
+
+def test_engine_response_equality() -> None:
+    responses = [SuccessResponseContext(input={}, output={})]
+
+    def build(**kwargs: int) -> EngineResponse:
+        fields = dict(from_step=1, to_step=2, last_successful_step=2)
+        fields.update(kwargs)
+        return EngineResponse(responses=responses, **fields)  # type: ignore
+
+    assert build() == build()
+    assert build() != build(to_step=3)
+    assert build() != responses
+    assert pickle.loads(pickle.dumps(build())).to_step == 2
+
+
+class CustomResponse(Response):
+    # does not call __init__ of a built-in response.
+    success = True
+
+    def __init__(self) -> None:
+        self.input = {}
+        self.output = {}
+
+
+def test_response_without_timings() -> None:
+    output = EngineResponse(
+        responses=[CustomResponse()],
+        from_step=1,
+        to_step=1,
+        last_successful_step=1,
+    )
+    assert output.timings == [None]
@@ -0,0 +1,41 @@
+from typing import Any, Dict
+
+from freak.models.state import EMPTY_STATE, RunState
+
+
+def test_run_state_advance() -> None:
+    state = EMPTY_STATE.advance(uid="one", path=("two",))
+    forked = state.advance(uid="two", path=("three",))
+    other = state.advance(uid="two", path=())
+
+    assert EMPTY_STATE == {"traversed": {}, "last_step": ""}
+    assert state == {"traversed": {"one": ["two"]}, "last_step": "one"}
+    assert forked == {
+        "traversed": {"one": ["two"], "two": ["three"]},
+        "last_step": "two",
+    }
+    assert other == {
+        "traversed": {"one": ["two"], "two": []},
+        "last_step": "two",
+    }
+
+    # forks share recorded steps instead of copying them.
+    assert forked.trail is not None and other.trail is not None
+    assert forked.trail[2] is state.trail
+    assert other.trail[2] is state.trail
+
+
+def test_run_state_coerce() -> None:
+    executed_steps: Dict[str, Any] = {
+        "traversed": {"one": ["two"], "two": ["three"]},
+        "last_step": "two",
+    }
+    state = RunState.coerce(executed_steps=executed_steps)
+
+    assert state == executed_steps
+    assert state.to_dict() == executed_steps
+    assert RunState.coerce(executed_steps=state) is state
+    assert RunState.coerce(executed_steps=None) is EMPTY_STATE
+
+    executed_steps["traversed"]["one"].append("four")
+    assert state["traversed"]["one"] == ["two"]
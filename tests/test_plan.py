@@ -0,0 +1,75 @@
+import pytest
+from freak.plan import NO_STEP, UNKNOWN_STEP, compile_plan
+from freak.types import Flow, Step
+
+
+def build_flow() -> Flow:
+    steps = [
+        Step(uid="one", parent_uid=None, order=1, name="one"),
+        Step(uid="two", parent_uid="one", order=2, name="two"),
+        Step(uid="three", parent_uid="one", order=3, name="three"),
+        Step(uid="four", parent_uid="one", order=4, name="four"),
+        Step(uid="five", parent_uid="two", order=5, name="five"),
+    ]
+    predecessor = {
+        None: ["one"],
+        "one": ["two", "three", "four"],
+        "two": ["five"],
+    }
+    return Flow(
+        successor={step.uid: step for step in steps},
+        predecessor=predecessor,  # type: ignore
+        parallels={"three", "four"},
+    )
+
+
+def test_compile_plan() -> None:
+    plan = compile_plan(flow=build_flow())
+
+    assert plan.uids == ("one", "two", "three", "four", "five")
+    assert plan.root == 0
+    assert plan.roots == {0}
+
+    assert plan.successors[0] == (1, 2, 3)
+    assert plan.main_successors[0] == (1,)
+    assert plan.successors[4] == ()
+
+    assert plan.parallel_siblings[1] == (2, 3)
+    # parallel steps do not launch their siblings.
+    assert plan.parallel_siblings[2] == ()
+    assert plan.parallel_siblings[3] == ()
+    assert plan.parallel_siblings[0] == ()
+
+    assert plan.is_edge(parent=0, child=2) == True
+    assert plan.is_edge(parent=1, child=2) == False
+    assert plan.is_edge(parent=NO_STEP, child=0) == False
+
+
+def test_plan_locate() -> None:
+    plan = compile_plan(flow=build_flow())
+
+    assert plan.locate(uid=None) == 0
+    assert plan.locate(uid="five") == 4
+    assert plan.locate_last(uid="") == NO_STEP
+    assert plan.locate_last(uid="missing") == UNKNOWN_STEP
+
+    with pytest.raises(Exception, match="InvalidStepError"):
+        plan.locate(uid="missing")
+
+
+def test_compile_plan_inspection() -> None:
+    flow = build_flow()
+    flow.predecessor["two"] = ["five", "five"]
+    plan = compile_plan(flow=flow)
+
+    assert list(plan.inspection["schema"]) == [
+        "one",
+        "two",
+        "three",
+        "four",
+        "five",
+    ]
+    assert plan.etag == compile_plan(flow=flow).etag
+
+    flow.schemas["five"] = {"title": "Five"}
+    assert compile_plan(flow=flow).etag != plan.etag
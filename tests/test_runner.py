@@ -0,0 +1,83 @@
+import io
+import time
+
+from freak.engine import Engine
+from freak.flows.base_flow import base_flow
+from freak.models.input import InputModel
+from freak.models.request import RequestContext
+from freak.models.response import (
+    ErrorResponseContext,
+    Response,
+    SuccessResponseContext,
+)
+from freak.runner import Runner, read_records
+
+
+@base_flow(
+    name="total",
+    order=1,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="total",
+    parent_uid=None,
+)
+def total(ctx: RequestContext) -> Response:
+    # later records finish first, results keep order of records.
+    time.sleep(0.01 / ctx.input["a"])
+    return SuccessResponseContext(
+        input=ctx.input, output={"total": ctx.input["a"] + ctx.input["b"]}
+    )
+
+
+# shares order of step before it, failures are reported by uid.
+@base_flow(
+    name="check",
+    order=1,
+    input_model=InputModel,
+    uid="check",
+    parent_uid="total",
+)
+def check(ctx: RequestContext) -> Response:
+    if ctx.input.get("reject"):
+        return ErrorResponseContext(input=ctx.input, messages=["rejected"])
+    return SuccessResponseContext(
+        input=ctx.input, output={"total": ctx.input["a"] + ctx.input["b"]}
+    )
+
+
+def test_runner_executes_records_in_order() -> None:
+    engine = Engine(module_name=__name__, decorator_name="base_flow")
+    records = [{"a": a, "b": 1} for a in range(1, 9)] + [
+        {"a": 1, "b": 1, "reject": True},
+        {"a": "x", "b": 1},
+    ]
+
+    results = []
+    summary = Runner(engine=engine, workers=4, window=3).run(
+        records=iter(records), write=results.append
+    )
+
+    assert [result["index"] for result in results] == list(range(10))
+    assert results[0]["output"] == {"total": 2}
+    assert results[-2]["failed_step"] == "check"
+    assert results[-1]["success"] == False
+    assert results[-1]["failed_step"] == "total"
+
+    assert summary["records"] == 10
+    assert summary["succeeded"] == 8
+    assert summary["failures"] == {"check": 1, "total": 1}
+    assert summary["latency"]["p50"] <= summary["latency"]["max"]
+
+
+def test_runner_reads_records() -> None:
+    csv_file = io.StringIO("a,b,name\n1,2.5,x\n,true,null\n")
+    assert list(read_records(file=csv_file, record_format="csv")) == [
+        {"a": 1, "b": 2.5, "name": "x"},
+        {"a": "", "b": True, "name": None},
+    ]
+
+    jsonl_file = io.StringIO('{"a": 1}\n\n{"a": 2}\n')
+    assert list(read_records(file=jsonl_file, record_format="jsonl")) == [
+        {"a": 1},
+        {"a": 2},
+    ]
@@ -0,0 +1,68 @@
+import asyncio
+
+from freak.engine import AsyncEngine
+from freak.flows.base_flow import base_flow
+from freak.models.input import InputModel
+from freak.models.request import RequestContext
+from freak.models.response import Response, SuccessResponseContext
+from freak.tracing import Tracer
+
+HOOKS = []
+
+
+def pre_hook(ctx: RequestContext) -> None:
+    HOOKS.append(ctx.name)
+
+
+@base_flow(
+    name="first",
+    order=1,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="first",
+    parent_uid=None,
+    pre_hook=pre_hook,
+)
+def first(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+@base_flow(
+    name="second",
+    order=2,
+    input_model=InputModel,
+    output_model=InputModel,
+    uid="second",
+    parent_uid="first",
+)
+async def second(ctx: RequestContext) -> Response:
+    return SuccessResponseContext(input=ctx.input, output={})
+
+
+def test_tracing_spans() -> None:
+    tracer = Tracer()
+    engine = AsyncEngine(
+        module_name=__name__, decorator_name="base_flow", tracer=tracer
+    )
+    asyncio.run(engine.execute(from_step=None, data={"a": 1, "b": 2}))
+    engine.shutdown()
+
+    spans = {span.name: span for span in tracer.spans}
+    assert spans["first"].parent_id == spans["run"].span_id
+    assert spans["second"].parent_id == spans["run"].span_id
+    assert spans["pre_hook"].parent_id == spans["first"].span_id
+    assert [
+        span.parent_id for span in tracer.spans if span.name == "validation"
+    ] == [spans["first"].span_id, spans["second"].span_id]
+
+    events = tracer.to_chrome()["traceEvents"]
+    run = next(event for event in events if event["name"] == "run")
+    step = next(event for event in events if event["name"] == "first")
+    assert run["ts"] <= step["ts"]
+    assert step["ts"] + step["dur"] <= run["ts"] + run["dur"]
+
+
+def test_tracing_disabled() -> None:
+    engine = AsyncEngine(module_name=__name__, decorator_name="base_flow")
+    assert engine.plan.steps[0].function is first
+    assert engine.tracer is None